@@ -0,0 +1,139 @@
+import asyncio
+import io
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger('blog.asgi')
+
+
+def get_thread_count():
+    # Django (ORM, markdown 렌더링) 를 동시에 실행하는 thread 수. DB 연결 수도 이만큼 생긴다
+    return getattr(settings, 'BLOG_ASGI_THREADS', 8)
+
+
+def build_environ(scope, body):
+    # ASGI http scope -> PEP 3333 environ. path 는 WSGI 처럼 utf-8 byte 를 latin-1 로 읽은 str 로 넘긴다
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    client = scope.get('client')
+    if client:
+        environ['REMOTE_ADDR'] = client[0]
+        environ['REMOTE_PORT'] = str(client[1])
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else 'HTTP_' + name
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    # body 를 이미 다 받았으므로 chunked 요청이라도 길이를 알려줄 수 있다
+    environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+
+class WsgiToAsgi(object):
+    """
+    WSGI application 을 ASGI 3 application 으로 감싼다 (Django 2.2 에는 ASGI handler 가 없다).
+
+    요청 body 를 다 받을 때까지, 그리고 응답을 client 에 보내는 동안은 event loop 에서 기다리고
+    Django 는 thread pool 에서 요청 하나를 처음부터 끝까지 (close() 까지) 실행한다.
+    응답은 thread 에서 모두 만들어 두고 보내므로, 느린 client 가 thread (와 DB 연결) 를 잡고 있지 않는다.
+    """
+
+    def __init__(self, wsgi_application, threads=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(max_workers=threads or get_thread_count(), thread_name_prefix='blog-asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError('Unsupported scope type: {}'.format(scope['type']))
+
+        body = await self.read_body(receive)
+        if body is None:
+            # 요청을 다 보내기 전에 끊었다
+            return
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        future = loop.run_in_executor(self.executor, self.run_wsgi, build_environ(scope, body), loop, queue)
+        started = False
+        while True:
+            message = await queue.get()
+            if message[0] == 'start':
+                started = True
+                await send({
+                    'type': 'http.response.start',
+                    'status': int(message[1].split(' ', 1)[0]),
+                    'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in message[2]],
+                })
+            elif message[0] == 'body':
+                await send({'type': 'http.response.body', 'body': message[1], 'more_body': True})
+            else:
+                if message[0] == 'error' and not started:
+                    await send({'type': 'http.response.start', 'status': 500,
+                                'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+                break
+        await future
+
+    async def read_body(self, receive):
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    def run_wsgi(self, environ, loop, queue):
+        # thread pool 에서 실행된다. event loop 에는 call_soon_threadsafe 로만 넘긴다
+        def put(*message):
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+
+        def start_response(status, headers, exc_info=None):
+            put('start', status, headers)
+
+        try:
+            result = self.wsgi_application(environ, start_response)
+            try:
+                for chunk in result:
+                    if chunk:
+                        put('body', chunk)
+            finally:
+                # request_finished (DB 연결 정리) 가 같은 thread 에서 불리도록
+                if hasattr(result, 'close'):
+                    result.close()
+        except Exception:
+            logger.exception('Error while running %s %s', environ['REQUEST_METHOD'], environ['PATH_INFO'])
+            put('error')
+        else:
+            put('end')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
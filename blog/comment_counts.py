@@ -0,0 +1,47 @@
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Post, Comment
+
+# Post.comment_count / Post.last_commented_at 는 댓글이 바뀔 때 한번의 UPDATE 로 같이 갱신된다.
+# (ETag 용 version / modified 도 같은 UPDATE 에서 올린다)
+
+
+def comment_saved(comment, created):
+    changes = {
+        'version': F('version') + 1,
+        'modified': timezone.now(),
+        'last_commented_at': comment.modefied_at,
+    }
+    if created:
+        changes['comment_count'] = F('comment_count') + 1
+    Post.objects.filter(pk=comment.post_id).update(**changes)
+
+
+def comment_deleted(comment):
+    latest = Comment.objects.filter(post=OuterRef('pk')).order_by('-modefied_at').values('modefied_at')[:1]
+    Post.objects.filter(pk=comment.post_id).update(
+        version=F('version') + 1,
+        modified=timezone.now(),
+        # bulk_create 된 댓글은 count 에 들어가 있지 않을 수 있다 (reconcile 전). 0 아래로 내려가지 않게 한다
+        comment_count=Greatest(F('comment_count') - 1, 0),
+        last_commented_at=Subquery(latest),
+    )
+
+
+def reconcile(queryset=None):
+    """
+    실제 Comment 테이블과 다른 post 들을 고치고, 고친 post 수를 돌려준다.
+    """
+    queryset = Post.objects.all() if queryset is None else queryset
+    rows = queryset.order_by('pk').annotate(
+        real_count=Count('comment'), real_last=Max('comment__modefied_at'),
+    ).values_list('pk', 'comment_count', 'last_commented_at', 'real_count', 'real_last')
+
+    fixed = 0
+    for pk, comment_count, last_commented_at, real_count, real_last in rows.iterator():
+        if (comment_count, last_commented_at) != (real_count, real_last):
+            Post.objects.filter(pk=pk).update(comment_count=real_count, last_commented_at=real_last)
+            fixed += 1
+    return fixed
@@ -0,0 +1,166 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def get_cache():
+    # 여러 process 가 같은 제한을 보도록 공유 cache (memcached / redis) 를 쓴다
+    return caches[getattr(settings, 'BLOG_COMMENT_RATE_CACHE', 'default')]
+
+
+class CommentPending(Exception):
+    # writer 가 제시간에 끝내지 못했다. 댓글은 나중에라도 commit 될 수 있다
+    pass
+
+
+def get_rate_limits():
+    # {'user': (burst, interval), 'ip': (burst, interval)}. interval 초마다 token 이 하나씩 다시 찬다
+    return getattr(settings, 'BLOG_COMMENT_RATE_LIMITS', {'user': (5, 30), 'ip': (20, 6)})
+
+
+def rate_keys(request):
+    keys = {'ip': request.META.get('REMOTE_ADDR') or 'unknown'}
+    if request.user.is_authenticated:
+        keys['user'] = request.user.pk
+    return {scope: 'blog:comment-rate:{}:{}'.format(scope, value) for scope, value in keys.items()}
+
+
+def check_rate(request, now=None):
+    """
+    사용자와 IP 의 token bucket 에서 token 을 하나씩 꺼낸다. 둘 다 남아 있으면 0 을,
+    아니면 (아무것도 꺼내지 않고) 몇 초 뒤에 다시 시도할 수 있는지를 돌려준다.
+
+    bucket 마다 "bucket 이 다시 가득 차는 시각" 하나만 저장한다 (GCRA). get / set 사이에 들어온
+    다른 요청과는 경합할 수 있어서 동시에 몰린 요청 몇 개는 더 통과할 수 있다.
+    """
+    limits = get_rate_limits()
+    keys = {scope: key for scope, key in rate_keys(request).items() if scope in limits}
+    if not keys:
+        return 0
+
+    now = time.time() if now is None else now
+    cache = get_cache()
+    stored = cache.get_many(list(keys.values()))
+    updates = {}
+    retry_after = 0
+    for scope, key in keys.items():
+        burst, interval = limits[scope]
+        tat = max(stored.get(key, now), now)
+        wait = tat - now - (burst - 1) * interval
+        if wait > 0:
+            retry_after = max(retry_after, wait)
+        else:
+            updates[key] = tat + interval
+    if retry_after:
+        return retry_after
+
+    for key, tat in updates.items():
+        cache.set(key, tat, int(tat - now) + 1)
+    return 0
+
+
+class CommentWriter(object):
+    """
+    여러 요청이 동시에 단 댓글을 모아서 한 transaction 으로 저장한다 (group commit).
+
+    요청 thread 는 submit() 이 돌려준 Future 로 자기 댓글이 commit 될 때까지 기다리므로 pk 를 알고
+    redirect 할 수 있다. writer thread 는 하나뿐이라 SQLite 의 write lock 을 잡는 쪽도 하나이고,
+    한 batch 가 저장되는 동안 들어온 댓글은 다음 batch 에 같이 들어간다.
+    """
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or getattr(settings, 'BLOG_COMMENT_BATCH_SIZE', 50)
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def submit(self, comment):
+        future = Future()
+        self.ensure_started()
+        self.queue.put((comment, future))
+        return future
+
+    def ensure_started(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='blog-comment-writer', daemon=True)
+                self.thread.start()
+
+    def next_batch(self):
+        batch = [self.queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            try:
+                self.write(batch)
+            finally:
+                close_old_connections()
+
+    def write(self, batch):
+        results = []
+        try:
+            with transaction.atomic():
+                for comment, future in batch:
+                    # 댓글 하나가 실패해도 나머지는 저장한다
+                    try:
+                        with transaction.atomic():
+                            comment.save()
+                    except Exception as e:
+                        results.append((future, e))
+                    else:
+                        results.append((future, None))
+        except Exception as e:
+            logger.exception('failed to write %d comments', len(batch))
+            for comment, future in batch:
+                future.set_exception(e)
+            return
+
+        for future, error in results:
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = CommentWriter()
+        return _writer
+
+
+def save_comment(comment):
+    """
+    BLOG_COMMENT_WRITE_BEHIND 이면 writer thread 의 batch 에 넣고 commit 될 때까지 기다린다.
+    어느 쪽이든 돌아온 뒤에는 comment.pk 가 있다. 기다리다 시간이 다 되면 CommentPending 을 낸다.
+    """
+    if not getattr(settings, 'BLOG_COMMENT_WRITE_BEHIND', False):
+        with transaction.atomic():
+            comment.save()
+        return comment
+
+    try:
+        get_writer().submit(comment).result(timeout=getattr(settings, 'BLOG_COMMENT_WRITE_TIMEOUT', 10))
+    except TimeoutError:
+        raise CommentPending()
+    return comment
@@ -0,0 +1,86 @@
+import hashlib
+
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from . import page_cache
+from .models import Post
+
+
+class ConditionalGetMixin(object):
+    """
+    template 을 그리기 전에 ETag / Last-Modified 를 계산해서, 바뀌지 않았으면 304 를 돌려준다.
+
+    ETag 는 로그인한 사용자, 요청 경로, 페이지가 의존하는 page_cache group 의 version
+    (sidebar, tag, category 이름이 바뀐 경우) 에 get_etag_parts() 를 더해서 만든다.
+    """
+
+    def get_etag_parts(self):
+        return []
+
+    def get_last_modified(self):
+        return None
+
+    def get_etag(self):
+        request = self.request
+        groups = [page_cache.SIDEBAR_GROUP] + list(self.get_page_cache_groups())
+        parts = [
+            request.get_full_path(),
+            request.user.pk if request.user.is_authenticated else 'anonymous',
+        ] + page_cache.get_versions(groups) + list(self.get_etag_parts())
+        raw = '|'.join(str(part) for part in parts)
+        return quote_etag(hashlib.md5(raw.encode('utf-8')).hexdigest())
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super(ConditionalGetMixin, self).dispatch(request, *args, **kwargs)
+
+        last_modified = self.get_last_modified()
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        etag = self.get_etag()
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return response
+
+        response = super(ConditionalGetMixin, self).dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class PostDetailConditionalMixin(ConditionalGetMixin):
+    def get_post_state(self):
+        if not hasattr(self, '_post_state'):
+            self._post_state = Post.objects.filter(pk=self.kwargs['pk']).values('version', 'modified').first()
+        return self._post_state
+
+    def get_etag_parts(self):
+        state = self.get_post_state()
+        return [state['version'] if state else 'missing']
+
+    def get_last_modified(self):
+        state = self.get_post_state()
+        return state['modified'] if state else None
+
+
+class PostListConditionalMixin(ConditionalGetMixin):
+    def get_last_modified_queryset(self):
+        return self.get_queryset()
+
+    def get_last_modified(self):
+        # ETag, Last-Modified, feed 의 <updated> 에서 같이 쓰므로 한번만 계산한다
+        if not hasattr(self, '_last_modified'):
+            queryset = self.get_last_modified_queryset()
+            self._last_modified = None if queryset is None else \
+                queryset.order_by().aggregate(last_modified=Max('modified'))['last_modified']
+        return self._last_modified
+
+    def get_etag_parts(self):
+        # group version 을 올리지 않는 변경 (댓글 수 등) 에도 ETag 가 바뀌도록 가장 최근 modified 를 넣는다.
+        # If-None-Match 가 If-Modified-Since 보다 우선하므로 Last-Modified 에만 넣어서는 안 된다
+        last_modified = self.get_last_modified()
+        return [last_modified.isoformat() if last_modified else 'none']
@@ -0,0 +1,100 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# True 이면 이 요청의 읽기도 primary 로 보낸다
+_use_primary = ContextVar('blog_db_use_primary', default=False)
+
+PIN_COOKIE = 'blog_db_pin'
+
+
+def get_replicas():
+    return getattr(settings, 'BLOG_DB_REPLICAS', [])
+
+
+def get_sticky_seconds():
+    # 글 / 댓글을 쓴 사용자는 replica 가 따라올 때까지 이 시간 동안 primary 에서 읽는다
+    return getattr(settings, 'BLOG_DB_STICKY_SECONDS', 15)
+
+
+@contextmanager
+def use_primary():
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class PrimaryReplicaRouter(object):
+    """
+    쓰기는 모두 primary(default) 로, 읽기는 settings.BLOG_DB_REPLICAS 중 하나로 보낸다.
+    POST 요청 중이거나 최근에 무언가를 쓴 사용자 (ReplicaPinMiddleware) 의 읽기는 primary 로 보낸다.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if not replicas or _use_primary.get():
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replica 는 primary 의 복사본이므로 어느 쪽에서 읽은 object 든 서로 연결할 수 있다
+        databases = {DEFAULT_DB_ALIAS} | set(get_replicas())
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replica 는 복제로 따라오므로 migrate 하지 않는다
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaPinMiddleware(object):
+    """
+    GET / HEAD 가 아닌 요청은 처음부터 끝까지 primary 를 쓰고, 응답에 cookie 를 남겨서
+    그 사용자의 다음 요청들도 BLOG_DB_STICKY_SECONDS 동안 primary 에서 읽게 한다 (read-your-writes).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writing = request.method not in ('GET', 'HEAD', 'OPTIONS')
+        if not (writing or self.is_pinned(request)):
+            return self.get_response(request)
+
+        with use_primary():
+            response = self.get_response(request)
+        if writing and get_replicas():
+            seconds = get_sticky_seconds()
+            response.set_cookie(PIN_COOKIE, str(int(time.time()) + seconds), max_age=seconds, httponly=True)
+        return response
+
+    @staticmethod
+    def is_pinned(request):
+        try:
+            return int(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+
+def check_connections(**kwargs):
+    """
+    request_started 에서 CONN_MAX_AGE 로 재사용하는 연결이 아직 살아 있는지 확인하고, 끊겼으면 닫는다.
+    (닫힌 연결은 다음 query 때 새로 연결된다. Django 4.1 의 CONN_HEALTH_CHECKS 와 같은 역할)
+    """
+    if not getattr(settings, 'BLOG_DB_HEALTH_CHECKS', False):
+        return
+    for connection in connections.all():
+        if connection.connection is not None and not connection.in_atomic_block and not connection.is_usable():
+            connection.close()
@@ -0,0 +1,57 @@
+import math
+import re
+from html import unescape
+
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+from . import markdown_cache
+
+# 목록의 카드에 보여줄 단어 수와, 읽는 시간을 계산할 때 쓰는 분당 단어 수
+EXCERPT_WORDS = 50
+WORDS_PER_MINUTE = 200
+REBUILD_BATCH_SIZE = 500
+
+CODE_BLOCK_RE = re.compile(r'<pre>.*?</pre>', re.S)
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def plain_text(html):
+    return WHITESPACE_RE.sub(' ', unescape(strip_tags(html))).strip()
+
+
+def summarize(html):
+    """
+    렌더링된 markdown html 에서 (excerpt, word_count) 를 만든다.
+    excerpt 에는 markdown 문법도 코드 블록도 없는 평문만 남긴다.
+    """
+    excerpt = Truncator(plain_text(CODE_BLOCK_RE.sub(' ', html))).words(EXCERPT_WORDS)
+    return excerpt, len(plain_text(html).split())
+
+
+def reading_minutes(word_count):
+    return max(1, math.ceil(word_count / WORDS_PER_MINUTE))
+
+
+def fill(post, html=None):
+    # 렌더링한 html 을 돌려주므로 markdown cache 에 그대로 넣을 수 있다
+    if html is None:
+        html = markdown_cache.render(post.content)
+    post.excerpt, post.word_count = summarize(html)
+    return html
+
+
+def rebuild(queryset):
+    """
+    signal 을 타지 않고 만든 post (seed, import) 의 excerpt 를 채운다. markdown cache 도 같이 채운다.
+    """
+    model = queryset.model
+    batch = []
+    for post in queryset.only('pk', 'content').iterator():
+        markdown_cache.refresh_html(post, post.content, fill(post))
+        batch.append(post)
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            model.objects.bulk_update(batch, ['excerpt', 'word_count'])
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, ['excerpt', 'word_count'])
@@ -0,0 +1,147 @@
+import json
+from io import StringIO
+
+from django.conf import settings
+from django.utils import feedgenerator
+from django.utils.xmlutils import SimplerXMLGenerator
+
+CONTENT_TYPES = {
+    'atom': 'application/atom+xml; charset=utf-8',
+    'rss': 'application/rss+xml; charset=utf-8',
+    'json': 'application/feed+json; charset=utf-8',
+}
+
+
+def get_item_count():
+    return getattr(settings, 'BLOG_FEED_ITEMS', 20)
+
+
+def _flush(buffer):
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
+
+
+class StreamingFeedMixin(object):
+    """
+    feedgenerator 의 write() 는 item 을 전부 self.items 에 모은 다음 한번에 쓴다.
+    stream() 은 item 을 하나씩 받아서 그때그때 xml 조각을 돌려준다.
+    """
+    root_element = 'feed'
+    item_element = 'entry'
+
+    def latest_post_date(self):
+        # 기본 구현은 self.items 를 훑으므로, 미리 계산한 값을 쓴다
+        return self.feed.get('updated') or super(StreamingFeedMixin, self).latest_post_date()
+
+    def start_document(self, handler):
+        handler.startElement(self.root_element, self.root_attributes())
+        self.add_root_elements(handler)
+
+    def end_document(self, handler):
+        handler.endElement(self.root_element)
+
+    def stream(self, items):
+        buffer = StringIO()
+        handler = SimplerXMLGenerator(buffer, 'utf-8')
+        handler.startDocument()
+        self.start_document(handler)
+        yield _flush(buffer)
+
+        for item in items:
+            # add_item 의 기본값 / 변환을 그대로 쓰고 목록에는 남기지 않는다
+            self.add_item(**item)
+            item = self.items.pop()
+            handler.startElement(self.item_element, self.item_attributes(item))
+            self.add_item_elements(handler, item)
+            handler.endElement(self.item_element)
+            yield _flush(buffer)
+
+        self.end_document(handler)
+        yield _flush(buffer)
+
+
+class AtomFeed(StreamingFeedMixin, feedgenerator.Atom1Feed):
+    pass
+
+
+class RssFeed(StreamingFeedMixin, feedgenerator.Rss201rev2Feed):
+    root_element = 'rss'
+    item_element = 'item'
+
+    def start_document(self, handler):
+        # rss 는 <rss><channel> 두 단계로 감싼다
+        handler.startElement(self.root_element, self.rss_attributes())
+        handler.startElement('channel', self.root_attributes())
+        self.add_root_elements(handler)
+
+    def end_document(self, handler):
+        self.endChannelElement(handler)
+        super(RssFeed, self).end_document(handler)
+
+
+class JsonFeed(object):
+    # https://jsonfeed.org/version/1.1
+    version = 'https://jsonfeed.org/version/1.1'
+
+    def __init__(self, title, link, description, feed_url=None, **kwargs):
+        self.feed = {
+            'version': self.version,
+            'title': title,
+            'home_page_url': link,
+            'feed_url': feed_url,
+            'description': description,
+        }
+
+    def stream(self, items):
+        head = json.dumps(self.feed, ensure_ascii=False)
+        yield head[:-1] + ', "items": ['
+        for i, item in enumerate(items):
+            yield (', ' if i else '') + json.dumps(self.item_to_json(item), ensure_ascii=False)
+        yield ']}'
+
+    @staticmethod
+    def item_to_json(item):
+        data = {
+            'id': item['unique_id'],
+            'url': item['link'],
+            'title': item['title'],
+            'content_html': item['description'],
+            'date_published': item['pubdate'].isoformat(),
+            'date_modified': item['updateddate'].isoformat(),
+            'authors': [{'name': item['author_name']}],
+        }
+        if item['categories']:
+            data['tags'] = list(item['categories'])
+        return data
+
+
+FEED_CLASSES = {
+    'atom': AtomFeed,
+    'rss': RssFeed,
+    'json': JsonFeed,
+}
+
+
+def post_items(posts, build_absolute_uri):
+    """
+    Post 를 하나씩 feed item(dict) 으로 바꾼다. 본문은 markdown cache 에서 렌더링된 html 을 쓴다.
+    """
+    for post in posts:
+        link = build_absolute_uri(post.get_absolute_url())
+        yield {
+            'title': post.title,
+            'link': link,
+            'unique_id': link,
+            'description': post.get_markdown_content(),
+            'author_name': post.author.username,
+            'pubdate': post.created,
+            'updateddate': post.modified,
+            'categories': [post.category.name] if post.category_id else (),
+        }
+
+
+def stream(feed_format, posts, build_absolute_uri, **feed_kwargs):
+    feed = FEED_CLASSES[feed_format](**feed_kwargs)
+    return feed.stream(post_items(posts, build_absolute_uri))
@@ -0,0 +1,137 @@
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import F
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# (이름, 최대 가로 크기). 원본보다 크게 늘리지는 않는다
+VARIANTS = (
+    ('thumb', 375),
+    ('card', 750),
+    ('full', 1500),
+)
+FORMATS = (
+    ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    ('WEBP', 'webp', {'quality': 78, 'method': 4}),
+)
+VARIANT_RE = re.compile(r'\.(?:{})\.(?:{})$'.format(
+    '|'.join(name for name, width in VARIANTS), '|'.join(ext for fmt, ext, options in FORMATS)
+))
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'BLOG_IMAGE_WORKERS', 2),
+            thread_name_prefix='blog-images',
+        )
+    return _executor
+
+
+def variant_name(name, variant, ext):
+    root, _ = os.path.splitext(name)
+    return '{}.{}.{}'.format(root, variant, ext)
+
+
+def is_variant(name):
+    return VARIANT_RE.search(name) is not None
+
+
+def parse_variants(value):
+    # 'thumb:375,card:600' -> [('thumb', 375), ('card', 600)]
+    variants = []
+    for item in filter(None, value.split(',')):
+        variant, width = item.split(':')
+        variants.append((variant, int(width)))
+    return variants
+
+
+def build_srcset(name, variants, ext, storage=default_storage):
+    return ', '.join(
+        '{} {}w'.format(storage.url(variant_name(name, variant, ext)), width)
+        for variant, width in parse_variants(variants)
+    )
+
+
+def generate_variants(name, storage=default_storage):
+    """
+    원본 옆에 thumb / card / full 크기의 jpg, webp 를 만들고 'thumb:375,card:750' 형식으로 돌려준다.
+    원본이 작으면 원본 크기를 넘는 variant 는 하나만 (원본 크기로) 만든다.
+    """
+    with storage.open(name) as f:
+        original = Image.open(f)
+        original.load()
+    # 휴대폰 사진은 픽셀은 누운 채로 두고 EXIF 의 Orientation 으로 돌려서 보여준다. variant 에는 EXIF 가 없으므로 미리 돌린다
+    original = ImageOps.exif_transpose(original)
+    if original.mode not in ('RGB', 'L'):
+        original = original.convert('RGB')
+
+    generated = []
+    for variant, max_width in VARIANTS:
+        width = min(max_width, original.width)
+        if generated and generated[-1][1] == width:
+            break
+        height = max(1, round(original.height * width / original.width))
+        resized = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+
+        for fmt, ext, options in FORMATS:
+            buffer = BytesIO()
+            resized.save(buffer, fmt, **options)
+            target = variant_name(name, variant, ext)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+        generated.append((variant, width))
+
+    return ','.join('{}:{}'.format(variant, width) for variant, width in generated)
+
+
+def process_post_image(post_id, name):
+    variants = generate_variants(name)
+    save_variants(post_id, name, variants)
+    return variants
+
+
+def save_variants(post_id, name, variants):
+    """
+    post 에 variant 목록을 기록하고, 카드 (fragment cache, ETag) 와 page cache 가 새 이미지를 쓰도록 한다.
+    그 사이에 이미지가 바뀌었으면 head_image 조건에 걸려서 갱신하지 않는다.
+    """
+    from . import page_cache
+    from .models import Post
+
+    updated = Post.objects.filter(pk=post_id, head_image=name).update(
+        head_image_variants=variants, version=F('version') + 1,
+    )
+    if updated:
+        page_cache.invalidate(*page_cache.groups_for_posts([post_id]))
+    return updated
+
+
+def _process_in_worker(post_id, name):
+    try:
+        process_post_image(post_id, name)
+    except Exception:
+        logger.exception('failed to process head image %s', name)
+    finally:
+        # worker thread 가 연 DB 연결을 정리한다
+        connection.close()
+
+
+def schedule(post_id, name):
+    if getattr(settings, 'BLOG_IMAGE_PROCESSING_SYNC', False):
+        process_post_image(post_id, name)
+    else:
+        get_executor().submit(_process_in_worker, post_id, name)
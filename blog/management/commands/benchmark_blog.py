@@ -0,0 +1,153 @@
+import json
+import os
+import statistics
+import time
+from urllib.parse import quote
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+
+from blog import performance, seed
+from blog.models import Post, Category, Tag
+
+
+class Command(BaseCommand):
+    help = (
+        '주요 페이지 (/blog/, 상세, 검색, tag, category) 를 test client 로 여러번 요청해서 '
+        '응답시간 percentile 과 요청당 query 수를 재고, JSON baseline 과 비교한다'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='endpoint 당 요청 수')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--seed-posts', type=int, default=0,
+                            help='주어지면 그만큼 데이터를 만들어서 재고 끝나면 rollback 한다')
+        parser.add_argument('--page-cache', action='store_true', help='익명 page cache 를 켠 채로 잰다')
+        parser.add_argument('--baseline', default='blog_benchmark.json')
+        parser.add_argument('--save', action='store_true', help='결과를 --baseline 파일에 저장한다')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='p90 이 baseline 보다 이 비율 이상 느려지면 regression')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed_posts']:
+                seed.seed(posts=options['seed_posts'])
+            result = self.run(options)
+            transaction.set_rollback(True)
+
+        baseline = self.load(options['baseline'])
+        regressions = self.report(result, baseline, options['tolerance'])
+
+        if options['save']:
+            with open(options['baseline'], 'w') as f:
+                json.dump(result, f, indent=2, sort_keys=True)
+            self.stdout.write('saved {}'.format(options['baseline']))
+        if regressions and options['fail_on_regression']:
+            raise CommandError('regression: {}'.format(', '.join(regressions)))
+
+    def endpoints(self):
+        post = Post.objects.order_by('-comment_count', '-pk').first()
+        tag = Tag.objects.annotate(n=Count('post')).order_by('-n', 'pk').first()
+        category = Category.objects.annotate(n=Count('post')).order_by('-n', 'pk').first()
+        if post is None:
+            raise CommandError('post 가 없습니다. seed_blog 를 먼저 실행하거나 --seed-posts 를 주세요')
+
+        endpoints = [
+            ('post_list', '/blog/'),
+            ('post_detail', post.get_absolute_url()),
+        ]
+        # 제목이 비어 있으면 (공백뿐이면) 검색할 단어가 없다
+        words = post.title.split()
+        if words:
+            endpoints.append(('post_search', '/blog/search/{}/'.format(quote(words[0], safe=''))))
+        if tag is not None:
+            endpoints.append(('post_list_by_tag', tag.get_absolute_url()))
+        if category is not None:
+            endpoints.append(('post_list_by_category', category.get_absolute_url()))
+        return endpoints
+
+    def run(self, options):
+        page_cache_timeout = {} if options['page_cache'] else {'BLOG_PAGE_CACHE_TIMEOUT': 0}
+        client = Client()
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver'], **page_cache_timeout):
+            for name, url in self.endpoints():
+                for _ in range(options['warmup']):
+                    self.get(client, url)
+                # sidebar 등의 cache 가 찬 다음의 query 수를 한번만 센다
+                metrics = performance.RequestMetrics()
+                with connection.execute_wrapper(metrics.record_query):
+                    self.get(client, url)
+
+                samples = []
+                for _ in range(options['requests']):
+                    start = time.perf_counter()
+                    self.get(client, url)
+                    samples.append((time.perf_counter() - start) * 1000)
+                results[name] = self.summarize(url, samples, metrics.query_count, metrics.duplicate_count)
+
+        return {
+            'meta': {
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'posts': Post.objects.count(),
+                'requests': options['requests'],
+                'page_cache': options['page_cache'],
+            },
+            'endpoints': results,
+        }
+
+    def get(self, client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError('{} returned {}'.format(url, response.status_code))
+        return response
+
+    @staticmethod
+    def summarize(url, samples, queries, duplicate_queries):
+        samples = sorted(samples)
+        n = len(samples)
+
+        def percentile(p):
+            return round(samples[min(n - 1, int(n * p))], 2)
+
+        return {
+            'url': url,
+            'queries': queries,
+            'duplicate_queries': duplicate_queries,
+            'mean_ms': round(statistics.mean(samples), 2),
+            'p50_ms': percentile(0.5),
+            'p90_ms': percentile(0.9),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(samples[-1], 2),
+        }
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def report(self, result, baseline, tolerance):
+        base = (baseline or {}).get('endpoints', {})
+        regressions = []
+        if baseline and baseline['meta'] != result['meta']:
+            self.stdout.write(self.style.WARNING('baseline 의 조건이 다릅니다: {}'.format(baseline['meta'])))
+        self.stdout.write('{:<22} {:>8} {:>8} {:>8} {:>8}  {}'.format('endpoint', 'p50', 'p90', 'p99', 'queries', 'vs baseline'))
+        for name, row in result['endpoints'].items():
+            compare = ''
+            old = base.get(name)
+            if old:
+                compare = 'p90 {:+.0%}, queries {:+d}'.format(row['p90_ms'] / old['p90_ms'] - 1, row['queries'] - old['queries'])
+                if row['p90_ms'] > old['p90_ms'] * (1 + tolerance) or row['queries'] > old['queries']:
+                    regressions.append(name)
+                    compare += '  REGRESSION'
+            self.stdout.write('{:<22} {:>8.2f} {:>8.2f} {:>8.2f} {:>8d}  {}'.format(
+                name, row['p50_ms'], row['p90_ms'], row['p99_ms'], row['queries'], compare,
+            ))
+        return regressions
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from blog.asgi import WsgiToAsgi, build_environ
+from blog.models import Post, Tag
+
+
+def make_scope(path):
+    path, _, query = path.partition('?')
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'scheme': 'http',
+        'http_version': '1.1',
+        'path': path,
+        'root_path': '',
+        'query_string': query.encode('latin-1'),
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        '느린 client 여럿이 동시에 요청할 때의 처리량을 WSGI (worker thread 가 client 와 주고받는 동안 묶여 있다) 와 '
+        'ASGI (my_site_prj.asgi, 같은 수의 thread) 로 재서 비교한다. 실제 socket 대신 client 의 지연을 sleep 으로 흉내낸다'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=50, help='동시에 붙어 있는 client 수')
+        parser.add_argument('--requests', type=int, default=4, help='client 당 요청 수')
+        parser.add_argument('--workers', type=int, default=8, help='WSGI worker thread 수 = ASGI thread pool 크기')
+        parser.add_argument('--client-delay', type=float, default=0.2,
+                            help='client 가 요청을 보내고 응답을 받아가는 데 걸리는 시간(초)')
+        parser.add_argument('--page-cache', action='store_true', help='익명 page cache 를 켠 채로 잰다')
+        parser.add_argument('paths', nargs='*', help='요청할 경로들 (기본: 목록, 상세, tag, feed)')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or self.default_paths()
+        page_cache_timeout = {} if options['page_cache'] else {'BLOG_PAGE_CACHE_TIMEOUT': 0}
+        with override_settings(ALLOWED_HOSTS=['testserver'], **page_cache_timeout):
+            handler = WSGIHandler()
+            results = [
+                ('wsgi', self.run_wsgi(handler, paths, options)),
+                ('asgi', self.run_asgi(WsgiToAsgi(handler, threads=options['workers']), paths, options)),
+            ]
+
+        self.stdout.write('{} clients x {} requests, {} threads, client delay {:.0f}ms'.format(
+            options['clients'], options['requests'], options['workers'], options['client_delay'] * 1000,
+        ))
+        self.stdout.write('{:<6} {:>10} {:>10} {:>10} {:>10}'.format('', 'req/s', 'p50', 'p90', 'p99'))
+        for name, (elapsed, latencies) in results:
+            self.stdout.write('{:<6} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f}'.format(
+                name, len(latencies) / elapsed, *[self.percentile(latencies, p) for p in (0.5, 0.9, 0.99)]
+            ))
+
+    def default_paths(self):
+        post = Post.objects.order_by('-created').first()
+        if post is None:
+            raise CommandError('post 가 없습니다. seed_blog 를 먼저 실행하세요')
+        paths = ['/blog/', post.get_absolute_url(), '/blog/feed/atom/']
+        tag = Tag.objects.filter(stat__post_count__gt=0).order_by('-stat__post_count').first()
+        if tag is not None:
+            paths.append(tag.get_absolute_url())
+        return paths
+
+    def check_status(self, path, status):
+        if not status.startswith('200'):
+            raise CommandError('{} returned {}'.format(path, status))
+
+    def run_wsgi(self, handler, paths, options):
+        # sync worker 는 요청을 읽고 응답을 다 쓸 때까지 그 client 에 묶여 있다
+        workers = threading.BoundedSemaphore(options['workers'])
+        delay = options['client_delay'] / 2
+
+        def request(path):
+            with workers:
+                time.sleep(delay)
+                status = []
+                result = handler(build_environ(make_scope(path), b''), lambda s, h, exc_info=None: status.append(s))
+                try:
+                    b''.join(result)
+                finally:
+                    result.close()
+                time.sleep(delay)
+            self.check_status(path, status[0])
+
+        return self.run_clients(request, paths, options)
+
+    def run_clients(self, request, paths, options):
+        def client(number):
+            latencies = []
+            for i in range(options['requests']):
+                start = time.perf_counter()
+                request(paths[(number + i) % len(paths)])
+                latencies.append((time.perf_counter() - start) * 1000)
+            return latencies
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['clients']) as executor:
+            latencies = sum(executor.map(client, range(options['clients'])), [])
+        return time.perf_counter() - start, latencies
+
+    def run_asgi(self, application, paths, options):
+        delay = options['client_delay'] / 2
+
+        async def request(path):
+            status = []
+
+            async def receive():
+                await asyncio.sleep(delay)
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(str(message['status']))
+                elif not message.get('more_body', False):
+                    await asyncio.sleep(delay)
+
+            await application(make_scope(path), receive, send)
+            self.check_status(path, status[0])
+
+        async def client(number):
+            latencies = []
+            for i in range(options['requests']):
+                start = time.perf_counter()
+                await request(paths[(number + i) % len(paths)])
+                latencies.append((time.perf_counter() - start) * 1000)
+            return latencies
+
+        async def main():
+            return await asyncio.gather(*[client(number) for number in range(options['clients'])])
+
+        start = time.perf_counter()
+        try:
+            latencies = sum(asyncio.run(main()), [])
+        finally:
+            application.executor.shutdown(wait=True)
+        return time.perf_counter() - start, latencies
+
+    @staticmethod
+    def percentile(samples, p):
+        samples = sorted(samples)
+        return samples[min(len(samples) - 1, int(len(samples) * p))]
@@ -0,0 +1,56 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Post
+from blog.paginator import CursorPaginator
+
+
+class Command(BaseCommand):
+    help = 'OFFSET paginator 와 cursor paginator 의 깊은 페이지 응답시간을 비교한다 (데이터는 rollback 된다)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--page', type=int, default=1000)
+        parser.add_argument('--per-page', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        per_page = options['per_page']
+        page_number = options['page']
+        with transaction.atomic():
+            author = User.objects.create(username='pagination-benchmark')
+            Post.objects.bulk_create(
+                [Post(title='Post {}'.format(i), content='content', author=author) for i in range(options['posts'])]
+            )
+            queryset = Post.objects.for_list().order_by('-created')
+
+            def offset_page(number):
+                page = Paginator(queryset, per_page).page(number)
+                return list(page.object_list)
+
+            paginator = CursorPaginator(queryset, per_page)
+            last_row = Post.objects.order_by(*paginator.ordering)[(page_number - 1) * per_page - 1]
+            cursor = paginator.encode_cursor('next', last_row)
+
+            for label, func in [
+                ('offset page 1', lambda: offset_page(1)),
+                ('offset page {}'.format(page_number), lambda: offset_page(page_number)),
+                ('cursor page 1', lambda: paginator.page(None).object_list),
+                ('cursor page {}'.format(page_number), lambda: paginator.page(cursor).object_list),
+            ]:
+                self.stdout.write('{:>18}: {:.2f}ms'.format(label, self.time(func, options['repeat'])))
+
+            transaction.set_rollback(True)
+
+    def time(self, func, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
@@ -0,0 +1,84 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.test.utils import override_settings
+
+from blog import search
+from blog.models import Post
+
+WORDS = [
+    'django', 'python', 'search', 'index', 'query', 'template', 'cache', 'model',
+    'view', 'server', 'database', 'python3', 'deploy', 'static', 'markdown',
+    '장고를', '파이썬으로', '블로그', '검색은', '데이터베이스', '서버에서', '만들기',
+] + ['word{}'.format(i) for i in range(5000)]
+QUERIES = ['django', 'markdown cache', '장고', '블로그 검색', 'nothingmatches']
+
+
+class Command(BaseCommand):
+    help = 'LIKE 검색과 FTS5 / SearchToken 색인 검색의 응답시간을 비교한다 (데이터는 rollback 된다)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, nargs='+', default=[10000, 100000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        with transaction.atomic():
+            author = User.objects.create(username='search-benchmark')
+            created = 0
+            for size in sorted(options['posts']):
+                self.create_posts(author, size - created)
+                created = size
+                self.stdout.write('== {} posts'.format(size))
+                self.run(options['repeat'])
+            transaction.set_rollback(True)
+
+    def create_posts(self, author, count):
+        batch = []
+        for i in range(count):
+            batch.append(Post(
+                title=' '.join(random.choice(WORDS) for _ in range(3)),
+                content=' '.join(random.choice(WORDS) for _ in range(200)),
+                author=author,
+            ))
+            if len(batch) == 1000:
+                Post.objects.bulk_create(batch)
+                batch = []
+        Post.objects.bulk_create(batch)
+
+    def run(self, repeat):
+        timings = {'like': self.time_queries(repeat, self.like_search)}
+        backends = ['orm']
+        if search.fts5_available('default'):
+            backends.insert(0, 'fts5')
+        for backend in backends:
+            with override_settings(BLOG_SEARCH_BACKEND=backend):
+                search.rebuild_index()
+                timings[backend] = self.time_queries(repeat, search.search_post_ids)
+
+        for name, per_query in timings.items():
+            self.stdout.write('{:>5}  '.format(name) + '  '.join(
+                '{}={:.1f}ms'.format(q, ms) for q, ms in per_query
+            ))
+
+    def time_queries(self, repeat, func):
+        results = []
+        for q in QUERIES:
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func(q)
+                samples.append((time.perf_counter() - start) * 1000)
+            results.append((q, statistics.median(samples)))
+        return results
+
+    def like_search(self, q):
+        # 예전 PostSearch 의 방식 (paginator 의 count + 첫 페이지 5개)
+        object_list = Post.objects.filter(Q(title__contains=q) | Q(content__contains=q))
+        object_list.count()
+        return list(object_list.values_list('pk', flat=True)[:5])
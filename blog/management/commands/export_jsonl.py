@@ -0,0 +1,20 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from blog import transfer
+
+
+class Command(BaseCommand):
+    help = 'category, tag, post, comment 를 JSONL 로 내보낸다 (파일 이름이 - 이면 stdout)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', default='-')
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            transfer.export_jsonl(sys.stdout)
+            return
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            count = transfer.export_jsonl(f)
+        self.stdout.write(self.style.SUCCESS('exported {} records'.format(count)))
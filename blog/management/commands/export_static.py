@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+
+from blog import static_export
+
+
+class Command(BaseCommand):
+    help = (
+        'blog 와 basecamp 의 모든 공개 페이지를 OUTPUT 디렉토리에 html / xml / json 파일로 저장한다. '
+        '지난번 export 이후 Post / Comment / Tag / Category 가 바뀐 페이지만 다시 그린다 '
+        '(template 을 바꿨으면 --full). static / media 파일은 collectstatic 과 MEDIA_ROOT 에서 따로 복사한다'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--full', action='store_true', help='바뀌지 않은 페이지도 모두 다시 그린다')
+        parser.add_argument('--host', default=None, help='feed / sitemap 의 절대 url 에 쓰는 host')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        host = options['host'] or static_export.default_host()
+        os.makedirs(output, exist_ok=True)
+
+        previous = {} if options['full'] else static_export.load_manifest(output)
+        pages = static_export.collect_pages()
+        todo = [
+            url for url, fingerprint in pages
+            if url not in previous
+            or previous[url]['fingerprint'] != fingerprint
+            or not os.path.exists(os.path.join(output, previous[url]['path']))
+        ]
+
+        paths = dict(self.render(output, host, todo, options['workers']))
+
+        manifest = {}
+        for url, fingerprint in pages:
+            path = paths[url] if url in paths else previous[url]['path']
+            manifest[url] = {'fingerprint': fingerprint, 'path': path}
+
+        # 없어진 post / tag / category 의 페이지는 지운다
+        removed = 0
+        live_paths = {entry['path'] for entry in manifest.values()}
+        for url, entry in previous.items():
+            if url not in manifest and entry['path'] not in live_paths:
+                target = os.path.join(output, entry['path'])
+                if os.path.exists(target):
+                    os.remove(target)
+                    removed += 1
+
+        static_export.save_manifest(output, manifest)
+        self.stdout.write(self.style.SUCCESS('rendered {}, unchanged {}, removed {}'.format(
+            len(todo), len(pages) - len(todo), removed,
+        )))
+
+    def render(self, output, host, urls, workers):
+        if workers <= 1 or len(urls) <= 1:
+            with static_export.export_settings(host):
+                client = Client(HTTP_HOST=host)
+                return [(url, static_export.render_page(output, url, client)) for url in urls]
+
+        # fork 된 process 들이 부모의 DB 연결을 같이 쓰지 않도록 닫아 둔다
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=static_export.init_worker,
+            initargs=(host,),
+        ) as executor:
+            render = partial(static_export.render_page, output)
+            return list(zip(urls, executor.map(render, urls, chunksize=16)))
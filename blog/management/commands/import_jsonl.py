@@ -0,0 +1,35 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'export_jsonl 로 만든 파일을 가져온다. 중간에 끊기면 같은 명령으로 이어서 가져온다. '
+        'head_image 파일은 MEDIA_ROOT 로 따로 복사한 다음 process_head_images 를 실행한다'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--progress', default=None, help='진행 상황 파일 (기본값: INPUT.progress)')
+        parser.add_argument('--restart', action='store_true', help='진행 상황 파일을 무시하고 처음부터 가져온다')
+
+    def handle(self, *args, **options):
+        progress = options['progress'] or options['input'] + '.progress'
+        if options['restart'] and os.path.exists(progress):
+            os.remove(progress)
+
+        importer = transfer.Importer(progress, options['batch_size'], log=self.stdout.write)
+        with open(options['input'], encoding='utf-8') as f:
+            try:
+                importer.run(f)
+            except transfer.ImportConflict as e:
+                # 그 batch 는 rollback 되었고, 앞의 batch 들은 progress 파일에 남아 있다
+                raise CommandError('{}. Fix it and run the same command again to resume.'.format(e))
+
+        self.stdout.write(self.style.SUCCESS('created {}, skipped {} comments'.format(
+            ', '.join('{} {}'.format(count, name) for name, count in importer.created.items()), importer.skipped,
+        )))
@@ -0,0 +1,69 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from blog import images
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'MEDIA_ROOT/blog/ 아래의 기존 이미지들로 크기별 jpg / webp 이미지를 만든다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='이미 처리된 이미지도 다시 만든다')
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        names = [name for name in self.find_originals('blog') if options['force'] or not self.is_processed(name)]
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            results = dict(zip(names, executor.map(self.generate, names)))
+
+        updated = 0
+        for post in Post.objects.exclude(head_image='').only('pk', 'head_image', 'head_image_variants'):
+            variants = results.get(post.head_image.name)
+            if variants is None and not post.head_image_variants and self.is_processed(post.head_image.name):
+                # 파일은 이미 처리되어 있는데 post 에 기록되지 않은 경우
+                variants = self.existing_variants(post.head_image.name)
+            if variants and variants != post.head_image_variants:
+                updated += images.save_variants(post.pk, post.head_image.name, variants)
+
+        self.stdout.write(self.style.SUCCESS(
+            'processed {} images, updated {} posts'.format(len(names), updated)
+        ))
+
+    def generate(self, name):
+        try:
+            return images.generate_variants(name)
+        except (OSError, ValueError) as e:
+            # 이미지가 아닌 파일 등
+            self.stderr.write('skip {}: {}'.format(name, e))
+            return None
+
+    def find_originals(self, path):
+        if not default_storage.exists(path):
+            return
+        directories, files = default_storage.listdir(path)
+        for name in files:
+            name = os.path.join(path, name)
+            if not images.is_variant(name):
+                yield name
+        for directory in directories:
+            yield from self.find_originals(os.path.join(path, directory))
+
+    def is_processed(self, name):
+        variant, width = images.VARIANTS[0]
+        return default_storage.exists(images.variant_name(name, variant, 'jpg'))
+
+    def existing_variants(self, name):
+        generated = []
+        for variant, max_width in images.VARIANTS:
+            target = images.variant_name(name, variant, 'jpg')
+            if not default_storage.exists(target):
+                break
+            with default_storage.open(target) as f:
+                generated.append('{}:{}'.format(variant, Image.open(f).width))
+        return ','.join(generated)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from blog import search
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = '검색 색인(FTS5 또는 SearchToken 테이블)을 처음부터 다시 만든다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=None)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        search.rebuild_index(using=using, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('indexed {} posts ({})'.format(
+            Post.objects.using(using or 'default').count(), search.get_backend(using),
+        )))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from blog import sidebar, tag_stats
+
+
+class Command(BaseCommand):
+    help = 'TagStat 의 tag 별 게시물 수를 Post.tags 와 다시 맞춘다'
+
+    def handle(self, *args, **options):
+        fixed = tag_stats.rebuild()
+        sidebar.invalidate()
+        self.stdout.write(self.style.SUCCESS('fixed {} tags'.format(fixed)))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog import comment_counts
+
+
+class Command(BaseCommand):
+    help = 'Post.comment_count / last_commented_at 를 Comment 테이블과 다시 맞춘다'
+
+    def handle(self, *args, **options):
+        fixed = comment_counts.reconcile()
+        self.stdout.write(self.style.SUCCESS('fixed {} posts'.format(fixed)))
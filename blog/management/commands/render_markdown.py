@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from blog import markdown_cache
+from blog.models import Post, Comment
+
+
+class Command(BaseCommand):
+    help = 'Post / Comment 의 markdown 을 미리 html 로 렌더링해서 cache 에 채워 넣는다'
+
+    def handle(self, *args, **options):
+        post_count = 0
+        for post in Post.objects.only('pk', 'content').iterator():
+            markdown_cache.refresh_html(post, post.content)
+            post_count += 1
+
+        comment_count = 0
+        for comment in Comment.objects.only('pk', 'text').iterator():
+            markdown_cache.refresh_html(comment, comment.text)
+            comment_count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            'rendered {} posts, {} comments'.format(post_count, comment_count)
+        ))
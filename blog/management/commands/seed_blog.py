@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from blog import seed
+
+
+class Command(BaseCommand):
+    help = 'benchmark / 부하 테스트용 post, 댓글, tag, category 를 만든다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=5, help='post 당 평균 댓글 수')
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--categories', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        created = seed.seed(
+            posts=options['posts'],
+            comments_per_post=options['comments'],
+            tags=options['tags'],
+            categories=options['categories'],
+            random_seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(', '.join(
+            '{} {}'.format(count, name) for name, count in created.items()
+        )))
@@ -0,0 +1,74 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from markdown import markdown
+from markdownx.settings import (
+    MARKDOWNX_MARKDOWN_EXTENSIONS,
+    MARKDOWNX_MARKDOWN_EXTENSION_CONFIGS,
+)
+
+# 렌더링된 html 은 content hash 를 key 에 포함하므로 만료시킬 필요가 없다
+MARKDOWN_CACHE_TIMEOUT = None
+
+
+def get_cache():
+    return caches[getattr(settings, 'BLOG_MARKDOWN_CACHE', 'default')]
+
+
+# (extensions, extension_configs, fingerprint). 설정 객체가 그대로이면 다시 계산하지 않는다
+_fingerprint = (None, None, None)
+
+
+def extensions_fingerprint():
+    # extension 설정이 바뀌면 key 가 바뀌므로 예전 html 은 자연스럽게 무효화된다
+    global _fingerprint
+    extensions, configs, fingerprint = _fingerprint
+    if extensions is MARKDOWNX_MARKDOWN_EXTENSIONS and configs is MARKDOWNX_MARKDOWN_EXTENSION_CONFIGS:
+        return fingerprint
+
+    config = json.dumps(
+        [MARKDOWNX_MARKDOWN_EXTENSIONS, MARKDOWNX_MARKDOWN_EXTENSION_CONFIGS],
+        sort_keys=True,
+        default=str,
+    )
+    fingerprint = hashlib.sha1(config.encode('utf-8')).hexdigest()[:12]
+    _fingerprint = (MARKDOWNX_MARKDOWN_EXTENSIONS, MARKDOWNX_MARKDOWN_EXTENSION_CONFIGS, fingerprint)
+    return fingerprint
+
+
+def make_key(obj, text):
+    content_hash = hashlib.sha1(text.encode('utf-8')).hexdigest()
+    return 'blog:md:{}:{}:{}:{}'.format(
+        obj._meta.model_name, obj.pk, content_hash, extensions_fingerprint()
+    )
+
+
+def render(text):
+    return markdown(
+        text=text,
+        extensions=MARKDOWNX_MARKDOWN_EXTENSIONS,
+        extension_configs=MARKDOWNX_MARKDOWN_EXTENSION_CONFIGS,
+    )
+
+
+def get_html(obj, text):
+    if obj.pk is None:
+        return render(text)
+
+    cache = get_cache()
+    key = make_key(obj, text)
+    html = cache.get(key)
+    if html is None:
+        html = render(text)
+        cache.set(key, html, MARKDOWN_CACHE_TIMEOUT)
+    return html
+
+
+def refresh_html(obj, text, html=None):
+    # 이미 렌더링한 html 이 있으면 (excerpts.fill) 다시 렌더링하지 않는다
+    if html is None:
+        html = render(text)
+    get_cache().set(make_key(obj, text), html, MARKDOWN_CACHE_TIMEOUT)
+    return html
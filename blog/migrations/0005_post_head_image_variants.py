@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 07:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_post_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='head_image_variants',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+    ]
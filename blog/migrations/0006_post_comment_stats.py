@@ -0,0 +1,39 @@
+# Generated by Django 2.2.28 on 2026-10-18 07:35
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def fill_comment_stats(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    rows = Post.objects.order_by('pk').annotate(
+        real_count=Count('comment'), real_last=Max('comment__modefied_at'),
+    ).values_list('pk', 'real_count', 'real_last')
+    for pk, real_count, real_last in rows.iterator():
+        if real_count:
+            Post.objects.filter(pk=pk).update(comment_count=real_count, last_commented_at=real_last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_post_head_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_commented_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_comment_stats, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['comment_count', 'last_commented_at'], name='post_comment_activity_idx'),
+        ),
+    ]
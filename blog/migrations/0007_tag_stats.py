@@ -0,0 +1,38 @@
+# Generated by Django 2.2.28 on 2026-10-18 07:37
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_tag_stats(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Tag = apps.get_model('blog', 'Tag')
+    TagStat = apps.get_model('blog', 'TagStat')
+    counts = dict(Post.tags.through.objects.values_list('tag_id').annotate(count=Count('post_id')).order_by())
+    TagStat.objects.bulk_create([
+        TagStat(tag_id=tag_id, post_count=counts.get(tag_id, 0))
+        for tag_id in Tag.objects.values_list('pk', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_post_comment_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagStat',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stat', serialize=False, to='blog.Tag')),
+                ('post_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='tagstat',
+            index=models.Index(fields=['post_count'], name='tagstat_post_count_idx'),
+        ),
+        migrations.RunPython(fill_tag_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 2.2.28 on 2026-10-18 07:55
+
+import re
+from html import unescape
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+from markdown import markdown
+from markdownx.settings import MARKDOWNX_MARKDOWN_EXTENSIONS, MARKDOWNX_MARKDOWN_EXTENSION_CONFIGS
+
+# blog.excerpts 가 나중에 바뀌어도 이 migration 의 결과는 바뀌지 않도록 그 당시의 로직을 그대로 둔다
+EXCERPT_WORDS = 50
+BATCH_SIZE = 500
+CODE_BLOCK_RE = re.compile(r'<pre>.*?</pre>', re.S)
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def plain_text(html):
+    return WHITESPACE_RE.sub(' ', unescape(strip_tags(html))).strip()
+
+
+def summarize(content):
+    html = markdown(
+        text=content,
+        extensions=MARKDOWNX_MARKDOWN_EXTENSIONS,
+        extension_configs=MARKDOWNX_MARKDOWN_EXTENSION_CONFIGS,
+    )
+    excerpt = Truncator(plain_text(CODE_BLOCK_RE.sub(' ', html))).words(EXCERPT_WORDS)
+    return excerpt, len(plain_text(html).split())
+
+
+def fill_excerpts(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    batch = []
+    for post in Post.objects.only('pk', 'content').iterator(chunk_size=BATCH_SIZE):
+        post.excerpt, post.word_count = summarize(post.content)
+        batch.append(post)
+        if len(batch) >= BATCH_SIZE:
+            Post.objects.bulk_update(batch, ['excerpt', 'word_count'], batch_size=BATCH_SIZE)
+            batch = []
+    if batch:
+        Post.objects.bulk_update(batch, ['excerpt', 'word_count'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_tag_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from markdownx.models import MarkdownxField
-from markdownx.utils import markdown
+from . import excerpts, images, markdown_cache, placeholder
 
 
 class Category(models.Model):
@@ -31,17 +32,53 @@ class Tag(models.Model):
         return '/blog/tag/{}/'.format(self.slug)
 
 
+class PostQuerySet(models.QuerySet):
+    def for_list(self):
+        # post_list.html 의 카드에서 사용하는 category, author, tags 를 한번에 가져온다.
+        # 카드는 excerpt 만 보여주므로 본문은 가져오지 않는다
+        return self.select_related('category', 'author').prefetch_related('tags').defer('content')
+
+    def most_discussed(self):
+        return self.order_by('-comment_count', '-last_commented_at')
+
+    def bump_version(self):
+        # post 자신은 그대로지만 카드에 보이는 category / tag 가 바뀌었을 때
+        return self.update(version=models.F('version') + 1, modified=timezone.now())
+
+
 class Post(models.Model):
     title = models.CharField(max_length = 30)
     content = MarkdownxField()
     created = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey(User, on_delete=True)
     head_image = models.ImageField(upload_to='blog/%y/%m/%d/', blank=True)
+    # 처리가 끝난 head_image 의 크기별 이미지 ('thumb:375,card:750,full:1500'). 비어 있으면 원본만 있다
+    head_image_variants = models.CharField(max_length=100, blank=True, editable=False)
     category = models.ForeignKey(Category, blank=True, null=True, on_delete=models.SET_NULL)
     tags = models.ManyToManyField(Tag, blank=True)
 
-    class META:
+    # 글이나 댓글이 바뀔 때마다 올라간다 (ETag / Last-Modified 계산용)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    modified = models.DateTimeField(auto_now=True)
+
+    # 목록에서 댓글 수를 보여주거나 정렬할 때 Comment 테이블을 세지 않도록 저장해 둔다
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    last_commented_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # 저장할 때 본문에서 만들어 둔다 (excerpts.fill). 목록은 content 대신 이것을 읽는다
+    excerpt = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['created'], name='post_created_idx'),
+            models.Index(fields=['category', 'created'], name='post_category_created_idx'),
+            models.Index(fields=['modified'], name='post_modified_idx'),
+            models.Index(fields=['comment_count', 'last_commented_at'], name='post_comment_activity_idx'),
+        ]
 
 
     def __str__(self):
@@ -53,7 +90,19 @@ class Post(models.Model):
 
 
     def get_markdown_content(self):
-        return markdown(self.content)
+        return markdown_cache.get_html(self, self.content)
+
+    def get_reading_minutes(self):
+        return excerpts.reading_minutes(self.word_count)
+
+    def get_head_image_srcset(self):
+        return images.build_srcset(self.head_image.name, self.head_image_variants, 'jpg')
+
+    def get_head_image_webp_srcset(self):
+        return images.build_srcset(self.head_image.name, self.head_image_variants, 'webp')
+
+    def get_placeholder_url(self):
+        return '/blog/placeholder/{}.png'.format(placeholder.make_key(self))
 
     def get_update_url(self):
          return self.get_absolute_url()+'update/'
@@ -65,10 +114,36 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     modefied_at = models.DateTimeField(auto_now = True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created_at'], name='comment_post_created_idx'),
+        ]
+
 
     def get_markdown_content(self):
-        return markdown(self.text)
+        return markdown_cache.get_html(self, self.text)
 
     def get_absolute_url(self):
         return self.post.get_absolute_url() + '#comment-id-{}'.format(self.pk)
 
+
+
+class SearchToken(models.Model):
+    # FTS5 를 쓸 수 없는 DB 에서 사용하는 역색인 (token -> post)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    token = models.CharField(max_length=40)
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('token', 'post')
+
+
+class TagStat(models.Model):
+    # tag 별 게시물 수. Post.tags 가 바뀔 때 signal 로 갱신하고, tag cloud 와 /blog/tags/ 는 이것만 읽는다
+    tag = models.OneToOneField(Tag, on_delete=models.CASCADE, primary_key=True, related_name='stat')
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post_count'], name='tagstat_post_count_idx'),
+        ]
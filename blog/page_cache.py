@@ -0,0 +1,120 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from .models import Post, Tag
+
+# 페이지들은 자기가 의존하는 group 의 version 을 key 에 포함해서 저장된다.
+# group 의 version 을 올리면 그 group 에 속한 페이지들만 더 이상 읽히지 않는다.
+SIDEBAR_GROUP = 'sidebar'
+LIST_GROUP = 'list'
+# /blog/tags/ : 모든 tag 의 게시물 수
+TAG_INDEX_GROUP = 'tags'
+
+
+def get_cache():
+    return caches[getattr(settings, 'BLOG_PAGE_CACHE', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'BLOG_PAGE_CACHE_TIMEOUT', 60 * 10)
+
+
+def post_group(pk):
+    return 'post:{}'.format(pk)
+
+
+def category_group(slug):
+    return 'category:{}'.format(slug if slug is not None else '_none')
+
+
+def tag_group(slug):
+    return 'tag:{}'.format(slug)
+
+
+def groups_for_posts(post_ids):
+    # post 카드가 보이는 곳: 상세 페이지, 전체 목록, 해당 category 목록, 각 tag 목록
+    groups = [LIST_GROUP]
+    for pk, category_slug in Post.objects.filter(pk__in=post_ids).values_list('pk', 'category__slug'):
+        groups += [post_group(pk), category_group(category_slug)]
+    for tag_slug in Tag.objects.filter(post__in=post_ids).values_list('slug', flat=True).distinct():
+        groups.append(tag_group(tag_slug))
+    return groups
+
+
+def version_key(group):
+    return 'blog:page-version:{}'.format(group)
+
+
+def get_versions(groups):
+    cache = get_cache()
+    keys = [version_key(group) for group in groups]
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def new_version():
+    # cache 에서 version 이 사라졌다가 다시 만들어져도 예전 페이지와 겹치지 않도록 시간으로 만든다
+    return int(time.time() * 1000000)
+
+
+def invalidate(*groups):
+    get_cache().set_many({version_key(group): new_version() for group in set(groups)}, None)
+
+
+def is_cacheable(request):
+    return (
+        get_timeout() > 0
+        and request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+    )
+
+
+def make_key(request, groups):
+    versions = get_versions(groups)
+    raw = '{}|{}'.format(request.get_full_path(), ','.join(
+        '{}={}'.format(group, version) for group, version in zip(groups, versions)
+    ))
+    return 'blog:page:{}'.format(hashlib.md5(raw.encode('utf-8')).hexdigest())
+
+
+class AnonymousPageCacheMixin(object):
+    """
+    로그인하지 않은 방문자의 GET 응답을 통째로 cache 에 저장한다.
+    view 는 get_page_cache_groups() 로 자신이 의존하는 group 들을 알려준다.
+    """
+
+    def get_page_cache_groups(self):
+        return [LIST_GROUP]
+
+    def dispatch(self, request, *args, **kwargs):
+        if not is_cacheable(request):
+            return super(AnonymousPageCacheMixin, self).dispatch(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = make_key(request, [SIDEBAR_GROUP] + list(self.get_page_cache_groups()))
+        response = cache.get(key)
+        if response is not None:
+            # 저장된 응답의 ETag / Last-Modified 로 바로 304 를 판단한다
+            return get_conditional_response(
+                request,
+                etag=response.get('ETag'),
+                last_modified=parse_http_date_safe(response.get('Last-Modified', '')),
+                response=response,
+            )
+
+        response = super(AnonymousPageCacheMixin, self).dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and not response.cookies:
+            if hasattr(response, 'render') and callable(response.render):
+                response.add_post_render_callback(lambda r: cache.set(key, r, get_timeout()))
+            else:
+                cache.set(key, response, get_timeout())
+        return response
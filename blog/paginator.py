@@ -0,0 +1,162 @@
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage(object):
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator(object):
+    """
+    (created, pk) 같은 정렬 key 의 값으로 다음 페이지를 찾는 keyset paginator.
+    OFFSET 과 COUNT(*) 를 쓰지 않으므로 뒤쪽 페이지도 첫 페이지와 같은 비용이 든다.
+    """
+
+    def __init__(self, queryset, per_page):
+        ordering = list(queryset.query.order_by)
+        if not ordering:
+            raise ValueError('CursorPaginator requires an ordered queryset')
+        if ordering[-1].lstrip('-') not in ('pk', 'id'):
+            ordering.append('-pk' if ordering[-1].startswith('-') else 'pk')
+
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+
+    def page(self, cursor=None):
+        if cursor is None:
+            direction, values = 'next', None
+        else:
+            direction, values = self.decode_cursor(cursor)
+
+        ordering = self.ordering if direction == 'next' else [reverse(f) for f in self.ordering]
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.build_filter(ordering, values))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == 'previous':
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        next_cursor = self.encode_cursor('next', rows[-1]) if has_next and rows else None
+        previous_cursor = self.encode_cursor('previous', rows[0]) if has_previous and rows else None
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+    def cursor_before(self, obj):
+        # obj 부터 시작하는 페이지의 cursor (obj 바로 앞 row 다음부터). obj 가 맨 앞이면 None
+        values = [getattr(obj, field.lstrip('-')) for field in self.ordering]
+        ordering = [reverse(f) for f in self.ordering]
+        previous = self.queryset.order_by(*ordering).filter(self.build_filter(ordering, values)).first()
+        return self.encode_cursor('next', previous) if previous is not None else None
+
+    def build_filter(self, ordering, values):
+        # (a, b, c) > (x, y, z)  ==  a > x  or (a = x and b > y)  or (a = x and b = y and c > z)
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = '{}__lt' if field.startswith('-') else '{}__gt'
+            condition |= equal & Q(**{lookup.format(name): value})
+            equal &= Q(**{name: value})
+
+        # OR 만 있으면 sqlite 가 index 의 범위검색을 못하므로 첫번째 key 의 범위를 따로 걸어준다
+        first = ordering[0]
+        bound = '{}__lte' if first.startswith('-') else '{}__gte'
+        return Q(**{bound.format(first.lstrip('-')): values[0]}) & condition
+
+    def encode_cursor(self, direction, obj):
+        values = [self.serialize(getattr(obj, field.lstrip('-'))) for field in self.ordering]
+        payload = json.dumps({'d': direction[0], 'v': values})
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            direction = {'n': 'next', 'p': 'previous'}[payload['d']]
+            values = payload['v']
+        except (ValueError, KeyError, TypeError, UnicodeError):
+            raise InvalidCursor(cursor)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor(cursor)
+        # 조작된 값이 ORM 까지 가서 500 이 되지 않도록 각 field 의 type 으로 바꿔본다
+        try:
+            values = [self.get_field(field).to_python(value) for field, value in zip(self.ordering, values)]
+        except (ValidationError, ValueError, TypeError):
+            raise InvalidCursor(cursor)
+        if None in values:
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def get_field(self, field):
+        # annotate 한 값 (search_rank 등) 으로 정렬할 수도 있다
+        name = field.lstrip('-')
+        if name in self.queryset.query.annotations:
+            return self.queryset.query.annotations[name].output_field
+        opts = self.queryset.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    @staticmethod
+    def serialize(value):
+        # DjangoJSONEncoder 는 microsecond 를 잘라버리므로 직접 isoformat 으로 바꾼다
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        return value
+
+
+def reverse(field):
+    return field[1:] if field.startswith('-') else '-' + field
+
+
+class CursorPaginationMixin(object):
+    """
+    settings.BLOG_CURSOR_PAGINATION 이 True 이면 ListView 의 page 번호 대신 ?cursor= 로 페이지를 넘긴다.
+    """
+    cursor_kwarg = 'cursor'
+
+    def use_cursor_pagination(self):
+        return getattr(settings, 'BLOG_CURSOR_PAGINATION', False)
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super(CursorPaginationMixin, self).paginate_queryset(queryset, page_size)
+
+        paginator = CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        return paginator, page, page.object_list, page.has_other_pages()
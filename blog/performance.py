@@ -0,0 +1,194 @@
+import bisect
+import json
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('blog.performance')
+
+# 응답시간 histogram 의 구간 (ms). 마지막 구간은 그 이상 전부
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class RequestMetrics(object):
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.render_started = None
+        self.queries = Counter()
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicate_count(self):
+        # 같은 sql 을 같은 params 로 두번 이상 실행한 횟수
+        return sum(count - 1 for count in self.queries.values())
+
+    def duplicates(self, limit=3):
+        return [(sql, count) for (alias, sql, params), count in self.queries.most_common(limit) if count > 1]
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries[(context['connection'].alias, sql, repr(params))] += 1
+
+    def start_render(self):
+        self.render_started = time.perf_counter()
+
+    def end_render(self, response):
+        self.render_time += time.perf_counter() - self.render_started
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ', '.join([
+            'total;dur={:.1f}'.format(self.total * 1000),
+            'db;dur={:.1f};desc="{} queries"'.format(self.db_time * 1000, self.query_count),
+            'render;dur={:.1f}'.format(self.render_time * 1000),
+            'dup;desc="{} duplicate queries"'.format(self.duplicate_count),
+        ])
+
+
+class ViewStats(object):
+    """
+    view 하나의 최근 요청들 (최대 BLOG_PERF_SAMPLES 개) 을 가지고 있다가 요약해서 돌려준다.
+    """
+
+    def __init__(self, size):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, metrics):
+        self.count += 1
+        self.samples.append((
+            metrics.total * 1000, metrics.db_time * 1000, metrics.render_time * 1000,
+            metrics.query_count, metrics.duplicate_count,
+        ))
+
+    def summary(self):
+        totals = sorted(sample[0] for sample in self.samples)
+        n = len(totals)
+        histogram = [0] * (len(BUCKETS) + 1)
+        for value in totals:
+            histogram[bisect.bisect_left(BUCKETS, value)] += 1
+
+        def average(index):
+            return round(sum(sample[index] for sample in self.samples) / n, 2)
+
+        def percentile(p):
+            return round(totals[min(n - 1, int(n * p))], 2)
+
+        return {
+            'requests': self.count,
+            'samples': n,
+            'total_ms': {'p50': percentile(0.5), 'p90': percentile(0.9), 'p99': percentile(0.99),
+                         'max': round(totals[-1], 2)},
+            'avg_db_ms': average(1),
+            'avg_render_ms': average(2),
+            'avg_queries': average(3),
+            'avg_duplicate_queries': average(4),
+            'histogram': dict(zip(['<={}ms'.format(b) for b in BUCKETS] + ['>{}ms'.format(BUCKETS[-1])], histogram)),
+        }
+
+
+class PerformanceStats(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def add(self, view_name, metrics):
+        with self.lock:
+            stats = self.views.get(view_name)
+            if stats is None:
+                stats = self.views[view_name] = ViewStats(getattr(settings, 'BLOG_PERF_SAMPLES', 1000))
+            stats.add(metrics)
+
+    def summary(self):
+        with self.lock:
+            return {name: stats.summary() for name, stats in sorted(self.views.items())}
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+
+stats = PerformanceStats()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    func = getattr(match.func, 'view_class', match.func)
+    return '{}.{}'.format(func.__module__, func.__name__)
+
+
+class PerformanceMiddleware(object):
+    """
+    요청마다 전체 시간, DB query 수 / 시간, 중복 query, template 렌더링 시간을 재서
+    view 별로 모아둔다 (/blog/_perf/ 에서 확인). DEBUG 이거나 staff 의 요청이면 Server-Timing header 로도 돌려준다.
+    StreamingHttpResponse 는 body 를 보내는 동안의 query 는 세지 않는다.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'BLOG_PERF_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        request._perf_metrics = metrics
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics.record_query))
+            response = self.get_response(request)
+        metrics.finish()
+
+        if self.show_server_timing(request):
+            response['Server-Timing'] = metrics.server_timing()
+        name = view_name(request)
+        if name is not None:
+            stats.add(name, metrics)
+            if getattr(settings, 'BLOG_PERF_LOG', False):
+                self.log(request, response, name, metrics)
+        return response
+
+    def show_server_timing(self, request):
+        # query 수와 시간은 내부 정보이므로 아무에게나 보여주지 않는다
+        user = getattr(request, 'user', None)
+        return settings.DEBUG or (user is not None and user.is_staff)
+
+    def process_template_response(self, request, response):
+        # TemplateResponse 는 이 다음에 render() 되므로 render 가 끝났을 때의 시간과 비교한다
+        metrics = request._perf_metrics
+        metrics.start_render()
+        response.add_post_render_callback(metrics.end_render)
+        return response
+
+    def log(self, request, response, name, metrics):
+        logger.info(json.dumps({
+            'view': name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(metrics.total * 1000, 2),
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'render_ms': round(metrics.render_time * 1000, 2),
+            'queries': metrics.query_count,
+            'duplicate_queries': metrics.duplicate_count,
+            'duplicates': [{'sql': sql, 'count': count} for sql, count in metrics.duplicates()],
+        }, ensure_ascii=False))
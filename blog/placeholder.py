@@ -0,0 +1,92 @@
+import colorsys
+import hashlib
+import os
+import random
+import re
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core import signing
+from PIL import Image, ImageDraw
+
+WIDTH = 750
+HEIGHT = 300
+UNCATEGORIZED_COLOR = '6c757d'
+KEY_RE = re.compile(r'^([0-9a-f]{6})-([0-9a-f]{10})$')
+
+
+def get_signer():
+    return signing.Signer(salt='blog.placeholder')
+
+
+def make_key(post):
+    # key 에 색과 무늬의 seed 가 모두 들어 있으므로 이미지를 만들 때 DB 를 볼 필요가 없다.
+    # 만든 이미지는 디스크에 남으므로 아무 key 로나 만들 수 없도록 서명한다
+    if post.category_id is None:
+        color = UNCATEGORIZED_COLOR
+    else:
+        color = hashlib.sha1(post.category.slug.encode('utf-8')).hexdigest()[:6]
+    seed = hashlib.sha1(post.title.encode('utf-8')).hexdigest()[:10]
+    return get_signer().sign('{}-{}'.format(color, seed))
+
+
+def unsign(signed_key):
+    # 서명이 맞고 형식이 맞으면 (디스크에 쓸) key 를, 아니면 None 을 돌려준다
+    try:
+        key = get_signer().unsign(signed_key)
+    except signing.BadSignature:
+        return None
+    return key if KEY_RE.match(key) else None
+
+
+def get_root():
+    return getattr(settings, 'BLOG_PLACEHOLDER_ROOT', os.path.join(settings.MEDIA_ROOT, 'placeholders'))
+
+
+def base_color(color):
+    if color == UNCATEGORIZED_COLOR:
+        return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+    # category 마다 색상(hue)만 다르고 채도/명도는 같게 해서 너무 튀지 않게 한다
+    hue = int(color, 16) % 360 / 360.0
+    return tuple(int(c * 255) for c in colorsys.hsv_to_rgb(hue, 0.45, 0.85))
+
+
+def render(key):
+    color, seed = KEY_RE.match(key).groups()
+    r, g, b = base_color(color)
+    rng = random.Random(int(seed, 16))
+
+    image = Image.new('RGB', (WIDTH, HEIGHT), (r, g, b))
+    draw = ImageDraw.Draw(image, 'RGBA')
+    for _ in range(12):
+        x = rng.randint(-100, WIDTH)
+        y = rng.randint(-100, HEIGHT)
+        size = rng.randint(40, 220)
+        shade = rng.choice((255, 0))
+        draw.ellipse((x, y, x + size, y + size), fill=(shade, shade, shade, rng.randint(20, 60)))
+
+    buffer = BytesIO()
+    image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def get_image(key):
+    """
+    만들어 둔 이미지가 있으면 디스크에서 읽고, 없으면 그려서 저장한다.
+    """
+    path = os.path.join(get_root(), '{}.png'.format(key))
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    data = render(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # 동시에 같은 이미지를 만드는 요청이 있어도 깨진 파일이 보이지 않도록 rename 으로 바꿔 넣는다
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return data
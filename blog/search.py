@@ -0,0 +1,152 @@
+import re
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Case, Count, IntegerField, Sum, When
+
+from .models import Post, SearchToken
+
+FTS_TABLE = 'blog_post_fts'
+TITLE_WEIGHT = 10
+MAX_TOKEN_LENGTH = 40
+SEARCH_RESULT_LIMIT = 1000
+
+# 한글은 조사가 붙어서 ("장고를", "장고는") 단어 단위로 자르면 검색이 안 되므로 bigram 으로 색인한다
+TOKEN_RE = re.compile(r'[가-힣]+|(?:(?![가-힣])\w)+')
+HANGUL_RE = re.compile(r'[가-힣]')
+
+_fts_tables = {}
+
+
+def tokenize(text):
+    tokens = []
+    for word in TOKEN_RE.findall(text.lower()):
+        if HANGUL_RE.match(word) and len(word) > 2:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word[:MAX_TOKEN_LENGTH])
+    return tokens
+
+
+def get_backend(using=None):
+    using = using or router.db_for_write(Post)
+    backend = getattr(settings, 'BLOG_SEARCH_BACKEND', 'auto')
+    if backend == 'auto':
+        return 'fts5' if fts5_available(using) else 'orm'
+    return backend
+
+
+def fts5_available(using):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    key = (using, connection.settings_dict['NAME'])
+    if key not in _fts_tables:
+        _fts_tables[key] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[key]
+
+
+def index_post(post, using=None):
+    using = using or router.db_for_write(Post)
+    if get_backend(using) == 'fts5':
+        with connections[using].cursor() as cursor:
+            cursor.execute('DELETE FROM {} WHERE rowid = %s'.format(FTS_TABLE), [post.pk])
+            cursor.execute(
+                'INSERT INTO {}(rowid, title, content) VALUES (%s, %s, %s)'.format(FTS_TABLE),
+                [post.pk, ' '.join(tokenize(post.title)), ' '.join(tokenize(post.content))],
+            )
+    else:
+        with transaction.atomic(using=using):
+            SearchToken.objects.using(using).filter(post_id=post.pk).delete()
+            SearchToken.objects.using(using).bulk_create(build_tokens(post))
+
+
+def unindex_post(post, using=None):
+    using = using or router.db_for_write(Post)
+    if get_backend(using) == 'fts5':
+        with connections[using].cursor() as cursor:
+            cursor.execute('DELETE FROM {} WHERE rowid = %s'.format(FTS_TABLE), [post.pk])
+    # orm 색인은 FK cascade 로 같이 지워진다
+
+
+def build_tokens(post):
+    weights = {}
+    for token in tokenize(post.title):
+        weights[token] = weights.get(token, 0) + TITLE_WEIGHT
+    for token in tokenize(post.content):
+        weights[token] = weights.get(token, 0) + 1
+    return [
+        SearchToken(post_id=post.pk, token=token, weight=weight)
+        for token, weight in weights.items()
+    ]
+
+
+def rebuild_index(using=None, batch_size=500):
+    using = using or router.db_for_write(Post)
+    backend = get_backend(using)
+    posts = Post.objects.using(using).only('pk', 'title', 'content').iterator()
+
+    with transaction.atomic(using=using):
+        if backend == 'fts5':
+            with connections[using].cursor() as cursor:
+                cursor.execute('DELETE FROM {}'.format(FTS_TABLE))
+                rows = []
+                for post in posts:
+                    rows.append([post.pk, ' '.join(tokenize(post.title)), ' '.join(tokenize(post.content))])
+                    if len(rows) >= batch_size:
+                        _insert_fts_rows(cursor, rows)
+                        rows = []
+                _insert_fts_rows(cursor, rows)
+        else:
+            SearchToken.objects.using(using).all().delete()
+            tokens = []
+            for post in posts:
+                tokens.extend(build_tokens(post))
+                if len(tokens) >= batch_size:
+                    SearchToken.objects.using(using).bulk_create(tokens)
+                    tokens = []
+            SearchToken.objects.using(using).bulk_create(tokens)
+
+
+def _insert_fts_rows(cursor, rows):
+    if rows:
+        cursor.executemany(
+            'INSERT INTO {}(rowid, title, content) VALUES (%s, %s, %s)'.format(FTS_TABLE), rows
+        )
+
+
+def search_post_ids(q, using=None, limit=SEARCH_RESULT_LIMIT):
+    using = using or router.db_for_read(Post)
+    tokens = list(dict.fromkeys(tokenize(q)))
+    if not tokens:
+        return []
+
+    if get_backend(using) == 'fts5':
+        match = ' '.join('"{}"'.format(token) for token in tokens)
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid FROM {0} WHERE {0} MATCH %s '
+                'ORDER BY bm25({0}, %s, 1.0) LIMIT %s'.format(FTS_TABLE),
+                [match, float(TITLE_WEIGHT), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    rows = SearchToken.objects.using(using) \
+        .filter(token__in=tokens) \
+        .values('post_id') \
+        .annotate(matched=Count('token'), score=Sum('weight')) \
+        .filter(matched=len(tokens)) \
+        .order_by('-score', '-post_id')[:limit]
+    return [row['post_id'] for row in rows]
+
+
+def search_posts(q, using=None):
+    # 순위 순서를 유지한 queryset 을 돌려준다
+    post_ids = search_post_ids(q, using=using)
+    if not post_ids:
+        return Post.objects.none()
+    ranking = Case(
+        *[When(pk=pk, then=rank) for rank, pk in enumerate(post_ids)],
+        output_field=IntegerField()
+    )
+    return Post.objects.filter(pk__in=post_ids).annotate(search_rank=ranking).order_by('search_rank')
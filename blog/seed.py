@@ -0,0 +1,114 @@
+import datetime
+import random
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import comment_counts, excerpts, page_cache, search, sidebar, suggest, tag_stats
+from .models import Post, Category, Tag, Comment
+
+WORDS = [
+    'django', 'python', 'search', 'index', 'query', 'template', 'cache', 'model',
+    'view', 'server', 'database', 'deploy', 'static', 'markdown', 'feed', 'sitemap',
+    '장고', '파이썬', '블로그', '검색', '데이터베이스', '서버', '만들기', '배포',
+] + ['word{}'.format(i) for i in range(2000)]
+
+BATCH_SIZE = 500
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def markdown_body(rng, paragraphs):
+    parts = ['# ' + sentence(rng, 4)]
+    for _ in range(paragraphs):
+        parts.append(sentence(rng, rng.randint(30, 80)))
+        if rng.random() < 0.3:
+            parts.append('```python\nprint("{}")\n```'.format(sentence(rng, 3)))
+    return '\n\n'.join(parts)
+
+
+def bulk_create(model, objects):
+    for i in range(0, len(objects), BATCH_SIZE):
+        model.objects.bulk_create(objects[i:i + BATCH_SIZE])
+
+
+@contextmanager
+def without_auto_now_add(model, field_name):
+    # 게시일을 흩어놓기 위해 auto_now_add 를 잠깐 끈다
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+@transaction.atomic
+def seed(posts=1000, comments_per_post=5, tags=50, categories=8, authors=5, tags_per_post=3, random_seed=0):
+    """
+    benchmark 용 데이터를 bulk_create 로 만든다. signal 을 타지 않으므로
+    excerpt, 검색 색인, tag 통계, 댓글 수, sidebar / page cache 는 마지막에 한번에 다시 만든다.
+    """
+    rng = random.Random(random_seed)
+    now = timezone.now()
+    # 여러번 실행해도 이름 / slug 가 겹치지 않도록
+    prefix = 's{:x}'.format(int(now.timestamp() * 1000000))
+
+    bulk_create(User, [User(username='{}-author-{}'.format(prefix, i)) for i in range(authors)])
+    author_ids = list(User.objects.filter(username__startswith=prefix + '-author-').values_list('pk', flat=True))
+
+    bulk_create(Category, [
+        Category(name='{} {}'.format(prefix, i), slug='{}-category-{}'.format(prefix, i)) for i in range(categories)
+    ])
+    category_ids = list(Category.objects.filter(slug__startswith=prefix).values_list('pk', flat=True))
+    bulk_create(Tag, [Tag(name='{} tag {}'.format(prefix, i), slug='{}-tag-{}'.format(prefix, i)) for i in range(tags)])
+    tag_ids = list(Tag.objects.filter(slug__startswith=prefix).values_list('pk', flat=True))
+
+    first_post = Post.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    with without_auto_now_add(Post, 'created'):
+        bulk_create(Post, [
+            Post(
+                title=sentence(rng, 3)[:30],
+                content=markdown_body(rng, rng.randint(2, 6)),
+                author_id=rng.choice(author_ids),
+                # 10% 는 미분류
+                category_id=rng.choice(category_ids) if category_ids and rng.random() > 0.1 else None,
+                created=now - datetime.timedelta(minutes=posts - i),
+            )
+            for i in range(posts)
+        ])
+    post_ids = list(Post.objects.filter(pk__gt=first_post).values_list('pk', flat=True))
+
+    through = Post.tags.through
+    links = []
+    for post_id in post_ids:
+        for tag_id in rng.sample(tag_ids, min(len(tag_ids), rng.randint(0, tags_per_post))):
+            links.append(through(post_id=post_id, tag_id=tag_id))
+    bulk_create(through, links)
+
+    comments = []
+    for post_id in post_ids:
+        for _ in range(rng.randint(0, comments_per_post * 2)):
+            comments.append(Comment(post_id=post_id, author_id=rng.choice(author_ids), text=sentence(rng, 12)))
+    bulk_create(Comment, comments)
+
+    search.rebuild_index()
+    tag_stats.rebuild()
+    comment_counts.reconcile(Post.objects.filter(pk__gt=first_post))
+    excerpts.rebuild(Post.objects.filter(pk__gt=first_post))
+    sidebar.invalidate()
+    suggest.invalidate()
+    # 모든 페이지의 key 에 sidebar group 이 들어 있다
+    page_cache.invalidate(page_cache.SIDEBAR_GROUP)
+
+    return {
+        'authors': len(author_ids),
+        'categories': len(category_ids),
+        'tags': len(tag_ids),
+        'posts': len(post_ids),
+        'comments': len(comments),
+    }
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count
+
+from . import tag_stats
+from .models import Post, Category
+
+SIDEBAR_CACHE_KEY = 'blog:sidebar'
+# 마지막으로 그린 tag cloud 에 보이는 것들 (tag, 이름, 크기)
+TAG_CLOUD_KEY = 'blog:sidebar-tag-cloud'
+
+
+def get_cache():
+    return caches[getattr(settings, 'BLOG_SIDEBAR_CACHE', 'default')]
+
+
+def get_sidebar_data():
+    cache = get_cache()
+    data = cache.get(SIDEBAR_CACHE_KEY)
+    if data is None:
+        data = build_sidebar_data()
+        cache.set(SIDEBAR_CACHE_KEY, data, getattr(settings, 'BLOG_SIDEBAR_CACHE_TIMEOUT', 60 * 60))
+    return data
+
+
+def build_sidebar_data():
+    # 미분류(category_id=None)까지 한번의 group by 로 센다
+    counts = dict(
+        Post.objects.order_by().values_list('category_id').annotate(num_posts=Count('pk'))
+    )
+    category_list = list(Category.objects.all())
+    for category in category_list:
+        category.num_posts = counts.get(category.pk, 0)
+
+    tag_cloud = tag_stats.tag_cloud()
+    get_cache().set(TAG_CLOUD_KEY, cloud_signature(tag_cloud), None)
+    return {
+        'category_list': category_list,
+        'posts_without_category': counts.get(None, 0),
+        'tag_cloud': tag_cloud,
+    }
+
+
+def cloud_signature(tag_cloud):
+    return [(item['tag'].pk, item['tag'].name, item['tag'].slug, item['level']) for item in tag_cloud]
+
+
+def tag_cloud_changed():
+    """
+    tag cloud 에 보이는 것 (어떤 tag 가 어떤 이름과 크기로) 이 바뀌었으면 sidebar cache 를 지우고 True 를 돌려준다.
+    게시물 수가 바뀌어도 cloud 의 순위나 크기가 그대로이면 모든 페이지의 sidebar 를 다시 그릴 필요가 없다.
+    """
+    cache = get_cache()
+    signature = cloud_signature(tag_stats.tag_cloud())
+    if cache.get(TAG_CLOUD_KEY) == signature:
+        return False
+    cache.set(TAG_CLOUD_KEY, signature, None)
+    invalidate()
+    return True
+
+
+def invalidate():
+    get_cache().delete(SIDEBAR_CACHE_KEY)
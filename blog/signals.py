@@ -0,0 +1,242 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.core.signals import request_started
+from django.db import transaction
+from django.dispatch import receiver
+
+from . import comment_counts, db_router, excerpts, images, markdown_cache, page_cache, search, sidebar, suggest, tag_stats
+from .models import Post, Category, Tag, Comment
+
+
+@receiver(pre_save, sender=Post)
+def fill_post_excerpt(sender, instance, **kwargs):
+    instance._content_html = excerpts.fill(instance)
+
+
+@receiver(post_save, sender=Post)
+def refresh_post_markdown(sender, instance, **kwargs):
+    markdown_cache.refresh_html(instance, instance.content, getattr(instance, '_content_html', None))
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_post(instance, using=kwargs.get('using'))
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance, using=kwargs.get('using'))
+
+
+@receiver(post_save, sender=Comment)
+def refresh_comment_markdown(sender, instance, **kwargs):
+    markdown_cache.refresh_html(instance, instance.text)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_sidebar(sender, **kwargs):
+    sidebar.invalidate()
+
+
+@receiver(post_save, sender=Comment)
+def update_post_comment_stats(sender, instance, created, **kwargs):
+    comment_counts.comment_saved(instance, created)
+
+
+@receiver(post_delete, sender=Comment)
+def update_post_comment_stats_on_delete(sender, instance, **kwargs):
+    comment_counts.comment_deleted(instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    instance._old_category_id = None
+    instance._old_head_image = ''
+    if instance.pk is not None:
+        old = Post.objects.filter(pk=instance.pk).values('category_id', 'head_image', 'version').first()
+        if old is not None:
+            instance._old_category_id = old['category_id']
+            instance._old_head_image = old['head_image']
+            # 댓글이나 tag 가 바뀌면서 DB 의 version 만 올라갔을 수 있으므로 DB 값에서 올린다
+            instance.version = old['version'] + 1
+    if instance.head_image.name != instance._old_head_image:
+        instance.head_image_variants = ''
+
+
+@receiver(post_save, sender=Post)
+def process_head_image(sender, instance, **kwargs):
+    name = instance.head_image.name
+    if name and name != getattr(instance, '_old_head_image', ''):
+        pk = instance.pk
+        transaction.on_commit(lambda: images.schedule(pk, name))
+
+
+@receiver(post_save, sender=Post)
+def invalidate_post_pages(sender, instance, created, **kwargs):
+    if created or instance.category_id != getattr(instance, '_old_category_id', None):
+        # category 별 게시물 수가 바뀌면 모든 페이지의 sidebar 가 바뀐다
+        page_cache.invalidate(page_cache.SIDEBAR_GROUP)
+    else:
+        page_cache.invalidate(*page_cache.groups_for_posts([instance.pk]))
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_all_sidebars(sender, **kwargs):
+    page_cache.invalidate(page_cache.SIDEBAR_GROUP)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    # 목록의 카드에도 댓글 수가 보이므로 상세 페이지만이 아니라 카드가 보이는 목록들도 다시 그린다
+    page_cache.invalidate(*page_cache.groups_for_posts([instance.post_id]))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_tag_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    tag_stats.posts_changed(instance, action, reverse, pk_set)
+
+
+@receiver(pre_delete, sender=Post)
+def update_tag_stats_on_delete(sender, instance, **kwargs):
+    instance._deleted_tag_ids = tag_stats.post_deleted(instance)
+
+
+@receiver(post_save, sender=Tag)
+def create_tag_stat(sender, instance, created, **kwargs):
+    if created:
+        tag_stats.ensure_stats([instance.pk])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def bump_versions_on_tag_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # post 카드 (fragment cache) 와 ETag 가 post.version 을 key 로 쓴다
+    if action not in ('post_add', 'post_remove', 'pre_clear') or pk_set == set():
+        return
+    if not reverse:
+        Post.objects.filter(pk=instance.pk).bump_version()
+    elif pk_set is not None:
+        Post.objects.filter(pk__in=pk_set).bump_version()
+    else:
+        Post.objects.filter(tags=instance).bump_version()
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def bump_versions_on_category_change(sender, instance, created=False, **kwargs):
+    if not created:
+        Post.objects.filter(category=instance).bump_version()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def bump_versions_on_tag_rename(sender, instance, created=False, **kwargs):
+    if not created:
+        Post.objects.filter(tags=instance).bump_version()
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_post_tag_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # clear() 는 pk_set 이 없으므로 지워질 관계를 미리 기억해 둔다
+        related = instance.post_set if reverse else instance.tags
+        instance._cleared_pks = set(related.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_pks', None)
+    elif action not in ('post_add', 'post_remove'):
+        return
+    if not pk_set:
+        return
+
+    if reverse:
+        # tag.post_set.add(...)
+        post_ids = pk_set
+        slugs = [instance.slug]
+    else:
+        post_ids = [instance.pk]
+        slugs = Tag.objects.filter(pk__in=pk_set).values_list('slug', flat=True)
+    groups = [page_cache.TAG_INDEX_GROUP] + [page_cache.tag_group(slug) for slug in slugs]
+    page_cache.invalidate(*(groups + page_cache.groups_for_posts(post_ids)))
+
+
+@receiver(pre_save, sender=Tag)
+def remember_tag_slug(sender, instance, **kwargs):
+    instance._old_slug = None
+    if instance.pk is not None:
+        instance._old_slug = Tag.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def invalidate_tag_pages(sender, instance, **kwargs):
+    groups = [page_cache.TAG_INDEX_GROUP, page_cache.tag_group(instance.slug)]
+    if getattr(instance, '_old_slug', None):
+        groups.append(page_cache.tag_group(instance._old_slug))
+    post_ids = list(instance.post_set.values_list('pk', flat=True)) if instance.pk else []
+    if post_ids:
+        groups += page_cache.groups_for_posts(post_ids)
+    page_cache.invalidate(*groups)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_cloud(sender, **kwargs):
+    if kwargs.get('action', 'post_add') not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    # tag cloud 는 모든 페이지의 sidebar 에 있으므로, cloud 에 보이는 것이 바뀌었을 때만 모든 페이지를 다시 그린다
+    if sidebar.tag_cloud_changed():
+        page_cache.invalidate(page_cache.SIDEBAR_GROUP)
+
+
+@receiver(post_save, sender=Post)
+def update_suggest_post(sender, instance, **kwargs):
+    suggest.post_saved(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_suggest_post(sender, instance, **kwargs):
+    suggest.post_deleted(instance, getattr(instance, '_deleted_tag_ids', ()))
+
+
+@receiver(post_save, sender=Tag)
+def update_suggest_tag(sender, instance, **kwargs):
+    suggest.tag_saved(instance)
+
+
+@receiver(post_delete, sender=Tag)
+def remove_suggest_tag(sender, instance, **kwargs):
+    suggest.tag_deleted(instance)
+
+
+@receiver(post_save, sender=Category)
+def update_suggest_category(sender, instance, **kwargs):
+    suggest.category_saved(instance)
+
+
+@receiver(post_delete, sender=Category)
+def remove_suggest_category(sender, instance, **kwargs):
+    suggest.category_deleted(instance)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_suggest_tag_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    # tag 는 게시물이 많은 순서로 제안한다. clear() 는 pk_set 이 없으므로 pre_clear 에서 지워질 tag 를 기억해 둔다
+    if action == 'pre_clear':
+        instance._cleared_tag_ids = [instance.pk] if reverse else list(instance.tags.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        tag_ids = getattr(instance, '_cleared_tag_ids', ())
+        if tag_ids:
+            suggest.tag_counts_changed(tag_ids)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        suggest.tag_counts_changed([instance.pk] if reverse else pk_set)
+
+
+@receiver(request_started)
+def check_db_connections(sender, **kwargs):
+    db_router.check_connections()
@@ -0,0 +1,118 @@
+import hashlib
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import F, Max
+
+from . import page_cache
+from .models import Post, Category, Tag
+
+# Post 가 생기거나 바뀌면 list group 이, 지워지거나 category / tag 가 바뀌면 sidebar group 이 올라간다.
+# 댓글도 Post.modified (lastmod) 를 바꾸므로 list group 을 올린다 (signals.invalidate_comment_pages)
+GROUPS = [page_cache.SIDEBAR_GROUP, page_cache.LIST_GROUP]
+
+HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+CHUNK_SIZE = 500
+
+
+def get_shard_size():
+    # 한 sitemap 파일에 넣을 pk 범위. sitemap 규약의 최대치는 50000 개
+    return getattr(settings, 'BLOG_SITEMAP_SHARD_SIZE', 10000)
+
+
+class Section(object):
+    """
+    pk 범위로 나눈 shard 마다 sitemap 파일 하나. shard 의 구성원이 pk 로 정해지므로
+    새 글이 생겨도 예전 shard 의 내용(과 cache)이 밀리지 않는다.
+    """
+    # Django 의 Sitemap 처럼 subclass 에서 class 속성으로 정한다. 쓸 때마다 filter() 로 복사되므로 재사용해도 된다
+    queryset = None
+    lastmod_field = 'modified'
+
+    def __init__(self, name):
+        self.name = name
+
+    def shards(self):
+        # [(shard 번호, lastmod)] : 비어 있지 않은 shard 만
+        size = get_shard_size()
+        rows = self.queryset.model.objects.order_by() \
+            .annotate(shard=F('pk') / size) \
+            .values('shard') \
+            .annotate(lastmod=Max(self.lastmod_field)) \
+            .order_by('shard')
+        return [(int(row['shard']), row['lastmod']) for row in rows]
+
+    def items(self, shard):
+        size = get_shard_size()
+        return self.queryset \
+            .filter(pk__gte=shard * size, pk__lt=(shard + 1) * size) \
+            .order_by('pk') \
+            .iterator()
+
+
+class PostSection(Section):
+    queryset = Post.objects.annotate(lastmod=F('modified')).only('pk', 'modified')
+
+
+class CategorySection(Section):
+    queryset = Category.objects.annotate(lastmod=Max('post__modified')).only('pk', 'slug')
+    lastmod_field = 'post__modified'
+
+
+class TagSection(Section):
+    queryset = Tag.objects.annotate(lastmod=Max('post__modified')).only('pk', 'slug')
+    lastmod_field = 'post__modified'
+
+
+SECTIONS = {
+    'posts': PostSection('posts'),
+    'categories': CategorySection('categories'),
+    'tags': TagSection('tags'),
+}
+
+
+def format_lastmod(value):
+    return '<lastmod>{}</lastmod>'.format(value.isoformat(timespec='seconds')) if value else ''
+
+
+def index(build_absolute_uri):
+    yield HEADER + '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for name, section in SECTIONS.items():
+        for shard, lastmod in section.shards():
+            loc = build_absolute_uri('/sitemap-{}-{}.xml'.format(name, shard))
+            yield '<sitemap><loc>{}</loc>{}</sitemap>\n'.format(escape(loc), format_lastmod(lastmod))
+    yield '</sitemapindex>\n'
+
+
+def urlset(section, shard, build_absolute_uri):
+    yield HEADER + '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    lines = []
+    for obj in section.items(shard):
+        loc = build_absolute_uri(obj.get_absolute_url())
+        lines.append('<url><loc>{}</loc>{}</url>\n'.format(escape(loc), format_lastmod(obj.lastmod)))
+        if len(lines) == CHUNK_SIZE:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines) + '</urlset>\n'
+
+
+def get_timeout():
+    return getattr(settings, 'BLOG_SITEMAP_CACHE_TIMEOUT', 60 * 60 * 6)
+
+
+def cache_key(request):
+    # loc 에 host 가 들어가므로 host 도 key 에 넣는다
+    raw = '{}|{}|{}'.format(request.get_host(), request.path, page_cache.get_versions(GROUPS))
+    return 'blog:sitemap:{}'.format(hashlib.md5(raw.encode('utf-8')).hexdigest())
+
+
+def stream_and_cache(key, chunks):
+    """
+    chunks 를 그대로 흘려보내면서 모아 두었다가, 끝까지 보냈으면 cache 에 저장한다.
+    모으는 양은 shard 하나 (최대 BLOG_SITEMAP_SHARD_SIZE 개의 url) 로 제한된다.
+    """
+    collected = []
+    for chunk in chunks:
+        collected.append(chunk)
+        yield chunk
+    page_cache.get_cache().set(key, ''.join(collected), get_timeout())
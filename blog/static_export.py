@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import re
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.test import Client
+from django.test.utils import override_settings
+
+from . import feeds, sitemaps, sidebar
+from .models import Post, Category, Tag, TagStat
+from .views import PostList
+
+# 지난번 export 때 각 url 의 fingerprint 와 파일 경로. 다음 export 는 fingerprint 가 바뀐 url 만 다시 그린다
+MANIFEST_NAME = '.static-export.json'
+FEED_FORMATS = ('atom', 'rss', 'json')
+PAGE_LINK_RE = re.compile(r'href="\?page=(\d+)"')
+INDEX_NAMES = {
+    'text/html': 'index.html',
+    'application/atom+xml': 'index.xml',
+    'application/rss+xml': 'index.xml',
+    'application/xml': 'index.xml',
+    'application/feed+json': 'index.json',
+    'application/json': 'index.json',
+}
+
+
+def digest(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)] or [[]]
+
+
+def collect_pages():
+    """
+    export 할 url 과 그 페이지가 의존하는 row 들의 fingerprint 를 [(url, fingerprint)] 로 돌려준다.
+
+    모든 blog 페이지에는 sidebar (category 별 수, tag cloud) 가 들어가므로 sidebar 의 fingerprint 를 같이 넣는다.
+    댓글이 바뀌면 Post.version 이 올라가므로 댓글은 따로 보지 않는다.
+    """
+    categories = {c.pk: c for c in Category.objects.all()}
+    tags = {t.pk: t for t in Tag.objects.all()}
+    post_tags = {}
+    for post_id, tag_id in Post.tags.through.objects.values_list('post_id', 'tag_id'):
+        post_tags.setdefault(post_id, []).append(tags[tag_id])
+
+    data = sidebar.build_sidebar_data()
+    sidebar_fp = digest(
+        [(c.pk, c.name, c.slug, c.num_posts) for c in data['category_list']],
+        data['posts_without_category'],
+        sidebar.cloud_signature(data['tag_cloud']),
+    )
+
+    posts = []
+    posts_by_category = {}
+    posts_by_tag = {}
+    for post in Post.objects.select_related('category').only(
+        'pk', 'title', 'version', 'modified', 'comment_count', 'head_image', 'category__slug', 'category__name',
+    ).order_by('-created', '-pk').iterator():
+        post.tag_list = sorted(post_tags.get(post.pk, []), key=lambda t: t.pk)
+        post.fingerprint = digest(
+            post.pk, post.version, post.modified, post.comment_count,
+            (post.category.name, post.category.slug) if post.category_id else None,
+            [(t.name, t.slug) for t in post.tag_list],
+        )
+        posts.append(post)
+        posts_by_category.setdefault(post.category_id, []).append(post)
+        for tag in post.tag_list:
+            posts_by_tag.setdefault(tag.pk, []).append(post)
+
+    pages = [('/', 'redirect'), ('/about_me/', 'static')]
+    pages += list_pages('/blog/', posts, sidebar_fp)
+    pages += feed_pages('/blog/', posts, 'all')
+
+    for category in [None] + list(categories.values()):
+        base = '/blog/category/{}/'.format(category.slug if category else '_none')
+        category_posts = posts_by_category.get(category.pk if category else None, [])
+        info = (category.name, category.description) if category else None
+        pages += list_pages(base, category_posts, sidebar_fp, info)
+        pages += feed_pages(base, category_posts, info)
+
+    for tag in tags.values():
+        base = tag.get_absolute_url()
+        tag_posts = posts_by_tag.get(tag.pk, [])
+        pages += list_pages(base, tag_posts, sidebar_fp, tag.name)
+        pages += feed_pages(base, tag_posts, tag.name)
+
+    pages.append(('/blog/tags/', digest(
+        sidebar_fp, list(TagStat.objects.filter(post_count__gt=0).order_by('tag__name')
+                         .values_list('tag__name', 'tag__slug', 'post_count')),
+    )))
+
+    for post in posts:
+        pages.append((post.get_absolute_url(), digest(sidebar_fp, post.fingerprint)))
+        if not post.head_image:
+            # key 가 곧 이미지의 내용이다
+            url = post.get_placeholder_url()
+            pages.append((url, url))
+
+    pages += sitemap_pages(posts, posts_by_category, posts_by_tag, categories, tags)
+    # 같은 placeholder 를 쓰는 post 가 여럿일 수 있다
+    return list(dict(pages).items())
+
+
+def list_pages(base, posts, sidebar_fp, info=None):
+    page_list = chunks(posts, PostList.paginate_by)
+    pages = []
+    for number, page_posts in enumerate(page_list, 1):
+        url = base if number == 1 else '{}?page={}'.format(base, number)
+        pages.append((url, digest(sidebar_fp, info, number, len(page_list), [p.fingerprint for p in page_posts])))
+    return pages
+
+
+def feed_pages(base, posts, info):
+    fp = digest(info, [p.fingerprint for p in posts[:feeds.get_item_count()]])
+    return [('{}feed/{}/'.format(base, feed_format), fp) for feed_format in FEED_FORMATS]
+
+
+def sitemap_pages(posts, posts_by_category, posts_by_tag, categories, tags):
+    def fingerprints(posts):
+        return [p.fingerprint for p in posts]
+
+    size = sitemaps.get_shard_size()
+    shards = {}
+    for name, rows in (
+        ('posts', [(p.pk, p.fingerprint) for p in posts]),
+        ('categories', [(c.pk, c.slug, fingerprints(posts_by_category.get(c.pk, []))) for c in categories.values()]),
+        ('tags', [(t.pk, t.slug, fingerprints(posts_by_tag.get(t.pk, []))) for t in tags.values()]),
+    ):
+        for row in rows:
+            shards.setdefault('/sitemap-{}-{}.xml'.format(name, row[0] // size), []).append(row)
+
+    pages = [(url, digest(sorted(rows))) for url, rows in shards.items()]
+    pages.append(('/sitemap.xml', digest(sorted(fp for url, fp in pages))))
+    return pages
+
+
+def output_path(url, content_type):
+    # /blog/?page=2 -> blog/page/2/index.html,  /blog/feed/atom/ -> blog/feed/atom/index.xml
+    parts = urlsplit(url)
+    path = unquote(parts.path).lstrip('/')
+    page = re.match(r'page=(\d+)$', parts.query)
+    if page:
+        path += 'page/{}/'.format(page.group(1))
+    if path == '' or path.endswith('/'):
+        path += INDEX_NAMES.get(content_type.split(';')[0].strip(), 'index.html')
+    return path
+
+
+def rewrite_page_links(html, base):
+    # 정적 파일 서버는 query string 을 무시하므로 ?page=N 링크를 page/N/ 디렉토리로 바꾼다
+    def replace(match):
+        number = int(match.group(1))
+        return 'href="{}"'.format(base if number == 1 else '{}page/{}/'.format(base, number))
+    return PAGE_LINK_RE.sub(replace, html)
+
+
+def export_settings(host):
+    # 익명 사용자의 page cache 에 저장할 필요가 없고, 목록은 ?page=N 으로 그린다.
+    # 정적 사이트에는 /blog/<pk>/comments/ 와 /blog/suggest/ 가 없으므로 그것들을 부르지 않게 그린다 (BLOG_STATIC_EXPORT)
+    return override_settings(
+        BLOG_PAGE_CACHE_TIMEOUT=0, BLOG_CURSOR_PAGINATION=False, BLOG_STATIC_EXPORT=True, ALLOWED_HOSTS=[host],
+    )
+
+
+_client = None
+
+
+def init_worker(host):
+    # fork 된 process 에서 한번 불린다
+    global _client
+    export_settings(host).enable()
+    _client = Client(HTTP_HOST=host)
+
+
+def render_page(output_dir, url, client=None):
+    """
+    url 하나를 그려서 output_dir 아래에 저장하고 저장한 상대 경로를 돌려준다.
+    """
+    client = client or _client
+    response = client.get(url)
+    if response.status_code in (301, 302):
+        location = response['Location']
+        body = '<!DOCTYPE html><meta http-equiv="refresh" content="0; url={0}"><a href="{0}">{0}</a>\n' \
+            .format(location).encode('utf-8')
+        content_type = 'text/html'
+    elif response.status_code == 200:
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        content_type = response['Content-Type']
+        if content_type.startswith('text/html'):
+            base = urlsplit(url).path
+            body = rewrite_page_links(body.decode('utf-8'), base).encode('utf-8')
+    else:
+        raise RuntimeError('{} returned {}'.format(url, response.status_code))
+
+    path = output_path(url, content_type)
+    target = os.path.join(output_dir, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(body)
+    return path
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=0, sort_keys=True)
+
+
+def default_host():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+    return hosts[0] if hosts else 'localhost'
@@ -0,0 +1,275 @@
+import bisect
+import heapq
+import re
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Post, Category, Tag, TagStat
+from .page_cache import new_version
+
+# 이 process 의 index 가 만들어진 (또는 마지막으로 고쳐진) version. 다른 process 가 바꾸면 달라진다
+VERSION_KEY = 'blog:suggest-version'
+KINDS = ('posts', 'tags', 'categories')
+MAX_QUERY_LENGTH = 40
+RESULT_CACHE_SIZE = 1000
+# key 의 끝. 어떤 문자열이든 prefix + LAST_CHAR 보다 작으면 prefix 로 시작한다
+LAST_CHAR = '\U0010ffff'
+
+WORD_RE = re.compile(r'\w+')
+
+Entry = namedtuple('Entry', ['label', 'url', 'rank', 'keys'])
+
+
+def get_cache():
+    return caches[getattr(settings, 'BLOG_SUGGEST_CACHE', 'default')]
+
+
+def get_limit():
+    return getattr(settings, 'BLOG_SUGGEST_LIMIT', 5)
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def index_keys(text):
+    # "Django 배포하기" 를 "dja" 로도 "배포" 로도 찾을 수 있도록 단어가 시작하는 곳마다 key 를 만든다
+    return {text[match.start():] for match in WORD_RE.finditer(text)} or {text}
+
+
+class SuggestIndex(object):
+    """
+    종류 (posts, tags, categories) 마다 (key, pk, position) 를 정렬해 둔 list 와, 같은 자리에
+    (position, rank, pk) 를 넣은 list 를 가지고 있다. prefix 로 시작하는 key 들은 bisect 로 찾은 연속된 구간이고,
+    그 구간의 (position, rank, pk) 에서 가장 작은 것들이 제안할 항목이다.
+    position 은 처음부터 맞으면 0, 중간 단어부터 맞으면 1 이고 rank 는 작을수록 먼저 보여준다.
+    """
+
+    def __init__(self, version=None):
+        self.version = version
+        self.keys = {kind: [] for kind in KINDS}
+        self.order = {kind: [] for kind in KINDS}
+        self.entries = {}
+        self.results = {}
+        self.lock = threading.RLock()
+
+    def make_keys(self, pk, label):
+        text = normalize(label)
+        return [(key, pk, 0 if key == text else 1) for key in index_keys(text)]
+
+    def load(self, kind, rows):
+        # 처음 만들 때는 한번에 정렬한다
+        with self.lock:
+            pairs = []
+            for pk, label, url, rank in rows:
+                keys = self.make_keys(pk, label)
+                self.entries[(kind, pk)] = Entry(label, url, rank, keys)
+                pairs += [(key, (key[2], rank, pk)) for key in keys]
+            pairs += zip(self.keys[kind], self.order[kind])
+            pairs.sort()
+            self.keys[kind] = [key for key, order in pairs]
+            self.order[kind] = [order for key, order in pairs]
+            self.results.clear()
+
+    def forget_results(self, keys):
+        # 바뀐 key 들의 prefix 인 검색어의 결과만 버린다. 자주 치는 짧은 검색어는 대부분 그대로 남는다
+        stale = [query for query in self.results if any(key[0].startswith(query[0]) for key in keys)]
+        for query in stale:
+            del self.results[query]
+
+    def put(self, kind, pk, label, url, rank):
+        with self.lock:
+            self.remove(kind, pk)
+            keys = self.make_keys(pk, label)
+            for key in keys:
+                i = bisect.bisect_left(self.keys[kind], key)
+                self.keys[kind].insert(i, key)
+                self.order[kind].insert(i, (key[2], rank, pk))
+            self.entries[(kind, pk)] = Entry(label, url, rank, keys)
+            self.forget_results(keys)
+
+    def remove(self, kind, pk):
+        with self.lock:
+            entry = self.entries.pop((kind, pk), None)
+            if entry is None:
+                return
+            for key in entry.keys:
+                i = bisect.bisect_left(self.keys[kind], key)
+                if i < len(self.keys[kind]) and self.keys[kind][i] == key:
+                    del self.keys[kind][i]
+                    del self.order[kind][i]
+            self.forget_results(entry.keys)
+
+    def set_rank(self, kind, pk, rank):
+        with self.lock:
+            entry = self.entries.get((kind, pk))
+            if entry is not None and entry.rank != rank:
+                self.put(kind, pk, entry.label, entry.url, rank)
+
+    def search(self, prefix, limit):
+        prefix = normalize(prefix)[:MAX_QUERY_LENGTH]
+        if not prefix:
+            return {kind: [] for kind in KINDS}
+
+        with self.lock:
+            result = self.results.get((prefix, limit))
+            if result is not None:
+                return result
+
+            result = {}
+            for kind in KINDS:
+                keys = self.keys[kind]
+                start = bisect.bisect_left(keys, (prefix,))
+                end = bisect.bisect_left(keys, (prefix + LAST_CHAR,), start)
+                result[kind] = [
+                    {'label': self.entries[(kind, pk)].label, 'url': self.entries[(kind, pk)].url}
+                    for pk in self.best(self.order[kind][start:end], limit)
+                ]
+
+            if len(self.results) >= RESULT_CACHE_SIZE:
+                self.results.clear()
+            self.results[(prefix, limit)] = result
+            return result
+
+    @staticmethod
+    def best(candidates, limit):
+        # 한 제목이 여러 key 로 걸릴 수 있으므로 넉넉히 꺼내서 중복을 빼고, 그래도 모자라면 전부 정렬해서 고른다
+        wanted = limit * 2
+        if len(candidates) > wanted:
+            pks = unique_pks(heapq.nsmallest(wanted, candidates), limit)
+            if len(pks) == limit:
+                return pks
+        return unique_pks(sorted(candidates), limit)
+
+
+def unique_pks(ordered, limit):
+    pks = []
+    for position, rank, pk in ordered:
+        if pk not in pks:
+            pks.append(pk)
+            if len(pks) == limit:
+                break
+    return pks
+
+
+def post_rank(created):
+    # 최근 글이 먼저
+    return -created.timestamp()
+
+
+def tag_rank(post_count):
+    return -post_count
+
+
+def build(version=None):
+    index = SuggestIndex(version)
+    index.load('posts', [
+        (pk, title, '/blog/{}/'.format(pk), post_rank(created))
+        for pk, title, created in Post.objects.order_by().values_list('pk', 'title', 'created').iterator()
+    ])
+    counts = dict(TagStat.objects.values_list('tag_id', 'post_count'))
+    index.load('tags', [
+        (tag.pk, tag.name, tag.get_absolute_url(), tag_rank(counts.get(tag.pk, 0)))
+        for tag in Tag.objects.only('pk', 'name', 'slug').iterator()
+    ])
+    index.load('categories', [
+        (category.pk, category.name, category.get_absolute_url(), category.name)
+        for category in Category.objects.only('pk', 'name', 'slug').iterator()
+    ])
+    return index
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """
+    이 process 의 index 를 돌려준다. 다른 process 에서 바뀌었으면 (cache 의 version 이 다르면) 새로 만든다.
+    """
+    global _index
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if _index is not None and version is not None and _index.version == version:
+        return _index
+    with _lock:
+        if _index is None or version is None or _index.version != version:
+            if version is None:
+                cache.add(VERSION_KEY, new_version(), None)
+                version = cache.get(VERSION_KEY)
+            _index = build(version)
+        return _index
+
+
+def suggest(query, limit=None):
+    return get_index().search(query, limit or get_limit())
+
+
+def invalidate():
+    # bulk_create 처럼 signal 없이 바뀌었을 때. 모든 process 가 다음에 쓸 때 새로 만든다
+    get_cache().set(VERSION_KEY, new_version(), None)
+
+
+def _changed(apply):
+    # commit 된 뒤에 고친다. rollback 되면 이 process 의 index 에도 다른 process 에도 남지 않는다
+    transaction.on_commit(lambda: _apply(apply))
+
+
+def _apply(apply):
+    # 이 process 의 index 는 바로 고치고, 다른 process 는 version 이 바뀐 것을 보고 새로 만든다.
+    # 이미 뒤쳐진 index 는 고쳐도 다시 만들어야 하므로 그대로 둔다
+    cache = get_cache()
+    index = _index
+    current = index is not None and cache.get(VERSION_KEY) == index.version
+    version = new_version()
+    cache.set(VERSION_KEY, version, None)
+    if current:
+        apply(index)
+        index.version = version
+
+
+def post_saved(post):
+    _changed(lambda index: index.put('posts', post.pk, post.title, post.get_absolute_url(), post_rank(post.created)))
+
+
+def post_deleted(post, tag_ids=()):
+    def apply(index):
+        index.remove('posts', post.pk)
+        update_tag_ranks(index, tag_ids)
+    _changed(apply)
+
+
+def tag_saved(tag):
+    def apply(index):
+        count = TagStat.objects.filter(tag_id=tag.pk).values_list('post_count', flat=True).first() or 0
+        index.put('tags', tag.pk, tag.name, tag.get_absolute_url(), tag_rank(count))
+    _changed(apply)
+
+
+def tag_deleted(tag):
+    _changed(lambda index: index.remove('tags', tag.pk))
+
+
+def update_tag_ranks(index, tag_ids):
+    if not tag_ids:
+        return
+    for tag_id, count in TagStat.objects.filter(tag_id__in=list(tag_ids)).values_list('tag_id', 'post_count'):
+        index.set_rank('tags', tag_id, tag_rank(count))
+
+
+def tag_counts_changed(tag_ids):
+    _changed(lambda index: update_tag_ranks(index, tag_ids))
+
+
+def category_saved(category):
+    _changed(lambda index: index.put(
+        'categories', category.pk, category.name, category.get_absolute_url(), category.name,
+    ))
+
+
+def category_deleted(category):
+    _changed(lambda index: index.remove('categories', category.pk))
@@ -0,0 +1,97 @@
+import math
+
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Post, Tag, TagStat
+
+CLOUD_SIZE = 30
+CLOUD_LEVELS = 5
+
+
+def ensure_stats(tag_ids):
+    TagStat.objects.bulk_create([TagStat(tag_id=tag_id) for tag_id in tag_ids], ignore_conflicts=True)
+
+
+def add(tag_ids, amount=1):
+    tag_ids = list(tag_ids)
+    if not tag_ids or not amount:
+        return
+    ensure_stats(tag_ids)
+    # rebuild 전에 어긋나 있던 수가 0 아래로 내려가지 않게 한다
+    TagStat.objects.filter(tag_id__in=tag_ids).update(post_count=Greatest(F('post_count') + amount, 0))
+
+
+def existing_pks(instance, reverse, pk_set):
+    through = Post.tags.through.objects
+    if reverse:
+        return set(through.filter(tag_id=instance.pk, post_id__in=pk_set).values_list('post_id', flat=True))
+    return set(through.filter(post_id=instance.pk, tag_id__in=pk_set).values_list('tag_id', flat=True))
+
+
+def posts_changed(instance, action, reverse, pk_set):
+    """
+    Post.tags 의 m2m_changed 를 받아서 post_count 를 더하거나 뺀다.
+    clear() 는 pk_set 이 없으므로 pre_clear 에서 지워질 관계를 센다.
+    remove() 의 pk_set 은 넘겨받은 id 들 그대로라서 없는 관계도 들어 있으므로, pre_remove 에서 실제로 있는 것만 골라 둔다.
+    """
+    if action == 'pre_remove':
+        instance._tag_stats_removed = existing_pks(instance, reverse, pk_set)
+        return
+    if action == 'post_add':
+        sign = 1
+    elif action == 'post_remove':
+        sign = -1
+        pk_set = getattr(instance, '_tag_stats_removed', pk_set)
+    elif action == 'pre_clear':
+        sign = -1
+    else:
+        return
+
+    if reverse:
+        # tag.post_set.add(...) : instance 는 Tag
+        count = len(pk_set) if pk_set is not None else instance.post_set.count()
+        add([instance.pk], sign * count)
+    else:
+        tag_ids = pk_set if pk_set is not None else instance.tags.values_list('pk', flat=True)
+        add(tag_ids, sign)
+
+
+def post_deleted(post):
+    # post 를 지우면 m2m 관계는 m2m_changed 없이 지워진다. 수가 바뀐 tag 들을 돌려준다
+    tag_ids = list(post.tags.values_list('pk', flat=True))
+    add(tag_ids, -1)
+    return tag_ids
+
+
+def rebuild():
+    counts = dict(Post.tags.through.objects.values_list('tag_id').annotate(count=Count('post_id')).order_by())
+    tag_ids = list(Tag.objects.values_list('pk', flat=True))
+    ensure_stats(tag_ids)
+    fixed = 0
+    for stat in TagStat.objects.all():
+        count = counts.get(stat.tag_id, 0)
+        if stat.post_count != count:
+            TagStat.objects.filter(pk=stat.pk).update(post_count=count)
+            fixed += 1
+    return fixed
+
+
+def tag_cloud(limit=CLOUD_SIZE):
+    stats = list(
+        TagStat.objects.filter(post_count__gt=0).select_related('tag').order_by('-post_count', 'tag__name')[:limit]
+    )
+    if not stats:
+        return []
+
+    # 많이 쓰인 tag 일수록 큰 글씨 (1 ~ CLOUD_LEVELS, log scale)
+    low = math.log(stats[-1].post_count)
+    high = math.log(stats[0].post_count)
+    cloud = []
+    for stat in sorted(stats, key=lambda s: s.tag.name):
+        if high == low:
+            level = 1
+        else:
+            level = 1 + int(round((math.log(stat.post_count) - low) / (high - low) * (CLOUD_LEVELS - 1)))
+        cloud.append({'tag': stat.tag, 'post_count': stat.post_count, 'level': level})
+    return cloud
@@ -0,0 +1,74 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from ..models import Post, Category, Tag, Comment
+
+
+def create_category(name='life', description=''):
+    category, is_created = Category.objects.get_or_create(
+        name = name,
+        description = description,
+    )
+    category.slug = category.name.replace(' ','-').replace('/','')
+    category.save()
+
+    return category
+
+def create_tag(name='some_tag'):
+    tag, is_create = Tag.objects.get_or_create(
+        name = name,
+    )
+    tag.slug = tag.name.replace(' ','-').replace('/','')
+    tag.save()
+
+    return tag
+
+def create_post(title, content, author, category = None):
+    blog_post = Post.objects.create(
+        title=title,
+        content=content,
+        created = timezone.now(),
+        author = author,
+        category = category,
+    )
+    return blog_post
+
+def create_comment(post, text='a comment', author = None):
+    if author is None:
+        author, is_created = User.objects.get_or_create(
+            username = 'guest',
+            password = 'guestpassword',
+        )
+    comment = Comment.objects.create(
+        post = post,
+        text = text,
+        author = author,
+    )
+
+    return comment
+
+
+class BlogTestMixin(object):
+    """
+    test 마다 cache (sidebar, page cache, markdown 등) 를 비우고 글쓴이 smith 를 만든다.
+    cache 는 DB 처럼 rollback 되지 않으므로 setUpTestData 가 아니라 setUp 에서 한다.
+    """
+
+    def setUp(self):
+        super(BlogTestMixin, self).setUp()
+        cache.clear()
+        self.author_000 = User.objects.create_user(username='smith', password='nopassword')
+
+    def login(self):
+        self.client.login(username='smith', password='nopassword')
+
+
+class BlogTestCase(BlogTestMixin, TestCase):
+    pass
+
+
+class BlogTransactionTestCase(BlogTestMixin, TransactionTestCase):
+    # transaction.on_commit 이나 다른 thread 의 연결에서 보여야 하는 test
+    pass
@@ -0,0 +1,209 @@
+import threading
+from concurrent.futures import Future
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .. import comment_ingest
+from ..models import Post, Comment
+from .base import BlogTestCase, BlogTransactionTestCase, create_category, create_tag, create_post, create_comment
+
+
+class TestCommentCount(BlogTestCase):
+    def setUp(self):
+        super(TestCommentCount, self).setUp()
+        self.post_000 = create_post(title='The first Post', content='Hello world', author=self.author_000)
+        self.login()
+
+    def test_views_keep_counts(self):
+        self.client.post(self.post_000.get_absolute_url() + 'new_comment/', {'text': 'first'})
+        self.client.post(self.post_000.get_absolute_url() + 'new_comment/', {'text': 'second'})
+        self.post_000.refresh_from_db()
+        self.assertEqual(self.post_000.comment_count, 2)
+        first, second = Comment.objects.order_by('pk')
+        self.assertEqual(self.post_000.last_commented_at, second.modefied_at)
+
+        self.client.post('/blog/edit_comment/{}/'.format(first.pk), {'text': 'first, edited'})
+        self.post_000.refresh_from_db()
+        first.refresh_from_db()
+        self.assertEqual(self.post_000.comment_count, 2)
+        self.assertEqual(self.post_000.last_commented_at, first.modefied_at)
+
+        self.client.get('/blog/delete_comment/{}/'.format(first.pk))
+        self.post_000.refresh_from_db()
+        self.assertEqual(self.post_000.comment_count, 1)
+        self.assertEqual(self.post_000.last_commented_at, second.modefied_at)
+
+        self.client.get('/blog/delete_comment/{}/'.format(second.pk))
+        self.post_000.refresh_from_db()
+        self.assertEqual(self.post_000.comment_count, 0)
+        self.assertIsNone(self.post_000.last_commented_at)
+
+    def test_reconcile_command(self):
+        comment = create_comment(self.post_000, author=self.author_000)
+        post_001 = create_post(title='The second Post', content='Hello', author=self.author_000)
+        Post.objects.filter(pk=self.post_000.pk).update(comment_count=7, last_commented_at=None)
+
+        out = StringIO()
+        call_command('reconcile_comment_counts', stdout=out)
+        self.assertIn('fixed 1 posts', out.getvalue())
+
+        self.post_000.refresh_from_db()
+        self.assertEqual(self.post_000.comment_count, 1)
+        self.assertEqual(self.post_000.last_commented_at, comment.modefied_at)
+        self.assertEqual(list(Post.objects.most_discussed()), [self.post_000, post_001])
+
+    def test_delete_with_drifted_count(self):
+        # bulk_create 로 넣은 댓글은 count 에 들어가 있지 않다
+        Comment.objects.bulk_create([Comment(post=self.post_000, author=self.author_000, text='bulk')])
+        Comment.objects.get().delete()
+        self.post_000.refresh_from_db()
+        self.assertEqual(self.post_000.comment_count, 0)
+
+    def test_list_pages_show_new_count(self):
+        self.client.logout()
+        category = create_category(name='programming')
+        tag = create_tag(name='python')
+        Post.objects.filter(pk=self.post_000.pk).update(category=category)
+        self.post_000.tags.add(tag)
+
+        urls = ['/blog/', category.get_absolute_url(), tag.get_absolute_url()]
+        etags = {}
+        for url in urls:
+            response = self.client.get(url)
+            self.assertIn('댓글 0', response.content.decode())
+            etags[url] = response['ETag']
+
+        create_comment(self.post_000, author=self.author_000)
+        for url in urls:
+            response = self.client.get(url)
+            self.assertIn('댓글 1', response.content.decode())
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code, 200)
+
+
+class TestCommentRateLimit(BlogTestCase):
+    def setUp(self):
+        super(TestCommentRateLimit, self).setUp()
+        self.author_001 = User.objects.create_user(username='obama', password='nopassword')
+        self.post_000 = create_post(title='The first Post', content='Hello world', author=self.author_000)
+        self.url = self.post_000.get_absolute_url() + 'new_comment/'
+
+    def test_redirects_to_comment_anchor(self):
+        self.login()
+        # session, user, post 존재 확인, savepoint, insert, post 통계, page cache group (category, tag), release,
+        # 첫 페이지에 들어가는지 (댓글 수) 확인
+        with self.assertNumQueries(10):
+            response = self.client.post(self.url, {'text': 'first'})
+        comment = Comment.objects.get()
+        self.assertEqual(response['Location'], '/blog/{}/#comment-id-{}'.format(self.post_000.pk, comment.pk))
+
+        self.assertEqual(self.client.post('/blog/9999/new_comment/', {'text': 'first'}).status_code, 404)
+        self.assertEqual(self.client.post(self.url, {'text': ''}).status_code, 302)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    @override_settings(BLOG_COMMENT_RATE_LIMITS={'user': (2, 60)})
+    def test_per_user_limit(self):
+        self.login()
+        self.assertEqual(self.client.post(self.url, {'text': 'first'}).status_code, 302)
+        self.assertEqual(self.client.post(self.url, {'text': 'second'}).status_code, 302)
+        response = self.client.post(self.url, {'text': 'third'})
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(55 <= int(response['Retry-After']) <= 60)
+        self.assertEqual(Comment.objects.count(), 2)
+
+        # 같은 IP 라도 다른 사용자는 따로 센다
+        self.client.login(username='obama', password='nopassword')
+        self.assertEqual(self.client.post(self.url, {'text': 'fourth'}).status_code, 302)
+
+    @override_settings(BLOG_COMMENT_RATE_LIMITS={'ip': (1, 60)})
+    def test_per_ip_limit(self):
+        self.login()
+        self.assertEqual(self.client.post(self.url, {'text': 'first'}).status_code, 302)
+        self.client.login(username='obama', password='nopassword')
+        self.assertEqual(self.client.post(self.url, {'text': 'second'}).status_code, 429)
+        self.assertEqual(self.client.post(self.url, {'text': 'third'}, REMOTE_ADDR='10.0.0.1').status_code, 302)
+
+    @override_settings(BLOG_COMMENT_RATE_LIMITS={'user': (2, 10), 'ip': (5, 1)})
+    def test_bucket_refills(self):
+        request = RequestFactory().post(self.url)
+        request.user = self.author_000
+        self.assertEqual(comment_ingest.check_rate(request, now=1000), 0)
+        self.assertEqual(comment_ingest.check_rate(request, now=1000), 0)
+        self.assertEqual(comment_ingest.check_rate(request, now=1001), 9)
+        # 거절된 요청은 token 을 쓰지 않는다
+        self.assertEqual(comment_ingest.check_rate(request, now=1010), 0)
+        self.assertEqual(comment_ingest.check_rate(request, now=1010), 10)
+        self.assertEqual(comment_ingest.check_rate(request, now=1030), 0)
+
+
+@override_settings(BLOG_COMMENT_WRITE_BEHIND=True, BLOG_COMMENT_RATE_LIMITS={})
+class TestCommentWriteBehind(BlogTransactionTestCase):
+    # writer thread 의 연결에서 보이도록 commit 한다
+    def setUp(self):
+        super(TestCommentWriteBehind, self).setUp()
+        self.post_000 = create_post(title='The first Post', content='Hello world', author=self.author_000)
+
+    def test_post_then_redirect(self):
+        self.login()
+        response = self.client.post(self.post_000.get_absolute_url() + 'new_comment/', {'text': 'first'})
+        comment = Comment.objects.get()
+        self.assertEqual(response['Location'], '/blog/{}/#comment-id-{}'.format(self.post_000.pk, comment.pk))
+
+        response = self.client.get(response['Location'])
+        self.assertIn('first', response.content.decode())
+
+    @override_settings(BLOG_COMMENT_WRITE_TIMEOUT=0.01)
+    def test_write_timeout(self):
+        self.login()
+        # writer 가 밀려서 제시간에 저장하지 못한 경우
+        with mock.patch.object(comment_ingest.CommentWriter, 'submit', return_value=Future()):
+            response = self.client.post(self.post_000.get_absolute_url() + 'new_comment/', {'text': 'first'})
+        self.assertEqual(response.status_code, 202)
+        self.assertIn('다시 보내지 말고', response.content.decode())
+
+    def test_batches_and_isolates_failures(self):
+        writer = comment_ingest.CommentWriter(batch_size=3)
+        comments = [Comment(post=self.post_000, author=self.author_000, text='comment {}'.format(i)) for i in range(4)]
+        comments.insert(1, Comment(post=self.post_000, author=self.author_000, text=None))
+        futures = []
+        for comment in comments:
+            futures.append(Future())
+            writer.queue.put((comment, futures[-1]))
+
+        batch = writer.next_batch()
+        self.assertEqual(len(batch), 3)
+        with CaptureQueriesContext(connection) as queries:
+            writer.write(batch)
+        self.assertEqual(sum(1 for q in queries if q['sql'].startswith('INSERT INTO "blog_comment"')), 3)
+        self.assertIsNotNone(futures[1].exception())
+        self.assertIsNone(futures[0].result())
+        writer.write(writer.next_batch())
+
+        self.assertEqual(Comment.objects.count(), 4)
+        self.post_000.refresh_from_db()
+        self.assertEqual(self.post_000.comment_count, 4)
+
+    def test_concurrent_submits(self):
+        errors = []
+
+        def submit(i):
+            try:
+                comment_ingest.save_comment(Comment(post=self.post_000, author=self.author_000, text=str(i)))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Comment.objects.count(), 10)
+        self.post_000.refresh_from_db()
+        self.assertEqual(self.post_000.comment_count, 10)
@@ -0,0 +1,238 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from xml.etree import ElementTree
+
+from bs4 import BeautifulSoup
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from ..models import Post
+from .base import BlogTestCase, create_category, create_tag, create_post, create_comment
+
+
+class TestFeeds(BlogTestCase):
+    def setUp(self):
+        super(TestFeeds, self).setUp()
+        self.category_000 = create_category(name='programming')
+        self.tag_000 = create_tag(name='america')
+        self.post_000 = create_post(title='The first post', content='# Hello', author=self.author_000,
+                                    category=self.category_000)
+        self.post_001 = create_post(title='Stay Fool', content='Steve **Jobs**', author=self.author_000)
+        self.post_001.tags.add(self.tag_000)
+
+    def get_feed(self, url, **extra):
+        response = self.client.get(url, **extra)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_atom(self):
+        response, body = self.get_feed('/blog/feed/atom/')
+        self.assertEqual(response['Content-Type'], 'application/atom+xml; charset=utf-8')
+        ns = {'atom': 'http://www.w3.org/2005/Atom'}
+        root = ElementTree.fromstring(body)
+        entries = root.findall('atom:entry', ns)
+        self.assertEqual([e.find('atom:title', ns).text for e in entries], ['Stay Fool', 'The first post'])
+        self.assertIn('<strong>Jobs</strong>', entries[0].find('atom:summary', ns).text)
+        self.assertEqual(entries[1].find('atom:link', ns).get('href'), 'http://testserver/blog/{}/'.format(self.post_000.pk))
+
+    def test_rss(self):
+        response, body = self.get_feed('/blog/feed/rss/')
+        items = ElementTree.fromstring(body).findall('channel/item')
+        self.assertEqual([item.find('title').text for item in items], ['Stay Fool', 'The first post'])
+        self.assertEqual(items[1].find('category').text, 'programming')
+
+    def test_json(self):
+        response, body = self.get_feed('/blog/feed/json/')
+        data = json.loads(body.decode('utf-8'))
+        self.assertEqual(data['version'], 'https://jsonfeed.org/version/1.1')
+        self.assertEqual([item['title'] for item in data['items']], ['Stay Fool', 'The first post'])
+        self.assertIn('<h1>Hello</h1>', data['items'][1]['content_html'])
+
+    def test_category_and_tag(self):
+        response, body = self.get_feed('/blog/category/programming/feed/json/')
+        self.assertEqual([item['title'] for item in json.loads(body.decode())['items']], ['The first post'])
+        response, body = self.get_feed('/blog/category/_none/feed/json/')
+        self.assertEqual([item['title'] for item in json.loads(body.decode())['items']], ['Stay Fool'])
+        response, body = self.get_feed('/blog/tag/america/feed/json/')
+        self.assertEqual([item['title'] for item in json.loads(body.decode())['items']], ['Stay Fool'])
+
+        self.assertEqual(self.client.get('/blog/tag/nothing/feed/atom/').status_code, 404)
+        self.assertEqual(self.client.get('/blog/feed/xml/').status_code, 404)
+
+    def test_conditional_get(self):
+        response, body = self.get_feed('/blog/feed/atom/')
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with self.assertNumQueries(1):   # Max(modified) 만
+            response = self.client.get('/blog/feed/atom/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.post_001.title = 'Stay Hungry'
+        self.post_001.save()
+        response, body = self.get_feed('/blog/feed/atom/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Stay Hungry', body)
+
+    def test_feed_link_in_html(self):
+        response = self.client.get('/blog/')
+        soup = BeautifulSoup(response.content, 'html.parser')
+        self.assertEqual(soup.find('link', type='application/atom+xml')['href'], '/blog/feed/atom/')
+
+
+class TestSitemap(BlogTestCase):
+    ns = {'s': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
+
+    def setUp(self):
+        super(TestSitemap, self).setUp()
+        self.category_000 = create_category(name='programming')
+        self.tag_000 = create_tag(name='america')
+        self.post_000 = create_post(title='The first post', content='Hello', author=self.author_000,
+                                    category=self.category_000)
+        self.post_001 = create_post(title='Stay Fool', content='Steve Jobs', author=self.author_000)
+        self.post_001.tags.add(self.tag_000)
+
+    def get_xml(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return ElementTree.fromstring(body)
+
+    def locs(self, root, element='s:url'):
+        return [e.find('s:loc', self.ns).text for e in root.findall(element, self.ns)]
+
+    def test_index_and_sections(self):
+        root = self.get_xml('/sitemap.xml')
+        self.assertEqual(self.locs(root, 's:sitemap'), [
+            'http://testserver/sitemap-posts-0.xml',
+            'http://testserver/sitemap-categories-0.xml',
+            'http://testserver/sitemap-tags-0.xml',
+        ])
+
+        root = self.get_xml('/sitemap-posts-0.xml')
+        self.assertEqual(self.locs(root), [
+            'http://testserver' + self.post_000.get_absolute_url(),
+            'http://testserver' + self.post_001.get_absolute_url(),
+        ])
+        self.assertIsNotNone(root.find('s:url/s:lastmod', self.ns))
+        self.assertEqual(self.locs(self.get_xml('/sitemap-tags-0.xml')), ['http://testserver/blog/tag/america/'])
+        self.assertEqual(self.client.get('/sitemap-users-0.xml').status_code, 404)
+
+    @override_settings(BLOG_SITEMAP_SHARD_SIZE=1)
+    def test_shards(self):
+        root = self.get_xml('/sitemap.xml')
+        post_shards = [loc for loc in self.locs(root, 's:sitemap') if 'posts' in loc]
+        self.assertEqual(post_shards, [
+            'http://testserver/sitemap-posts-{}.xml'.format(self.post_000.pk),
+            'http://testserver/sitemap-posts-{}.xml'.format(self.post_001.pk),
+        ])
+        root = self.get_xml('/sitemap-posts-{}.xml'.format(self.post_001.pk))
+        self.assertEqual(self.locs(root), ['http://testserver' + self.post_001.get_absolute_url()])
+
+    def test_cache_and_invalidation(self):
+        self.get_xml('/sitemap-posts-0.xml')
+        with self.assertNumQueries(0):
+            response = self.client.get('/sitemap-posts-0.xml')
+        self.assertFalse(response.streaming)
+
+        post_002 = create_post(title='Third', content='...', author=self.author_000)
+        self.assertIn('http://testserver' + post_002.get_absolute_url(), self.locs(self.get_xml('/sitemap-posts-0.xml')))
+
+        post_002.delete()
+        self.assertNotIn('http://testserver' + post_002.get_absolute_url(), self.locs(self.get_xml('/sitemap-posts-0.xml')))
+
+    def test_comment_refreshes_lastmod(self):
+        # 댓글은 Post.modified (lastmod) 를 바꾸므로 cache 된 sitemap 도 다시 만들어야 한다
+        Post.objects.filter(pk=self.post_000.pk).update(modified=timezone.make_aware(datetime.datetime(2019, 7, 15, 12)))
+        loc = 'http://testserver' + self.post_000.get_absolute_url()
+
+        def lastmod():
+            root = self.get_xml('/sitemap-posts-0.xml')
+            url = [e for e in root.findall('s:url', self.ns) if e.find('s:loc', self.ns).text == loc][0]
+            return url.find('s:lastmod', self.ns).text
+
+        self.assertTrue(lastmod().startswith('2019-07-15'))
+        create_comment(self.post_000, author=self.author_000)
+        self.assertFalse(lastmod().startswith('2019-07-15'))
+
+
+class TestStaticExport(BlogTestCase):
+    def setUp(self):
+        super(TestStaticExport, self).setUp()
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output)
+        self.category_000 = create_category(name='programming')
+        self.tag_000 = create_tag(name='america')
+        self.posts = [
+            create_post(title='Post {}'.format(i), content='Hello {}'.format(i), author=self.author_000,
+                        category=self.category_000 if i % 2 else None)
+            for i in range(7)
+        ]
+        self.posts[0].tags.add(self.tag_000)
+
+    def export(self, *args):
+        out = StringIO()
+        call_command('export_static', self.output, '--workers', '1', '--host', 'testserver', *args, stdout=out)
+        return out.getvalue()
+
+    def read(self, path):
+        with open(os.path.join(self.output, path), encoding='utf-8') as f:
+            return f.read()
+
+    def test_export(self):
+        self.assertIn('unchanged 0', self.export())
+        for path in [
+            'index.html', 'about_me/index.html', 'blog/index.html', 'blog/page/2/index.html',
+            'blog/{}/index.html'.format(self.posts[0].pk), 'blog/category/programming/index.html',
+            'blog/category/_none/index.html', 'blog/tag/america/index.html', 'blog/tags/index.html',
+            'blog/feed/atom/index.xml', 'blog/tag/america/feed/json/index.json', 'sitemap.xml',
+            'sitemap-posts-0.xml',
+        ]:
+            self.assertTrue(os.path.exists(os.path.join(self.output, path)), path)
+
+        soup = BeautifulSoup(self.read('blog/page/2/index.html'), 'html.parser')
+        self.assertEqual(soup.find('a', text='Newer →')['href'], '/blog/')
+        soup = BeautifulSoup(self.read('blog/index.html'), 'html.parser')
+        self.assertEqual(soup.find('a', text='← Older')['href'], '/blog/page/2/')
+
+    def test_incremental(self):
+        self.export()
+        self.assertIn('rendered 0,', self.export())
+
+        # 댓글이 달리면 그 post 가 보이는 페이지들을 다시 그린다
+        detail = 'blog/{}/index.html'.format(self.posts[3].pk)
+        create_comment(self.posts[3], text='new comment', author=self.author_000)
+        result = self.export()
+        self.assertIn('new comment', self.read(detail))
+        self.assertNotIn('rendered 0,', result)
+        self.assertIn('removed 0', result)
+
+        self.tag_000.delete()
+        self.assertIn('removed 5', self.export())   # tag 목록, feed 3개, tag sitemap
+        self.assertFalse(os.path.exists(os.path.join(self.output, 'blog/tag/america/index.html')))
+
+        self.assertIn('unchanged 0', self.export('--full'))
+
+    @override_settings(BLOG_COMMENTS_PER_PAGE=2)
+    def test_no_dynamic_endpoints(self):
+        # 정적 사이트에는 댓글 cursor 페이지와 자동완성이 없으므로 그것들을 부르지 않는다
+        comments = [create_comment(self.posts[0], text='comment {}'.format(i), author=self.author_000)
+                    for i in range(3)]
+        self.export()
+        html = self.read('blog/{}/index.html'.format(self.posts[0].pk))
+        for comment in comments:
+            self.assertIn('comment-id-{}'.format(comment.pk), html)
+        self.assertNotIn('load-more-comments', html)
+        self.assertNotIn('/comments/?cursor=', html)
+        self.assertNotIn('/blog/suggest/', html)
+        self.assertNotIn('/blog/suggest/', self.read('blog/index.html'))
+
+        # 보통 페이지는 그대로
+        response = self.client.get(self.posts[0].get_absolute_url())
+        self.assertIn('load-more-comments', response.content.decode())
+        self.assertIn('/blog/suggest/', response.content.decode())
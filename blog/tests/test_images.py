@@ -0,0 +1,133 @@
+import os
+import shutil
+import tempfile
+from io import StringIO, BytesIO
+
+from PIL import Image
+from bs4 import BeautifulSoup
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+
+from .. import images
+from ..models import Post
+from .base import BlogTestCase, create_category, create_post
+
+
+@override_settings(BLOG_IMAGE_PROCESSING_SYNC=True, BLOG_PAGE_CACHE_TIMEOUT=0)
+class TestHeadImage(BlogTestCase):
+    def setUp(self):
+        super(TestHeadImage, self).setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def make_image(self, name='head.png', size=(1000, 400)):
+        buffer = BytesIO()
+        Image.new('RGB', size, color='red').save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_generate_variants(self):
+        post_000 = create_post(title='The first post', content='Hello', author=self.author_000)
+        post_000.head_image = self.make_image()
+        post_000.save()
+
+        name = post_000.head_image.name
+        variants = images.process_post_image(post_000.pk, name)
+        self.assertEqual(variants, 'thumb:375,card:750,full:1000')
+        post_000.refresh_from_db()
+        self.assertEqual(post_000.head_image_variants, variants)
+
+        for variant, width in images.parse_variants(variants):
+            with default_storage.open(images.variant_name(name, variant, 'webp')) as f:
+                self.assertEqual(Image.open(f).format, 'WEBP')
+            with default_storage.open(images.variant_name(name, variant, 'jpg')) as f:
+                self.assertEqual(Image.open(f).size[0], width)
+
+        response = self.client.get(post_000.get_absolute_url())
+        soup = BeautifulSoup(response.content, 'html.parser')
+        source = soup.find('div', id='main-div').find('source', type='image/webp')
+        self.assertIn('.card.webp 750w', source['srcset'])
+
+        # 이미지를 바꾸면 새로 처리할 때까지 원본을 쓴다
+        post_000.head_image = self.make_image('other.png', size=(300, 100))
+        post_000.save()
+        self.assertEqual(post_000.head_image_variants, '')
+
+    def test_process_existing_command(self):
+        post_000 = create_post(title='The first post', content='Hello', author=self.author_000)
+        name = default_storage.save('blog/19/07/15/old.png', self.make_image(size=(500, 200)))
+        Post.objects.filter(pk=post_000.pk).update(head_image=name)
+        default_storage.save('blog/19/07/15/notes.txt', SimpleUploadedFile('notes.txt', b'not an image'))
+
+        version = Post.objects.get(pk=post_000.pk).version
+        call_command('process_head_images', stdout=StringIO(), stderr=StringIO())
+
+        post_000.refresh_from_db()
+        self.assertEqual(post_000.head_image_variants, 'thumb:375,card:500')
+        self.assertTrue(default_storage.exists('blog/19/07/15/old.card.webp'))
+        # 카드 fragment cache 와 ETag 가 새 이미지를 쓰도록 version 을 올린다
+        self.assertEqual(post_000.version, version + 1)
+
+    def test_exif_orientation(self):
+        # 휴대폰 사진: 픽셀은 가로 800x400 이지만 EXIF 로 90도 돌려서 (400x800) 보여준다
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        buffer = BytesIO()
+        Image.new('RGB', (800, 400), color='red').save(buffer, 'JPEG', exif=exif)
+        name = default_storage.save('blog/19/07/15/phone.jpg', SimpleUploadedFile('phone.jpg', buffer.getvalue()))
+
+        self.assertEqual(images.generate_variants(name), 'thumb:375,card:400')
+        with default_storage.open(images.variant_name(name, 'card', 'jpg')) as f:
+            self.assertEqual(Image.open(f).size, (400, 800))
+
+
+class TestPlaceholder(BlogTestCase):
+    def setUp(self):
+        super(TestPlaceholder, self).setUp()
+        self.placeholder_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(BLOG_PLACEHOLDER_ROOT=self.placeholder_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.placeholder_root)
+
+    def test_placeholder(self):
+        category = create_category(name='정치/사회')
+        post_000 = create_post(title='The first post', content='Hello', author=self.author_000, category=category)
+        post_001 = create_post(title='The first post', content='Hello', author=self.author_000)
+
+        url = post_000.get_placeholder_url()
+        self.assertNotEqual(url, post_001.get_placeholder_url())   # category 색이 다르다
+
+        response = self.client.get('/blog/')
+        self.assertIn(url, response.content.decode())
+        self.assertNotIn('picsum.photos', response.content.decode())
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(Image.open(BytesIO(response.content)).size, (750, 300))
+        self.assertEqual(os.listdir(self.placeholder_root), [url.split('/')[-1].split(':')[0] + '.png'])
+
+        # 같은 key 는 항상 같은 이미지
+        self.assertEqual(self.client.get(url).content, response.content)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_invalid_key(self):
+        self.assertEqual(self.client.get('/blog/placeholder/../../etc.png').status_code, 404)
+        self.assertEqual(self.client.get('/blog/placeholder/zzzzzz-0000000000.png').status_code, 404)
+
+    def test_unsigned_key_not_rendered(self):
+        # 형식만 맞는 key 로 디스크를 채울 수 없다
+        self.assertEqual(self.client.get('/blog/placeholder/0123ab-0123456789.png').status_code, 404)
+        self.assertEqual(self.client.get('/blog/placeholder/0123ab-0123456789:forged.png').status_code, 404)
+        self.assertEqual(os.listdir(self.placeholder_root), [])
@@ -0,0 +1,94 @@
+from io import StringIO
+from unittest import mock
+
+from bs4 import BeautifulSoup
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .. import markdown_cache, seed
+from ..models import Post, Comment
+from .base import BlogTestCase, create_post, create_comment
+
+
+class TestMarkdownCache(BlogTestCase):
+    def test_render_once_per_content(self):
+        post_000 = create_post(
+            title='The first Post',
+            content='# Hello world',
+            author=self.author_000,
+        )
+
+        with mock.patch.object(markdown_cache, 'render', wraps=markdown_cache.render) as render:
+            self.assertIn('<h1>Hello world</h1>', post_000.get_markdown_content())
+            self.assertIn('<h1>Hello world</h1>', post_000.get_markdown_content())
+            self.assertEqual(render.call_count, 0)   # save 할 때 이미 렌더링 되어 있다
+
+            post_000.content = '# Bye world'
+            self.assertIn('<h1>Bye world</h1>', post_000.get_markdown_content())
+            self.assertEqual(render.call_count, 1)
+
+    def test_extension_config_changes_key(self):
+        post_000 = create_post(
+            title='The first Post',
+            content='Hello world',
+            author=self.author_000,
+        )
+        key = markdown_cache.make_key(post_000, post_000.content)
+        with mock.patch.object(markdown_cache, 'MARKDOWNX_MARKDOWN_EXTENSIONS', ['markdown.extensions.toc']):
+            self.assertNotEqual(key, markdown_cache.make_key(post_000, post_000.content))
+        self.assertEqual(key, markdown_cache.make_key(post_000, post_000.content))
+
+        # 설정이 그대로이면 fingerprint 를 다시 계산하지 않는다
+        with mock.patch.object(markdown_cache.json, 'dumps') as dumps:
+            markdown_cache.make_key(post_000, post_000.content)
+        dumps.assert_not_called()
+
+    def test_backfill_command(self):
+        post_000 = create_post(
+            title='The first Post',
+            content='Hello world',
+            author=self.author_000,
+        )
+        create_comment(post_000, text='a *comment*', author=self.author_000)
+        cache.clear()
+
+        call_command('render_markdown', stdout=StringIO())
+
+        comment_000 = Comment.objects.get()
+        key = markdown_cache.make_key(comment_000, comment_000.text)
+        self.assertEqual(cache.get(key), '<p>a <em>comment</em></p>')
+
+
+class TestExcerpt(BlogTestCase):
+    def test_excerpt_is_plain_text(self):
+        post = create_post(
+            title='Markdown',
+            content='# Title\n\nSome **bold** & [a link](http://example.com).\n\n    print("code")\n',
+            author=self.author_000,
+        )
+        self.assertEqual(post.excerpt, 'Title Some bold & a link.')
+        self.assertEqual(post.word_count, 7)   # 코드도 읽는 시간에는 들어간다
+        self.assertEqual(post.get_reading_minutes(), 1)
+
+        post.content = ' '.join(['word'] * 450)
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, ' '.join(['word'] * 50) + '…')
+        self.assertEqual(post.word_count, 450)
+        self.assertEqual(post.get_reading_minutes(), 3)
+
+    def test_list_does_not_load_content(self):
+        create_post(title='The first Post', content='Hello **world**', author=self.author_000)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/blog/')
+        self.assertFalse([q['sql'] for q in queries if '"blog_post"."content"' in q['sql']])
+
+        card = BeautifulSoup(response.content, 'html.parser').find('p', class_='card-text')
+        self.assertEqual(card.text, 'Hello world')
+
+    def test_seed_fills_excerpts(self):
+        seed.seed(posts=3, comments_per_post=0, tags=2, categories=1, authors=1)
+        self.assertFalse(Post.objects.filter(excerpt=''))
+        self.assertFalse(Post.objects.filter(word_count=0))
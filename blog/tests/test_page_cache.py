@@ -0,0 +1,253 @@
+from bs4 import BeautifulSoup
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Post
+from .base import BlogTestCase, create_category, create_tag, create_post, create_comment
+
+
+class TestPageCache(BlogTestCase):
+    def setUp(self):
+        super(TestPageCache, self).setUp()
+        self.category = create_category(name='programming')
+        self.tag = create_tag(name='django')
+        self.post_000 = create_post(title='The first post', content='Hello', author=self.author_000,
+                                    category=self.category)
+        self.post_000.tags.add(self.tag)
+        self.post_001 = create_post(title='The second post', content='World', author=self.author_000)
+
+    def assertCached(self, url, cached=True):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        if cached:
+            self.assertEqual(len(queries), 0, url)
+        else:
+            self.assertGreater(len(queries), 0, url)
+        return response
+
+    def warm(self, *urls):
+        for url in urls:
+            self.client.get(url)
+
+    def test_anonymous_hit(self):
+        urls = ['/blog/', self.post_000.get_absolute_url(), self.category.get_absolute_url(),
+                self.tag.get_absolute_url()]
+        self.warm(*urls)
+        for url in urls:
+            self.assertCached(url)
+
+    def test_logged_in_not_cached(self):
+        self.login()
+        self.warm('/blog/')
+        self.assertCached('/blog/', cached=False)
+
+    def test_comment_purges_post_pages(self):
+        detail_000 = self.post_000.get_absolute_url()
+        detail_001 = self.post_001.get_absolute_url()
+        self.warm('/blog/', detail_000, detail_001, '/blog/category/_none/')
+
+        comment = create_comment(self.post_000, text='new comment', author=self.author_000)
+        response = self.assertCached(detail_000, cached=False)
+        self.assertIn('new comment', response.content.decode())
+        # 목록의 카드에 댓글 수가 보인다
+        self.assertCached('/blog/', cached=False)
+        self.assertCached(detail_001)
+        self.assertCached('/blog/category/_none/')
+
+        comment.delete()
+        self.assertCached(detail_000, cached=False)
+
+    def test_post_update_purges_related_pages(self):
+        urls = ['/blog/', self.post_000.get_absolute_url(), self.category.get_absolute_url(),
+                self.tag.get_absolute_url()]
+        self.warm(*urls)
+        self.warm(self.post_001.get_absolute_url(), '/blog/category/_none/')
+
+        self.post_000.title = 'Renamed post'
+        self.post_000.save()
+        for url in urls:
+            self.assertIn('Renamed post', self.assertCached(url, cached=False).content.decode())
+        self.assertCached(self.post_001.get_absolute_url())
+        self.assertCached('/blog/category/_none/')
+
+    def test_new_post_purges_sidebar(self):
+        self.warm(self.post_001.get_absolute_url())
+        create_post(title='The third post', content='!', author=self.author_000, category=self.category)
+        response = self.assertCached(self.post_001.get_absolute_url(), cached=False)
+        self.assertIn('programming (2)', response.content.decode())
+
+    def test_tag_changes(self):
+        tag_url = self.tag.get_absolute_url()
+        self.warm(tag_url, self.post_001.get_absolute_url())
+        self.post_001.tags.add(self.tag)
+        response = self.assertCached(tag_url, cached=False)
+        self.assertIn('The second post', response.content.decode())
+
+        self.warm(self.post_000.get_absolute_url())
+        self.tag.name = 'python'
+        self.tag.save()
+        response = self.assertCached(self.post_000.get_absolute_url(), cached=False)
+        self.assertIn('#python', response.content.decode())
+
+    def test_tagging_keeps_unrelated_pages(self):
+        unrelated = self.category.get_absolute_url()   # post_000 만 보인다
+        self.warm(unrelated, '/blog/', '/blog/tags/', self.tag.get_absolute_url())
+
+        # tag cloud 에 보이는 것이 그대로이면 관계된 페이지만 다시 그린다
+        self.post_001.tags.add(self.tag)
+        self.assertCached(unrelated)
+        self.assertCached('/blog/', cached=False)
+        self.assertCached('/blog/tags/', cached=False)
+        self.assertIn('The second post', self.assertCached(self.tag.get_absolute_url(), cached=False).content.decode())
+
+        # 새 tag 가 cloud 에 나타나면 모든 페이지의 sidebar 가 바뀐다
+        self.post_001.tags.add(create_tag(name='python'))
+        self.assertIn('#python', self.assertCached(unrelated, cached=False).content.decode())
+
+    def test_unused_tag_rename(self):
+        # 게시물이 없는 tag 는 cloud 에 없으므로 다른 페이지에 영향이 없다
+        tag = create_tag(name='unused')
+        self.warm('/blog/', self.post_000.get_absolute_url())
+        tag.name = 'still unused'
+        tag.save()
+        self.assertCached('/blog/')
+        self.assertCached(self.post_000.get_absolute_url())
+
+
+class TestConditionalGet(BlogTestCase):
+    def setUp(self):
+        super(TestConditionalGet, self).setUp()
+        self.post_000 = create_post(title='The first post', content='Hello', author=self.author_000)
+
+    def test_post_detail(self):
+        url = self.post_000.get_absolute_url()
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        create_comment(self.post_000, text='new comment', author=self.author_000)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+    def test_not_modified_skips_render(self):
+        url = self.post_000.get_absolute_url()
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1), self.assertTemplateNotUsed('blog/post_detail.html'):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_user(self):
+        url = self.post_000.get_absolute_url()
+        etag = self.client.get(url)['ETag']
+
+        self.login()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('EDIT', response.content.decode())
+
+    def test_post_list(self):
+        etag = self.client.get('/blog/')['ETag']
+        self.assertEqual(self.client.get('/blog/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.post_000.title = 'Renamed post'
+        self.post_000.save()
+        self.assertEqual(self.client.get('/blog/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+    def test_post_list_etag_follows_modified(self):
+        # page cache group 을 올리지 않고 바뀐 경우에도 같은 ETag 를 주면 안 된다
+        etag = self.client.get('/blog/')['ETag']
+        Post.objects.filter(pk=self.post_000.pk).bump_version()
+        self.assertEqual(self.client.get('/blog/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class TestFragmentCache(BlogTestCase):
+    def setUp(self):
+        super(TestFragmentCache, self).setUp()
+        self.author_001 = User.objects.create_user(username='obama', password='nopassword')
+        self.category = create_category(name='programming')
+        self.tag = create_tag(name='python')
+        self.post_000 = create_post(title='The first Post', content='Hello world', author=self.author_000,
+                                    category=self.category)
+        self.post_000.tags.add(self.tag)
+
+    def card_key(self, post):
+        post.refresh_from_db()
+        return make_template_fragment_key('post_card', [post.pk, post.version])
+
+    def test_card_is_reused_across_pages(self):
+        self.client.get('/blog/')
+        key = self.card_key(self.post_000)
+        self.assertIn('Hello world', cache.get(key))
+
+        # tag / category 페이지도 같은 조각을 그대로 쓴다
+        cache.set(key, '<div id="cached-card">cached</div>')
+        for url in ('/blog/', self.tag.get_absolute_url(), self.category.get_absolute_url()):
+            soup = BeautifulSoup(self.client.get(url).content, 'html.parser')
+            self.assertIsNotNone(soup.find('div', id='cached-card'), url)
+
+    def test_version_bumps_invalidate_card(self):
+        key = self.card_key(self.post_000)
+
+        other = create_tag(name='django')
+        self.post_000.tags.add(other)
+        self.assertNotEqual(self.card_key(self.post_000), key)
+        key = self.card_key(self.post_000)
+
+        other.name = 'Django'
+        other.save()
+        self.assertNotEqual(self.card_key(self.post_000), key)
+        key = self.card_key(self.post_000)
+
+        self.category.name = 'Programming'
+        self.category.save()
+        self.assertNotEqual(self.card_key(self.post_000), key)
+
+        soup = BeautifulSoup(self.client.get('/blog/').content, 'html.parser')
+        card = soup.find('div', id='post-card-{}'.format(self.post_000.pk))
+        self.assertIn('#Django', card.text)
+        self.assertIn('Programming', card.text)
+
+    def test_save_with_stale_instance(self):
+        stale = Post.objects.get(pk=self.post_000.pk)
+        other = create_tag(name='django')
+        self.post_000.tags.add(other)
+        version = Post.objects.values_list('version', flat=True).get(pk=self.post_000.pk)
+
+        # 메모리의 version 이 DB 보다 뒤쳐져 있어도 저장하면 DB 값보다 올라간다
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertEqual(Post.objects.values_list('version', flat=True).get(pk=self.post_000.pk), version + 1)
+
+    def test_comment_fragment_keeps_buttons_per_user(self):
+        comment = create_comment(self.post_000, text='first **comment**', author=self.author_000)
+
+        self.login()
+        soup = BeautifulSoup(self.client.get(self.post_000.get_absolute_url()).content, 'html.parser')
+        self.assertEqual(len(soup.find('div', id='comment-id-{}'.format(comment.pk)).find_all('button')), 2)
+
+        self.client.login(username='obama', password='nopassword')
+        soup = BeautifulSoup(self.client.get(self.post_000.get_absolute_url()).content, 'html.parser')
+        block = soup.find('div', id='comment-id-{}'.format(comment.pk))
+        self.assertEqual(block.find_all('button'), [])
+        self.assertEqual(block.find('strong').text, 'comment')
+
+        comment.text = 'edited comment'
+        comment.save()
+        soup = BeautifulSoup(self.client.get(self.post_000.get_absolute_url()).content, 'html.parser')
+        self.assertIn('edited comment', soup.find('div', id='comment-id-{}'.format(comment.pk)).text)
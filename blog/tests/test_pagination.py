@@ -0,0 +1,151 @@
+import base64
+import json
+
+from bs4 import BeautifulSoup
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Comment
+from .base import BlogTestCase, create_tag, create_post, create_comment
+
+
+@override_settings(BLOG_CURSOR_PAGINATION=True, BLOG_PAGE_CACHE_TIMEOUT=0)
+class TestCursorPagination(BlogTestCase):
+    def setUp(self):
+        super(TestCursorPagination, self).setUp()
+        self.posts = [
+            create_post(title='The Post No. {}'.format(i), content='Content : {}'.format(i), author=self.author_000)
+            for i in range(12)
+        ]
+        self.posts.reverse()    # 최신 글이 먼저
+
+    def get_page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        return [post.pk for post in page], page
+
+    def test_walk_forward_and_back(self):
+        pks, page_1 = self.get_page('/blog/')
+        self.assertEqual(pks, [post.pk for post in self.posts[:5]])
+        self.assertFalse(page_1.has_previous())
+
+        pks, page_2 = self.get_page('/blog/?cursor={}'.format(page_1.next_cursor))
+        self.assertEqual(pks, [post.pk for post in self.posts[5:10]])
+
+        with self.assertNumQueries(3):   # COUNT(*) 없이 Last-Modified, post, tags 만 가져온다
+            pks, page_3 = self.get_page('/blog/?cursor={}'.format(page_2.next_cursor))
+        self.assertEqual(pks, [post.pk for post in self.posts[10:]])
+        self.assertFalse(page_3.has_next())
+
+        pks, page = self.get_page('/blog/?cursor={}'.format(page_3.previous_cursor))
+        self.assertEqual(pks, [post.pk for post in self.posts[5:10]])
+        pks, page = self.get_page('/blog/?cursor={}'.format(page.previous_cursor))
+        self.assertEqual(pks, [post.pk for post in self.posts[:5]])
+        self.assertFalse(page.has_previous())
+
+    def test_tag_and_search(self):
+        tag = create_tag(name='america')
+        for post in self.posts:
+            post.tags.add(tag)
+
+        pks, page = self.get_page(tag.get_absolute_url())
+        pks, page = self.get_page('{}?cursor={}'.format(tag.get_absolute_url(), page.next_cursor))
+        self.assertEqual(pks, [post.pk for post in self.posts[5:10]])
+
+        pks, page = self.get_page('/blog/search/Content/')
+        self.assertEqual(len(pks), 5)
+        next_pks, page = self.get_page('/blog/search/Content/?cursor={}'.format(page.next_cursor))
+        self.assertEqual(len(next_pks), 5)
+        self.assertFalse(set(pks) & set(next_pks))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/blog/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor(self):
+        # 형식은 맞지만 값의 type 이 틀린 cursor 도 500 이 아니라 404
+        for values in (['notadate', 1], ['2019-07-15T00:00:00+00:00', 'x'], [None, 1], [{}, 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps({'d': 'n', 'v': values}).encode()).decode()
+            with override_settings(BLOG_CURSOR_PAGINATION=True):
+                self.assertEqual(self.client.get('/blog/?cursor=' + cursor).status_code, 404, values)
+            self.assertEqual(
+                self.client.get(self.posts[0].get_absolute_url() + 'comments/?cursor=' + cursor).status_code, 404,
+            )
+
+
+@override_settings(BLOG_COMMENTS_PER_PAGE=3, BLOG_PAGE_CACHE_TIMEOUT=0)
+class TestCommentPagination(BlogTestCase):
+    def setUp(self):
+        super(TestCommentPagination, self).setUp()
+        self.author_obama = User.objects.create_user(username='obama', password='nopassword')
+        self.post_000 = create_post(title='The first Post', content='Hello world', author=self.author_000)
+        self.comments = [
+            create_comment(self.post_000, text='comment {}'.format(i),
+                           author=self.author_000 if i % 2 else self.author_obama)
+            for i in range(7)
+        ]
+
+    def comment_ids(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        return [int(div['id'].split('-')[-1]) for div in soup.find_all('div', class_='media')]
+
+    def test_first_page_rendered(self):
+        response = self.client.get(self.post_000.get_absolute_url())
+        soup = BeautifulSoup(response.content, 'html.parser')
+        comment_list = soup.find('div', id='comment-list')
+        self.assertEqual(self.comment_ids(str(comment_list)), [c.pk for c in self.comments[:3]])
+        self.assertTrue(soup.find('button', id='load-more-comments')['data-url'].startswith(
+            self.post_000.get_absolute_url() + 'comments/?cursor='
+        ))
+
+    def test_load_more(self):
+        response = self.client.get(self.post_000.get_absolute_url())
+        url = BeautifulSoup(response.content, 'html.parser').find('button', id='load-more-comments')['data-url']
+
+        loaded = []
+        while url:
+            with self.assertNumQueries(2):   # comments + author join, socialaccount prefetch
+                data = self.client.get(url).json()
+            loaded += self.comment_ids(data['html'])
+            url = data['next']
+        self.assertEqual(loaded, [c.pk for c in self.comments[3:]])
+
+    def test_detail_query_count_constant(self):
+        url = self.post_000.get_absolute_url()
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url)
+        for i in range(5):
+            create_comment(self.post_000, text='more {}'.format(i), author=self.author_obama)
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(url)
+        self.assertEqual(len(before), len(after))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.post_000.get_absolute_url() + 'comments/?cursor=xx')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(BLOG_COMMENTS_PER_PAGE=20)
+    def test_new_comment_visible_after_redirect(self):
+        for i in range(13):
+            create_comment(self.post_000, text='more {}'.format(i), author=self.author_obama)
+        self.login()
+
+        # 21 번째 댓글은 첫 페이지에 없으므로 그 댓글이 들어 있는 페이지로 보낸다
+        response = self.client.post(self.post_000.get_absolute_url() + 'new_comment/', {'text': 'comment 21'})
+        comment = Comment.objects.latest('pk')
+        url, anchor = response['Location'].split('#')
+        self.assertEqual(anchor, 'comment-id-{}'.format(comment.pk))
+        soup = BeautifulSoup(self.client.get(url).content, 'html.parser')
+        self.assertIsNotNone(soup.find('div', id=anchor))
+        self.assertIsNotNone(soup.find('a', text='처음 댓글부터 보기'))
+
+        # 첫 페이지에 들어가는 댓글은 그대로 상세 페이지로
+        post_001 = create_post(title='The second Post', content='Hello', author=self.author_000)
+        response = self.client.post(post_001.get_absolute_url() + 'new_comment/', {'text': 'first'})
+        self.assertEqual(response['Location'], '{}#comment-id-{}'.format(
+            post_001.get_absolute_url(), Comment.objects.latest('pk').pk))
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .. import asgi, comment_counts, performance, search, seed, tag_stats
+from ..models import Post, Tag, Comment
+from .base import BlogTestCase, BlogTransactionTestCase, create_post
+
+
+class TestPerformanceMiddleware(BlogTestCase):
+    def setUp(self):
+        super(TestPerformanceMiddleware, self).setUp()
+        performance.stats.reset()
+        self.post_000 = create_post(title='The first post', content='Hello', author=self.author_000)
+
+    def test_server_timing(self):
+        # 익명 사용자에게는 query 수와 시간을 보여주지 않는다
+        self.assertFalse(self.client.get(self.post_000.get_absolute_url()).has_header('Server-Timing'))
+
+        User.objects.create_user(username='staff', password='nopassword', is_staff=True)
+        self.client.login(username='staff', password='nopassword')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.post_000.get_absolute_url())
+        timing = response['Server-Timing']
+        self.assertIn('total;dur=', timing)
+        self.assertIn('render;dur=', timing)
+        self.assertIn('db;dur=', timing)
+        self.assertIn('"{} queries"'.format(len(queries)), timing)
+
+    def test_duplicate_queries(self):
+        metrics = performance.RequestMetrics()
+        with connection.execute_wrapper(metrics.record_query):
+            for _ in range(3):
+                list(Post.objects.filter(pk=self.post_000.pk))
+            list(Post.objects.filter(pk=self.post_000.pk + 1))
+        self.assertEqual(metrics.query_count, 4)
+        self.assertEqual(metrics.duplicate_count, 2)
+        self.assertEqual(metrics.duplicates()[0][1], 3)
+
+    def test_stats_endpoint(self):
+        self.client.get('/blog/')
+        self.client.get('/blog/')
+        self.client.get(self.post_000.get_absolute_url())
+
+        response = self.client.get('/blog/_perf/')
+        self.assertEqual(response.status_code, 302)
+
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='nopassword')
+        self.client.login(username='admin', password='nopassword')
+        data = self.client.get('/blog/_perf/').json()
+        self.assertEqual(data['blog.views.PostList']['requests'], 2)
+        self.assertEqual(data['blog.views.PostDetail']['requests'], 1)
+        self.assertEqual(sum(data['blog.views.PostList']['histogram'].values()), 2)
+
+    @override_settings(BLOG_PERF_LOG=True)
+    def test_log_line(self):
+        with self.assertLogs('blog.performance', 'INFO') as logs:
+            self.client.get('/blog/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'blog.views.PostList')
+        self.assertEqual(record['status'], 200)
+        self.assertIn('queries', record)
+
+
+class TestBenchmark(BlogTestCase):
+    def test_seed(self):
+        created = seed.seed(posts=30, comments_per_post=2, tags=5, categories=3)
+        self.assertEqual(created['posts'], 30)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), created['comments'])
+
+        # bulk_create 로 건너뛴 signal 의 결과들도 맞춰져 있다
+        self.assertEqual(tag_stats.rebuild(), 0)
+        self.assertEqual(comment_counts.reconcile(), 0)
+        post = Post.objects.order_by('?').first()
+        self.assertIn(post, search.search_posts(post.title))
+        self.assertEqual(len(set(Post.objects.values_list('created', flat=True))), 30)
+
+        # 다시 실행해도 이름이 겹치지 않는다
+        seed.seed(posts=1, tags=1, categories=1)
+
+    def test_benchmark_baseline(self):
+        seed.seed(posts=20, comments_per_post=1, tags=3, categories=2)
+        baseline = os.path.join(tempfile.mkdtemp(), 'baseline.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(baseline))
+
+        call_command('benchmark_blog', '--requests', '2', '--warmup', '1', '--baseline', baseline, '--save',
+                     stdout=StringIO())
+        with open(baseline) as f:
+            result = json.load(f)
+        self.assertEqual(set(result['endpoints']), {
+            'post_list', 'post_detail', 'post_search', 'post_list_by_tag', 'post_list_by_category',
+        })
+        self.assertEqual(result['endpoints']['post_list']['queries'], 4)
+
+        # query 가 늘어나면 regression
+        result['endpoints']['post_list']['queries'] = 3
+        result['endpoints']['post_list']['p90_ms'] = 10 ** 6
+        with open(baseline, 'w') as f:
+            json.dump(result, f)
+        with self.assertRaisesMessage(CommandError, 'post_list'):
+            call_command('benchmark_blog', '--requests', '2', '--warmup', '1', '--baseline', baseline,
+                         '--fail-on-regression', stdout=StringIO())
+
+    def test_benchmark_blank_title(self):
+        seed.seed(posts=3, comments_per_post=1, tags=1, categories=1)
+        Post.objects.update(title='  ')
+        baseline = os.path.join(tempfile.mkdtemp(), 'baseline.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(baseline))
+
+        call_command('benchmark_blog', '--requests', '1', '--warmup', '0', '--baseline', baseline, '--save',
+                     stdout=StringIO())
+        with open(baseline) as f:
+            self.assertNotIn('post_search', json.load(f)['endpoints'])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], BLOG_PAGE_CACHE_TIMEOUT=0)
+class TestAsgi(BlogTransactionTestCase):
+    # Django 는 thread pool 에서 돌므로 다른 연결에서 보이도록 commit 한다
+    def setUp(self):
+        super(TestAsgi, self).setUp()
+        self.tag_000 = Tag.objects.create(name='파이썬', slug='파이썬')
+        self.post_000 = create_post(title='The first post', content='Hello **world**', author=self.author_000)
+        self.post_000.tags.add(self.tag_000)
+        self.application = asgi.WsgiToAsgi(WSGIHandler(), threads=2)
+
+    def tearDown(self):
+        self.application.executor.shutdown(wait=True)
+
+    def call(self, path, body_chunks=(b'',), method='GET', headers=()):
+        messages = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(body_chunks) - 1}
+                    for i, chunk in enumerate(body_chunks)]
+        sent = []
+
+        async def receive():
+            return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(),
+            'headers': [(b'host', b'testserver')] + list(headers), 'server': ('testserver', 80),
+        }
+        asyncio.run(self.application(scope, receive, send))
+        return sent
+
+    def test_get(self):
+        sent = self.call('/blog/')
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'), sent[0]['headers'])
+        self.assertFalse(sent[-1]['more_body'])
+        self.assertIn('The first post', b''.join(m.get('body', b'') for m in sent[1:]).decode())
+
+    def test_unicode_path_and_streaming_response(self):
+        sent = self.call(self.tag_000.get_absolute_url())
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn('#파이썬', b''.join(m.get('body', b'') for m in sent[1:]).decode())
+
+        sent = self.call('/blog/feed/atom/')
+        self.assertEqual(sent[0]['status'], 200)
+        feed = ElementTree.fromstring(b''.join(m.get('body', b'') for m in sent[1:]))
+        self.assertEqual(len(feed.findall('{http://www.w3.org/2005/Atom}entry')), 1)
+
+    def test_request_body_in_chunks(self):
+        environ = asgi.build_environ({
+            'type': 'http', 'method': 'POST', 'path': '/blog/검색/', 'query_string': b'a=1',
+            'headers': [(b'content-type', b'application/x-www-form-urlencoded'), (b'x-forwarded-for', b'1.1.1.1'),
+                        (b'x-forwarded-for', b'2.2.2.2')],
+        }, b'text=hello')
+        self.assertEqual(environ['PATH_INFO'].encode('latin-1').decode('utf-8'), '/blog/검색/')
+        self.assertEqual(environ['CONTENT_TYPE'], 'application/x-www-form-urlencoded')
+        self.assertEqual(environ['HTTP_X_FORWARDED_FOR'], '1.1.1.1,2.2.2.2')
+        self.assertEqual(environ['CONTENT_LENGTH'], '10')
+        self.assertEqual(environ['wsgi.input'].read(), b'text=hello')
+
+        self.login()
+        cookie = '{}={}'.format(settings.SESSION_COOKIE_NAME, self.client.cookies[settings.SESSION_COOKIE_NAME].value)
+        with override_settings(MIDDLEWARE=[m for m in settings.MIDDLEWARE if 'Csrf' not in m]):
+            self.application = asgi.WsgiToAsgi(WSGIHandler(), threads=2)
+            sent = self.call('/blog/{}/new_comment/'.format(self.post_000.pk), body_chunks=[b'text=hel', b'lo'],
+                             method='POST', headers=[(b'cookie', cookie.encode()),
+                                                     (b'content-type', b'application/x-www-form-urlencoded')])
+        self.assertEqual(sent[0]['status'], 302)
+        self.assertEqual(Comment.objects.get().text, 'hello')
+
+    def test_disconnect_before_body(self):
+        messages = [{'type': 'http.request', 'body': b'text=', 'more_body': True}, {'type': 'http.disconnect'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.application({'type': 'http', 'method': 'POST', 'path': '/blog/'}, receive, send))
+        self.assertEqual(sent, [])
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_concurrency', clients=3, requests=2, workers=2, client_delay=0.01, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[0] for line in lines[2:]], ['wsgi', 'asgi'])
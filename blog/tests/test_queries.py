@@ -0,0 +1,154 @@
+import time
+from unittest import mock
+
+from django.db import connection, connections
+from django.test import override_settings
+from django.utils import timezone
+
+from .. import db_router
+from ..models import Post, Tag, Comment
+from ..paginator import CursorPaginator
+from .base import BlogTestCase, BlogTransactionTestCase, create_category, create_tag, create_post
+
+
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class TestQueryBudget(BlogTestCase):
+    # 게시물 수가 늘어도 한 페이지를 그리는 query 수는 변하지 않아야 한다
+    def setUp(self):
+        super(TestQueryBudget, self).setUp()
+        self.category = create_category(name='programming')
+        self.tag_000 = create_tag(name='django')
+        self.tag_001 = create_tag(name='python')
+
+    def create_posts(self, count):
+        for i in range(count):
+            post = create_post(
+                title='The Post No. {}'.format(i),
+                content='Django and python {}'.format(i),
+                author=self.author_000,
+                category=self.category if i % 2 else None,
+            )
+            post.tags.add(self.tag_000, self.tag_001)
+
+    def check_budget(self, url, num_queries):
+        # 첫 요청은 sidebar cache 를 채우므로 두번째 요청부터 센다
+        self.create_posts(2)
+        self.client.get(url)
+        with self.assertNumQueries(num_queries):
+            self.client.get(url)
+
+        self.create_posts(8)
+        self.client.get(url)
+        with self.assertNumQueries(num_queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_list(self):
+        self.check_budget('/blog/', 4)
+
+    def test_post_list_by_tag(self):
+        self.check_budget(self.tag_000.get_absolute_url(), 5)
+
+    def test_post_list_by_category(self):
+        self.check_budget(self.category.get_absolute_url(), 6)
+
+    def test_post_search(self):
+        self.check_budget('/blog/search/django/', 4)
+
+
+class TestQueryPlan(BlogTestCase):
+    # sqlite 의 EXPLAIN QUERY PLAN 으로 목록 페이지들의 query 가 index 를 타는지 확인한다
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn('USING INDEX {}'.format(index), plan)
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_post_list(self):
+        self.assertUsesIndex(Post.objects.for_list().order_by('-created', '-pk')[:5], 'post_created_idx')
+
+    def test_post_list_cursor(self):
+        paginator = CursorPaginator(Post.objects.order_by('-created'), 5)
+        condition = paginator.build_filter(paginator.ordering, [timezone.now(), 100])
+        self.assertUsesIndex(Post.objects.filter(condition).order_by(*paginator.ordering)[:6], 'post_created_idx')
+
+    def test_post_list_by_category(self):
+        self.assertUsesIndex(
+            Post.objects.filter(category_id=1).order_by('-created', '-pk')[:5], 'post_category_created_idx'
+        )
+        self.assertUsesIndex(
+            Post.objects.filter(category=None).order_by('-created', '-pk')[:5], 'post_category_created_idx'
+        )
+
+    def test_post_list_by_tag(self):
+        plan = Tag(pk=1).post_set.order_by('-created')[:5].explain()
+        self.assertIn('SEARCH blog_post_tags USING INDEX', plan)
+        self.assertIn('(tag_id=?)', plan)
+
+    def test_comments_by_post(self):
+        self.assertUsesIndex(
+            Comment.objects.filter(post_id=1).order_by('created_at', 'pk'), 'comment_post_created_idx'
+        )
+
+
+@override_settings(BLOG_DB_REPLICAS=['replica'], BLOG_PAGE_CACHE_TIMEOUT=0)
+class TestReplicaRouting(BlogTransactionTestCase):
+    # 'replica' 는 test 중에는 default 를 그대로 보는 stand-in (TEST MIRROR) 이다.
+    # 다른 연결에서 보이도록 TestCase 의 transaction 없이 commit 한다
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        super(TestReplicaRouting, self).setUp()
+        self.post_000 = create_post(title='The first post', content='Hello', author=self.author_000)
+
+    def aliases(self, method, url, **extra):
+        used = []
+
+        def record(execute, sql, params, many, context):
+            used.append((context['connection'].alias, sql.split()[0]))
+            return execute(sql, params, many, context)
+
+        with connections['default'].execute_wrapper(record), connections['replica'].execute_wrapper(record):
+            response = getattr(self.client, method)(url, **extra)
+        return response, used
+
+    def test_router(self):
+        router = db_router.PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), 'replica')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        with db_router.use_primary():
+            self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'blog'))
+        self.assertIsNone(router.allow_migrate('default', 'blog'))
+
+    def test_reads_go_to_replica(self):
+        response, used = self.aliases('get', self.post_000.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({alias for alias, statement in used}, {'replica'})
+
+        response, used = self.aliases('get', '/blog/')
+        self.assertEqual({alias for alias, statement in used}, {'replica'})
+
+    def test_read_your_writes(self):
+        self.login()
+        response, used = self.aliases('post', '/blog/{}/new_comment/'.format(self.post_000.pk), data={'text': 'hi'})
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('replica', {alias for alias, statement in used})
+        self.assertIn(db_router.PIN_COOKIE, response.cookies)
+
+        # 댓글을 쓴 사용자는 잠시 동안 primary 에서 읽는다
+        response, used = self.aliases('get', self.post_000.get_absolute_url())
+        self.assertIn('hi', response.content.decode())
+        self.assertEqual({alias for alias, statement in used}, {'default'})
+
+        self.client.cookies[db_router.PIN_COOKIE] = str(int(time.time()) - 1)
+        response, used = self.aliases('get', self.post_000.get_absolute_url())
+        self.assertIn('replica', {alias for alias, statement in used})
+
+    def test_health_check(self):
+        connection = connections['default']
+        connection.ensure_connection()
+        with mock.patch.object(type(connection), 'is_usable', return_value=False), \
+                mock.patch.object(type(connection), 'close') as close:
+            with override_settings(BLOG_DB_HEALTH_CHECKS=True):
+                db_router.check_connections()
+        self.assertTrue(close.called)
@@ -0,0 +1,144 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import override_settings
+
+from .. import search, suggest
+from ..models import SearchToken
+from .base import BlogTestCase, BlogTransactionTestCase, create_category, create_tag, create_post
+
+
+class TestSearch(BlogTestCase):
+    def check_search(self):
+        post_000 = create_post(
+            title='장고로 블로그 만들기',
+            content='Django 와 파이썬을 공부합니다',
+            author=self.author_000,
+        )
+        post_001 = create_post(
+            title='Trump said',
+            content='장고 이야기는 본문에만 있습니다',
+            author=self.author_000,
+        )
+
+        self.assertEqual(search.search_post_ids('장고'), [post_000.pk, post_001.pk])   # 제목이 먼저
+        self.assertEqual(search.search_post_ids('블로그를'), [])
+        self.assertEqual(search.search_post_ids('DJANGO'), [post_000.pk])
+        self.assertEqual(search.search_post_ids('trump 장고'), [post_001.pk])
+        self.assertEqual(search.search_post_ids('!!'), [])
+
+        post_000.title = 'Renamed'
+        post_000.save()
+        self.assertEqual(search.search_post_ids('블로그'), [])
+
+        post_001.delete()
+        self.assertEqual(search.search_post_ids('trump'), [])
+
+    def test_search_fts5(self):
+        self.assertEqual(search.get_backend(), 'fts5')
+        self.check_search()
+
+    @override_settings(BLOG_SEARCH_BACKEND='orm')
+    def test_search_orm(self):
+        self.check_search()
+
+    @override_settings(BLOG_SEARCH_BACKEND='orm')
+    def test_rebuild_command(self):
+        post_000 = create_post(
+            title='Stay Fool, Stay Hungry',
+            content='Amazing Apple Stroy',
+            author=self.author_000,
+        )
+        SearchToken.objects.all().delete()
+        self.assertEqual(search.search_post_ids('apple'), [])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search.search_post_ids('apple'), [post_000.pk])
+
+
+class TestSuggest(BlogTransactionTestCase):
+    # index 는 commit 된 뒤에 고쳐지므로 (on_commit) transaction 으로 감싸지 않는다
+    def setUp(self):
+        super(TestSuggest, self).setUp()
+        self.category_000 = create_category(name='programming')
+        self.tag_000 = create_tag(name='django')
+        self.tag_001 = create_tag(name='docker')
+        self.post_000 = create_post(title='Django 배포하기', content='Hello', author=self.author_000)
+        self.post_001 = create_post(title='Deploying docker', content='World', author=self.author_000,
+                                    category=self.category_000)
+        self.post_000.tags.add(self.tag_000)
+        self.post_001.tags.add(self.tag_000, self.tag_001)
+
+    def labels(self, query, kind='posts'):
+        return [item['label'] for item in suggest.suggest(query)[kind]]
+
+    def test_prefix_matches(self):
+        # 제목의 처음부터 맞는 것이 먼저, 그 다음은 최근 글
+        self.assertEqual(self.labels('d'), ['Deploying docker', 'Django 배포하기'])
+        self.assertEqual(self.labels('DOC'), ['Deploying docker'])
+        self.assertEqual(self.labels('배포'), ['Django 배포하기'])
+        self.assertEqual(self.labels('django 배'), ['Django 배포하기'])
+        self.assertEqual(self.labels('x'), [])
+        self.assertEqual(self.labels('  '), [])
+
+        # 게시물이 많은 tag 가 먼저
+        self.assertEqual(self.labels('d', 'tags'), ['django', 'docker'])
+        self.assertEqual(self.labels('pro', 'categories'), ['programming'])
+
+    def test_incremental_updates(self):
+        suggest.get_index()
+        with self.assertNumQueries(0):
+            self.labels('dep')
+
+        self.post_000.title = 'Deploy django'
+        self.post_000.save()
+        post = create_post(title='Dependency injection', content='...', author=self.author_000)
+        self.post_001.delete()
+        self.assertEqual(self.labels('dep'), ['Dependency injection', 'Deploy django'])
+
+        self.tag_001.name = 'devops'
+        self.tag_001.save()
+        self.assertEqual(self.labels('d', 'tags'), ['django', 'devops'])
+        post.tags.add(self.tag_001)
+        post.tags.add(create_tag(name='debian'))
+        self.post_000.tags.add(self.tag_001)
+        self.assertEqual(self.labels('d', 'tags'), ['devops', 'django', 'debian'])
+
+        self.category_000.delete()
+        self.assertEqual(self.labels('pro', 'categories'), [])
+
+        # clear() 도 tag 의 게시물 수를 바꾼다
+        post.tags.clear()
+        self.assertEqual(self.labels('d', 'tags'), ['django', 'devops', 'debian'])
+
+        # 다른 process 에서 바뀐 것은 version 이 달라진 것을 보고 새로 만든다
+        index = suggest.get_index()
+        suggest.invalidate()
+        self.assertIsNot(suggest.get_index(), index)
+
+    def test_rollback_leaves_index_alone(self):
+        index = suggest.get_index()
+        version = index.version
+        try:
+            with transaction.atomic():
+                create_post(title='Discarded draft', content='...', author=self.author_000)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(self.labels('dis'), [])
+        self.assertIs(suggest.get_index(), index)
+        self.assertEqual(index.version, version)
+
+    def test_view(self):
+        suggest.get_index()
+        with self.assertNumQueries(0):
+            response = self.client.get('/blog/suggest/', {'q': 'dj', 'limit': 'abc'})
+        data = response.json()
+        self.assertEqual(data['query'], 'dj')
+        self.assertEqual(data['posts'], [{'label': 'Django 배포하기', 'url': self.post_000.get_absolute_url()}])
+        self.assertEqual(data['tags'], [{'label': 'django', 'url': self.tag_000.get_absolute_url()}])
+        self.assertIn('max-age=60', response['Cache-Control'])
+
+        data = self.client.get('/blog/suggest/', {'q': 'd', 'limit': '1'}).json()
+        self.assertEqual(len(data['posts']), 1)
@@ -0,0 +1,93 @@
+from io import StringIO
+
+from bs4 import BeautifulSoup
+from django.core.management import call_command
+
+from .. import sidebar
+from ..models import TagStat
+from .base import BlogTestCase, create_category, create_tag, create_post
+
+
+class TestSidebar(BlogTestCase):
+    def test_sidebar_cache_invalidation(self):
+        category = create_category(name='정치/사회')
+        create_post(title='The first post', content='Hello world', author=self.author_000)
+
+        with self.assertNumQueries(3):   # category 별 수, category, tag cloud
+            data = sidebar.get_sidebar_data()
+        with self.assertNumQueries(0):
+            sidebar.get_sidebar_data()
+        self.assertEqual(data['category_list'][0].num_posts, 0)
+        self.assertEqual(data['posts_without_category'], 1)
+
+        post_001 = create_post(title='The second post', content='Second', author=self.author_000, category=category)
+        data = sidebar.get_sidebar_data()
+        self.assertEqual(data['category_list'][0].num_posts, 1)
+
+        post_001.delete()
+        category.name = '경제'
+        category.save()
+        data = sidebar.get_sidebar_data()
+        self.assertEqual(data['category_list'][0].name, '경제')
+        self.assertEqual(data['category_list'][0].num_posts, 0)
+
+
+class TestTagStats(BlogTestCase):
+    def setUp(self):
+        super(TestTagStats, self).setUp()
+        self.tag_000 = create_tag(name='bad_guy')
+        self.tag_001 = create_tag(name='america')
+        self.post_000 = create_post(title='The first Post', content='Hello world', author=self.author_000)
+        self.post_001 = create_post(title='Stay Fool', content='Steve Jobs', author=self.author_000)
+
+    def counts(self):
+        return dict(TagStat.objects.values_list('tag__name', 'post_count'))
+
+    def test_counts_follow_m2m(self):
+        self.assertEqual(self.counts(), {'bad_guy': 0, 'america': 0})
+
+        self.post_000.tags.add(self.tag_000, self.tag_001)
+        self.post_000.tags.add(self.tag_000)   # 이미 있는 tag 는 다시 세지 않는다
+        self.tag_001.post_set.add(self.post_001)
+        self.assertEqual(self.counts(), {'bad_guy': 1, 'america': 2})
+
+        self.post_000.tags.remove(self.tag_001)
+        self.assertEqual(self.counts(), {'bad_guy': 1, 'america': 1})
+
+        # 달려 있지 않은 관계를 지우라고 해도 수는 그대로다
+        self.post_000.tags.remove(self.tag_001)
+        self.post_001.tags.remove(self.tag_000)
+        self.tag_000.post_set.remove(self.post_001)
+        self.assertEqual(self.counts(), {'bad_guy': 1, 'america': 1})
+
+        self.tag_001.post_set.clear()
+        self.post_000.tags.set([self.tag_001])
+        self.assertEqual(self.counts(), {'bad_guy': 0, 'america': 1})
+
+        self.post_000.delete()
+        self.assertEqual(self.counts(), {'bad_guy': 0, 'america': 0})
+
+    def test_tag_index_and_cloud(self):
+        self.post_000.tags.add(self.tag_000, self.tag_001)
+        self.post_001.tags.add(self.tag_001)
+
+        with self.assertNumQueries(4):   # sidebar 3 + TagStat 1 (tag 수와 상관없이)
+            response = self.client.get('/blog/tags/')
+        soup = BeautifulSoup(response.content, 'html.parser')
+        self.assertIn('#america (2)', soup.find('ul', id='tag-list').text)
+
+        cloud = soup.find('div', id='tag-cloud-card')
+        self.assertEqual(cloud.find('a', class_='tag-cloud-5').text, '#america')
+        self.assertEqual(cloud.find('a', class_='tag-cloud-1').text, '#bad_guy')
+
+        # tag 가 바뀌면 cache 된 페이지에도 반영된다
+        self.post_001.tags.add(self.tag_000)
+        response = self.client.get('/blog/tags/')
+        soup = BeautifulSoup(response.content, 'html.parser')
+        self.assertIn('#bad_guy (2)', soup.find('ul', id='tag-list').text)
+
+    def test_rebuild_command(self):
+        self.post_000.tags.add(self.tag_000)
+        TagStat.objects.update(post_count=9)
+        call_command('rebuild_tag_stats', stdout=StringIO())
+        self.assertEqual(self.counts(), {'bad_guy': 1, 'america': 0})
@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
+
+from .. import search, transfer
+from ..models import Post, Category, Tag, Comment, TagStat
+from .base import BlogTestCase, create_category, create_tag, create_post, create_comment
+
+
+class TestTransfer(BlogTestCase):
+    def setUp(self):
+        super(TestTransfer, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'blog.jsonl')
+
+        self.category_000 = create_category(name='programming')
+        self.tag_000 = create_tag(name='america')
+        self.post_000 = create_post(title='The first post', content='# Hello', author=self.author_000,
+                                    category=self.category_000)
+        self.post_000.tags.add(self.tag_000)
+        self.post_001 = create_post(title='검색', content='파이썬으로 만든 블로그', author=self.author_000)
+        create_comment(self.post_000, text='**first**', author=self.author_000)
+        create_comment(self.post_000, text='second', author=self.author_000)
+
+    def export_and_clear(self):
+        call_command('export_jsonl', self.path, stdout=StringIO())
+        Post.objects.all().delete()
+        Category.objects.all().delete()
+        Tag.objects.all().delete()
+        User.objects.all().delete()
+        cache.clear()
+
+    def assert_imported(self):
+        post = Post.objects.get(title='The first post')
+        self.assertEqual(post.author.username, 'smith')
+        self.assertEqual(post.category.slug, 'programming')
+        self.assertEqual([t.slug for t in post.tags.all()], ['america'])
+        self.assertEqual(post.created, self.post_000.created)
+        self.assertEqual(post.comment_count, 2)
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(TagStat.objects.get(tag__slug='america').post_count, 1)
+        self.assertEqual([p.title for p in search.search_posts('블로그')], ['검색'])
+        # markdown 은 import 가 끝날 때 미리 렌더링해 둔다
+        with self.assertNumQueries(0):
+            self.assertIn('<h1>Hello</h1>', post.get_markdown_content())
+
+    def test_export_format(self):
+        call_command('export_jsonl', self.path, stdout=StringIO())
+        with open(self.path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r['type'] for r in records], ['category', 'tag', 'post', 'post', 'comment', 'comment'])
+        self.assertEqual(records[2]['tags'], ['america'])
+        self.assertEqual(records[4]['post'], self.post_000.pk)
+
+    def test_round_trip(self):
+        self.export_and_clear()
+        with self.assertNumQueries(40):   # row 마다가 아니라 type 마다 몇 개씩
+            call_command('import_jsonl', self.path, stdout=StringIO())
+        self.assert_imported()
+        self.assertFalse(os.path.exists(self.path + '.progress'))
+
+    def test_conflicting_tag_name(self):
+        self.export_and_clear()
+        Tag.objects.create(name='america', slug='usa')
+        with self.assertRaisesMessage(CommandError, 'tag "america" (slug "america") conflicts'):
+            call_command('import_jsonl', self.path, stdout=StringIO())
+        # batch 가 통째로 rollback 되어서 category 없이 들어간 post 가 없다
+        self.assertFalse(Post.objects.exists())
+
+        Tag.objects.filter(slug='usa').update(name='usa')
+        call_command('import_jsonl', self.path, stdout=StringIO())
+        self.assert_imported()
+
+    def test_resume(self):
+        self.export_and_clear()
+        # 첫 batch (category, tag, post 2개) 까지 가져온 다음 끊겼다
+        with mock.patch.object(transfer.Importer, 'finish', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('import_jsonl', self.path, '--batch-size', '4', stdout=StringIO())
+        self.assertTrue(os.path.exists(self.path + '.progress'))
+
+        out = StringIO()
+        call_command('import_jsonl', self.path, '--batch-size', '4', stdout=out)
+        self.assertIn('resuming after line 6', out.getvalue())
+        self.assert_imported()
+
+    def test_rerun_after_lost_progress(self):
+        self.export_and_clear()
+        call_command('import_jsonl', self.path, stdout=StringIO())
+        # progress 파일 없이 다시 실행해도 post / comment 를 두번 만들지 않는다
+        call_command('import_jsonl', self.path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 2)
+        self.assert_imported()
@@ -1,52 +1,11 @@
-from django.test import TestCase, Client
 from bs4 import BeautifulSoup
-from .models import Post, Category, Tag, Comment
-from django.utils import timezone
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, Client
 
+from ..models import Post, Comment
+from .base import create_category, create_tag, create_post, create_comment
 
-def create_category(name='life', description=''):
-    category, is_created = Category.objects.get_or_create(
-        name = name,
-        description = description,
-    )
-    category.slug = category.name.replace(' ','-').replace('/','')
-    category.save()
-
-    return category
-
-def create_tag(name='some_tag'):
-    tag, is_create = Tag.objects.get_or_create(
-        name = name,
-    )
-    tag.slug = tag.name.replace(' ','-').replace('/','')
-    tag.save()
-
-    return tag
-
-def create_post(title, content, author, category = None):
-    blog_post = Post.objects.create(
-        title=title,
-        content=content,
-        created = timezone.now(),
-        author = author,
-        category = category,
-    )
-    return blog_post
-
-def create_comment(post, text='a comment', author = None):
-    if author is None:
-        author, is_created = User.objects.get_or_create(
-            username = 'guest',
-            password = 'guestpassword',
-        )
-    comment = Comment.objects.create(
-        post = post,
-        text = text,
-        author = author,
-    )
-
-    return comment
 
 class TestModel(TestCase):
     def setUp(self):
@@ -94,8 +53,8 @@ class TestModel(TestCase):
 
         self.assertEqual(post_000.tags.count(), 2)
         self.assertEqual(tag_001.post_set.count(), 2)
-        self.assertEqual(tag_001.post_set.first(), post_000)
-        self.assertEqual(tag_001.post_set.last(), post_001)
+        self.assertEqual(tag_001.post_set.first(), post_001)  # Meta.ordering: 최신 글이 먼저
+        self.assertEqual(tag_001.post_set.last(), post_000)
 
     def test_comment(self):
         post_000 = create_post(
@@ -120,6 +79,7 @@ class TestModel(TestCase):
 
 class TextView(TestCase):
     def setUp(self):
+        cache.clear()
         self.client= Client()
         self.author_000 = User.objects.create_user(username = 'smith', password = 'nopassword')
         self.author_obama = User.objects.create_user(username='obama', password='nopassword')
@@ -551,16 +511,3 @@ class TextView(TestCase):
         soup = BeautifulSoup(response.content, 'html.parser')
         self.assertIn(post_001.title, soup.body.text)
         self.assertNotIn(post_000.title, soup.body.text)
-
-
-
-
-
-
-
-
-
-
-
-
-
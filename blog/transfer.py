@@ -0,0 +1,280 @@
+import json
+import os
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils.dateparse import parse_datetime
+
+from . import comment_counts, excerpts, markdown_cache, page_cache, search, sidebar, suggest, tag_stats
+from .models import Post, Category, Tag, Comment
+from .seed import without_auto_now_add
+
+# 한 줄에 하나의 record. type 은 category, tag, post, comment 중 하나이고 이 순서로 내보낸다.
+# post / comment 의 id 는 내보낸 쪽의 pk 로, comment 가 어느 post 에 달렸는지 찾을 때만 쓴다.
+EXPORT_BATCH_SIZE = 500
+
+
+class ImportConflict(Exception):
+    # 가져올 row 가 이미 있는 row 와 겹쳐서 만들 수 없다
+    pass
+
+
+def _in_batches(queryset, batch_size=EXPORT_BATCH_SIZE):
+    # iterator() 는 prefetch_related 를 무시하므로 pk 순서로 batch 마다 가져온다
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+        if not batch:
+            return
+        yield from batch
+        last_pk = batch[-1].pk
+
+
+def export_records():
+    for category in Category.objects.order_by('pk').iterator():
+        yield {'type': 'category', 'name': category.name, 'slug': category.slug, 'description': category.description}
+
+    for tag in Tag.objects.order_by('pk').iterator():
+        yield {'type': 'tag', 'name': tag.name, 'slug': tag.slug}
+
+    posts = Post.objects.select_related('author', 'category').prefetch_related(
+        Prefetch('tags', queryset=Tag.objects.only('slug'))
+    )
+    for post in _in_batches(posts):
+        yield {
+            'type': 'post',
+            'id': post.pk,
+            'title': post.title,
+            'content': post.content,
+            'created': post.created.isoformat(),
+            'author': post.author.username,
+            'category': post.category.slug if post.category_id else None,
+            'tags': [tag.slug for tag in post.tags.all()],
+            # media 파일 자체는 MEDIA_ROOT 에서 따로 옮긴다
+            'head_image': post.head_image.name or None,
+        }
+
+    for comment in _in_batches(Comment.objects.select_related('author')):
+        yield {
+            'type': 'comment',
+            'id': comment.pk,
+            'post': comment.post_id,
+            'author': comment.author.username,
+            'text': comment.text,
+            'created_at': comment.created_at.isoformat(),
+        }
+
+
+def export_jsonl(out):
+    count = 0
+    for record in export_records():
+        out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+class Importer(object):
+    """
+    JSONL 을 batch_size 줄씩 읽어서 type 별로 bulk_create 한다.
+
+    batch 마다 transaction 을 commit 하고 progress 파일에 읽은 줄 수와 새 post 의 pk 를 한 줄씩 덧붙이므로,
+    중간에 끊겨도 같은 명령을 다시 실행하면 이어서 가져온다. commit 과 progress 기록 사이에 끊긴 batch 는
+    (제목, 작성일, 작성자) 로 이미 들어간 post / comment 를 찾아서 다시 만들지 않는다.
+
+    signal 을 타지 않으므로 markdown cache, excerpt, 검색 색인, tag 통계, 댓글 수는 finish() 에서 한번에 만든다.
+    """
+
+    def __init__(self, progress_path, batch_size=500, log=None):
+        self.progress_path = progress_path
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.offset = 0
+        self.post_ids = {}
+        self.skipped = 0
+        self.created = {'category': 0, 'tag': 0, 'post': 0, 'comment': 0}
+        self.load_progress()
+
+    def load_progress(self):
+        if not os.path.exists(self.progress_path):
+            return
+        with open(self.progress_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 쓰다가 끊긴 마지막 줄
+                    break
+                self.offset = entry['offset']
+                self.post_ids.update(entry['posts'])
+        self.log('resuming after line {}'.format(self.offset))
+
+    def save_progress(self, offset, post_ids):
+        with open(self.progress_path, 'a') as f:
+            f.write(json.dumps({'offset': offset, 'posts': post_ids}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def run(self, lines):
+        batch = []
+        line_number = 0
+        for line_number, line in enumerate(lines, 1):
+            if line_number <= self.offset or not line.strip():
+                continue
+            batch.append(json.loads(line))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch, line_number)
+                batch = []
+        if batch:
+            self.import_batch(batch, line_number)
+        self.finish()
+
+    def import_batch(self, records, offset):
+        by_type = {'category': [], 'tag': [], 'post': [], 'comment': []}
+        for record in records:
+            by_type[record['type']].append(record)
+
+        with transaction.atomic():
+            self.import_taxonomy(Category, by_type['category'])
+            self.import_taxonomy(Tag, by_type['tag'])
+            new_post_ids = self.import_posts(by_type['post'])
+            self.import_comments(by_type['comment'])
+        self.save_progress(offset, new_post_ids)
+        self.offset = offset
+        self.log('imported up to line {}'.format(offset))
+
+    def import_taxonomy(self, model, records, slugs=()):
+        # slug 가 이미 있으면 그대로 쓴다. post 가 참조만 하는 slug 는 slug 를 이름으로 만든다
+        wanted = {r['slug']: r for r in records}
+        for slug in slugs:
+            wanted.setdefault(slug, {'slug': slug, 'name': slug})
+        model_name = model._meta.model_name
+        existing = set(model.objects.filter(slug__in=list(wanted)).values_list('slug', flat=True))
+        missing = [
+            model(**{key: value for key, value in record.items() if key != 'type'})
+            for slug, record in wanted.items() if slug not in existing
+        ]
+
+        # name 도 unique 이다. 같은 이름이 다른 slug 로 이미 있으면 조용히 건너뛰지 않고 어느 row 인지 알린다
+        taken = dict(model.objects.filter(name__in=[obj.name for obj in missing]).values_list('name', 'slug'))
+        names = set()
+        for obj in missing:
+            if obj.name in taken or obj.name in names:
+                raise ImportConflict('{} "{}" (slug "{}") conflicts with an existing {} named "{}" (slug "{}")'.format(
+                    model_name, obj.name, obj.slug, model_name, obj.name, taken.get(obj.name, '?'),
+                ))
+            names.add(obj.name)
+
+        model.objects.bulk_create(missing, ignore_conflicts=True)
+        self.created[model_name] += len(missing)
+        pks = dict(model.objects.filter(slug__in=list(wanted)).values_list('slug', 'pk'))
+        # 그 사이에 다른 곳에서 같은 이름으로 만든 경우 등
+        for slug in wanted:
+            if slug not in pks:
+                raise ImportConflict('{} with slug "{}" could not be created'.format(model_name, slug))
+        return pks
+
+    def resolve_users(self, usernames):
+        usernames = set(usernames)
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        missing = [User(username=name) for name in usernames - existing]
+        for user in missing:
+            user.set_unusable_password()
+        User.objects.bulk_create(missing, ignore_conflicts=True)
+        return dict(User.objects.filter(username__in=usernames).values_list('username', 'pk'))
+
+    def import_posts(self, records):
+        if not records:
+            return {}
+        categories = self.import_taxonomy(Category, [], {r['category'] for r in records if r.get('category')})
+        tags = self.import_taxonomy(Tag, [], {slug for r in records for slug in r.get('tags', ())})
+        users = self.resolve_users(r['author'] for r in records)
+
+        posts = []
+        for r in records:
+            posts.append(Post(
+                title=r['title'],
+                content=r['content'],
+                created=parse_datetime(r['created']),
+                author_id=users[r['author']],
+                category_id=categories.get(r.get('category')),
+                head_image=r.get('head_image') or '',
+            ))
+
+        # 지난번에 commit 은 됐지만 progress 에 남지 않은 post 는 다시 만들지 않는다
+        existing = {
+            (title, created, author_id): pk for pk, title, created, author_id in
+            Post.objects.filter(created__in=[p.created for p in posts])
+                        .values_list('pk', 'title', 'created', 'author_id')
+        }
+        new_posts = [p for p in posts if (p.title, p.created, p.author_id) not in existing]
+        with without_auto_now_add(Post, 'created'):
+            Post.objects.bulk_create(new_posts)
+        self.created['post'] += len(new_posts)
+
+        if new_posts and new_posts[0].pk is None:
+            # pk 를 돌려주지 않는 DB (sqlite + django 2.2)
+            existing.update({
+                (title, created, author_id): pk for pk, title, created, author_id in
+                Post.objects.filter(created__in=[p.created for p in new_posts])
+                            .values_list('pk', 'title', 'created', 'author_id')
+            })
+        for post in new_posts:
+            if post.pk is None:
+                post.pk = existing[(post.title, post.created, post.author_id)]
+
+        post_ids = {}
+        links = []
+        through = Post.tags.through
+        for r, post in zip(records, posts):
+            pk = post.pk or existing[(post.title, post.created, post.author_id)]
+            post_ids[str(r['id'])] = pk
+            links += [through(post_id=pk, tag_id=tags[slug]) for slug in r.get('tags', ())]
+        through.objects.bulk_create(links, ignore_conflicts=True)
+
+        self.post_ids.update(post_ids)
+        return post_ids
+
+    def import_comments(self, records):
+        known = [r for r in records if str(r['post']) in self.post_ids]
+        # 파일에 없는 post 에 달린 댓글
+        self.skipped += len(records) - len(known)
+        records = known
+        if not records:
+            return
+        users = self.resolve_users(r['author'] for r in records)
+        comments = [
+            Comment(
+                post_id=self.post_ids[str(r['post'])],
+                author_id=users[r['author']],
+                text=r['text'],
+                created_at=parse_datetime(r['created_at']),
+            )
+            for r in records
+        ]
+        existing = set(
+            Comment.objects.filter(created_at__in=[c.created_at for c in comments])
+                           .values_list('post_id', 'author_id', 'created_at')
+        )
+        new_comments = [c for c in comments if (c.post_id, c.author_id, c.created_at) not in existing]
+        with without_auto_now_add(Comment, 'created_at'):
+            Comment.objects.bulk_create(new_comments)
+        self.created['comment'] += len(new_comments)
+
+    def finish(self):
+        post_ids = sorted(self.post_ids.values())
+        search.rebuild_index()
+        tag_stats.rebuild()
+        for i in range(0, len(post_ids), EXPORT_BATCH_SIZE):
+            chunk = post_ids[i:i + EXPORT_BATCH_SIZE]
+            comment_counts.reconcile(Post.objects.filter(pk__in=chunk))
+            # 미뤄둔 markdown 렌더링과 excerpt
+            excerpts.rebuild(Post.objects.filter(pk__in=chunk))
+            for comment in Comment.objects.filter(post__in=chunk).only('pk', 'text'):
+                markdown_cache.refresh_html(comment, comment.text)
+        sidebar.invalidate()
+        suggest.invalidate()
+        page_cache.invalidate(page_cache.SIDEBAR_GROUP)
+
+        if os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
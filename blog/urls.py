@@ -2,11 +2,19 @@ from django.urls import path, include
 from . import views
 
 urlpatterns = [
+    path('feed/<str:feed_format>/', views.PostFeed.as_view()),
+    path('category/<str:slug>/feed/<str:feed_format>/', views.CategoryFeed.as_view()),
     path('category/<str:slug>/', views.PostListByCategory.as_view()),
     path('create/', views.PostCreate.as_view()),
     path('search/<str:q>/', views.PostSearch.as_view()),
+    path('suggest/', views.search_suggest),
+    path('tags/', views.TagIndex.as_view()),
+    path('tag/<str:slug>/feed/<str:feed_format>/', views.TagFeed.as_view()),
     path('tag/<str:slug>/', views.PostListByTag.as_view()),
+    path('placeholder/<str:signed_key>.png', views.placeholder_image),
+    path('_perf/', views.performance_stats),
     path('<int:pk>/new_comment/', views.new_comment),
+    path('<int:pk>/comments/', views.CommentList.as_view()),
     path('delete_comment/<int:pk>/', views.delete_comment),
     path('edit_comment/<int:pk>/', views.CommentUpdate.as_view()),
     path('<int:pk>/update/', views.PostUpdate.as_view()),
@@ -1,32 +1,53 @@
-from django.shortcuts import render, redirect
-from .models import Post,Category, Tag, Comment
-from django.views.generic import ListView, DetailView, UpdateView, CreateView
+import math
+
+from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.http import HttpResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from .models import Post,Category, Tag, Comment, TagStat
+from django.views.generic import View, ListView, DetailView, UpdateView, CreateView
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.admin.views.decorators import staff_member_required
 from .forms import CommentForm
-#or 조건 추가 가능
-from django.db.models import Q
+from . import comment_ingest, feeds, page_cache, performance, placeholder, search, sidebar, sitemaps, suggest
+from .paginator import CursorPage, CursorPaginationMixin, CursorPaginator, InvalidCursor
+from .page_cache import AnonymousPageCacheMixin
+from .conditional import PostDetailConditionalMixin, PostListConditionalMixin
 
-class PostList(ListView):
-    model = Post
-    paginate_by = 5
 
-    # def get_queryset(self):
-    #     return Post.objects.order_by('-created')
+def is_static_export():
+    return getattr(settings, 'BLOG_STATIC_EXPORT', False)
 
-    # def get_context_data(self, *, object_list: object = None, kwargs: object) -> object:
-    def get_context_data(self, *, object_list=None, **kwargs):
-        context = super(PostList, self).get_context_data(**kwargs)
-        context['category_list'] = Category.objects.all()
-        context['posts_without_category'] = Post.objects.filter(category=None).count()
+
+class SidebarMixin(object):
+    def get_context_data(self, **kwargs):
+        context = super(SidebarMixin, self).get_context_data(**kwargs)
+        context.update(sidebar.get_sidebar_data())
+        # 정적 사이트에서는 검색어 자동완성 (/blog/suggest/) 을 부르지 않는다
+        context['static_export'] = is_static_export()
         return context
 
+
+class PostList(AnonymousPageCacheMixin, PostListConditionalMixin, SidebarMixin, CursorPaginationMixin, ListView):
+    model = Post
+    paginate_by = 5
+
+    def get_queryset(self):
+        return Post.objects.for_list().order_by('-created')
+
 class PostSearch(PostList):
 
     def get_queryset(self):
         q = self.kwargs['q']
-        object_list = Post.objects.filter(Q(title__contains = q) | Q(content__contains = q))
+        object_list = search.search_posts(q).for_list()
         return object_list
 
+    def get_last_modified_queryset(self):
+        # 검색 결과는 ETag 만 사용한다
+        return None
+
 
     def get_context_data(self, **kwargs):
         context = super(PostSearch,self).get_context_data()
@@ -38,13 +59,26 @@ class PostSearch(PostList):
 
 
 
-class PostDetail(DetailView):
+class PostDetail(AnonymousPageCacheMixin, PostDetailConditionalMixin, SidebarMixin, DetailView):
     model = Post
+    queryset = Post.objects.select_related('category', 'author')
+
+    def get_page_cache_groups(self):
+        return [page_cache.post_group(self.kwargs['pk'])]
+
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super(PostDetail, self).get_context_data(**kwargs)
-        context['category_list'] = Category.objects.all()
-        context['posts_without_category'] = Post.objects.filter(category=None).count()
         context['comment_form'] = CommentForm()
+        paginator = comment_paginator(self.object.pk)
+        if is_static_export():
+            # 정적 사이트에는 "댓글 더 보기" 가 불러갈 /blog/<pk>/comments/ 가 없으므로 모두 그린다
+            context['comments_page'] = CursorPage(list(paginator.queryset), None, None)
+        else:
+            # 새 댓글을 단 뒤에는 그 댓글이 들어 있는 페이지 (?cursor=) 로 온다 (new_comment)
+            try:
+                context['comments_page'] = paginator.page(self.request.GET.get('cursor'))
+            except InvalidCursor:
+                raise Http404('Invalid cursor')
 
         return context
 
@@ -72,24 +106,47 @@ class PostUpdate(UpdateView):
 
 
 
-class PostListByTag(ListView):
-    def get_queryset(self):
-        tag_slug = self.kwargs['slug']
-        tag = Tag.objects.get(slug = tag_slug)
+class PostListByTag(AnonymousPageCacheMixin, PostListConditionalMixin, SidebarMixin, CursorPaginationMixin, ListView):
+    paginate_by = 5
 
-        return tag.post_set.order_by('-created')
+    def get_page_cache_groups(self):
+        return [page_cache.tag_group(self.kwargs['slug'])]
+
+    def get_last_modified_queryset(self):
+        return Post.objects.filter(tags__slug=self.kwargs['slug'])
+
+    def get_queryset(self):
+        # get_context_data 에서도 쓰도록 한번만 가져온다
+        self.tag = Tag.objects.get(slug=self.kwargs['slug'])
+        return self.tag.post_set.for_list().order_by('-created')
 
     def get_context_data(self, *, object_list=None, **kwargs):
-        tag_slug = self.kwargs['slug']
         context = super(type(self), self).get_context_data(**kwargs)
-        context['category_list'] = Category.objects.all()
-        context['posts_without_category'] = Post.objects.filter(category=None).count()
-        context['tag'] = Tag.objects.get(slug = tag_slug)
+        context['tag'] = self.tag
 
         return context
 
 
-class PostListByCategory(ListView):
+class TagIndex(AnonymousPageCacheMixin, SidebarMixin, ListView):
+    template_name = 'blog/tag_list.html'
+
+    def get_page_cache_groups(self):
+        return [page_cache.TAG_INDEX_GROUP]
+
+    def get_queryset(self):
+        return TagStat.objects.filter(post_count__gt=0).select_related('tag').order_by('tag__name')
+
+
+class PostListByCategory(AnonymousPageCacheMixin, PostListConditionalMixin, SidebarMixin, CursorPaginationMixin, ListView):
+    paginate_by = 5
+
+    def get_page_cache_groups(self):
+        return [page_cache.category_group(self.kwargs['slug'])]
+
+    def get_last_modified_queryset(self):
+        if self.kwargs['slug'] == '_none':
+            return Post.objects.filter(category=None)
+        return Post.objects.filter(category__slug=self.kwargs['slug'])
 
     def get_queryset(self):
         slug = self.kwargs['slug']
@@ -99,12 +156,10 @@ class PostListByCategory(ListView):
         else:
             category = Category.objects.get(slug = slug)
 
-        return Post.objects.filter(category=category).order_by('-created')
+        return Post.objects.for_list().filter(category=category).order_by('-created')
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super(type(self), self).get_context_data(**kwargs)
-        context['category_list'] = Category.objects.all()
-        context['posts_without_category'] = Post.objects.filter(category=None).count()
 
         slug = self.kwargs['slug']
         if slug == '_none':
@@ -115,20 +170,198 @@ class PostListByCategory(ListView):
         # context['title'] = 'Blog - {}'.format(category.name)
         return context
 
+class PostFeed(PostListConditionalMixin, View):
+    # 최근 글의 Atom / RSS / JSON Feed. 본문을 한 item 씩 stream 하고, 바뀐 게 없으면 304 를 돌려준다
+    title = 'Blog'
+    description = "Jake's Practice blog"
+
+    def get_page_cache_groups(self):
+        return [page_cache.LIST_GROUP]
+
+    def get_queryset(self):
+        return Post.objects.all()
+
+    def get_feed_info(self):
+        return self.title, '/blog/', self.description
+
+    def get(self, request, *args, **kwargs):
+        feed_format = kwargs['feed_format']
+        if feed_format not in feeds.FEED_CLASSES:
+            raise Http404('Unknown feed format')
+
+        title, link, description = self.get_feed_info()
+        posts = self.get_queryset().select_related('category', 'author') \
+            .order_by('-created')[:feeds.get_item_count()].iterator()
+        return StreamingHttpResponse(
+            feeds.stream(
+                feed_format, posts, request.build_absolute_uri,
+                title=title,
+                link=request.build_absolute_uri(link),
+                description=description,
+                feed_url=request.build_absolute_uri(),
+                language='ko',
+                updated=self.get_last_modified(),
+            ),
+            content_type=feeds.CONTENT_TYPES[feed_format],
+        )
+
+
+class CategoryFeed(PostFeed):
+    def get_page_cache_groups(self):
+        return [page_cache.category_group(self.kwargs['slug'])]
+
+    def get_queryset(self):
+        if self.kwargs['slug'] == '_none':
+            return Post.objects.filter(category=None)
+        return Post.objects.filter(category__slug=self.kwargs['slug'])
+
+    def get_feed_info(self):
+        if self.kwargs['slug'] == '_none':
+            return 'Blog - 미분류', '/blog/category/_none/', '분류되지 않은 글'
+        category = get_object_or_404(Category, slug=self.kwargs['slug'])
+        return 'Blog - {}'.format(category.name), category.get_absolute_url(), category.description
+
+
+class TagFeed(PostFeed):
+    def get_page_cache_groups(self):
+        return [page_cache.tag_group(self.kwargs['slug'])]
+
+    def get_queryset(self):
+        return Post.objects.filter(tags__slug=self.kwargs['slug'])
+
+    def get_feed_info(self):
+        tag = get_object_or_404(Tag, slug=self.kwargs['slug'])
+        return 'Blog - #{}'.format(tag.name), tag.get_absolute_url(), '#{} 태그가 달린 글'.format(tag.name)
+
+
+def get_comments_per_page():
+    return getattr(settings, 'BLOG_COMMENTS_PER_PAGE', 20)
+
+
+def comment_paginator(post_pk):
+    comments = Comment.objects.filter(post_id=post_pk) \
+        .select_related('author') \
+        .prefetch_related('author__socialaccount_set') \
+        .order_by('created_at')
+    return CursorPaginator(comments, get_comments_per_page())
+
+
+def comment_url(comment):
+    # 댓글이 첫 페이지에 들어가지 않으면 그 댓글부터 시작하는 페이지로 보낸다
+    url = '/blog/{}/'.format(comment.post_id)
+    if Post.objects.filter(pk=comment.post_id, comment_count__gt=get_comments_per_page()).exists():
+        cursor = comment_paginator(comment.post_id).cursor_before(comment)
+        if cursor is not None:
+            url += '?cursor={}'.format(cursor)
+    return '{}#comment-id-{}'.format(url, comment.pk)
+
+
+class CommentList(AnonymousPageCacheMixin, View):
+    # PostDetail 의 "댓글 더 보기" 가 불러가는 다음 댓글들 (html 조각 + 다음 cursor)
+    def get_page_cache_groups(self):
+        return [page_cache.post_group(self.kwargs['pk'])]
+
+    def get(self, request, pk):
+        try:
+            page = comment_paginator(pk).page(request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+
+        next_url = None
+        if page.has_next():
+            next_url = '/blog/{}/comments/?cursor={}'.format(pk, page.next_cursor)
+        return JsonResponse({
+            'html': render_to_string('blog/comment_list.html', {'comments': page}, request=request),
+            'next': next_url,
+        })
+
+
+def placeholder_image(request, signed_key):
+    key = placeholder.unsign(signed_key)
+    if key is None:
+        raise Http404('Invalid placeholder')
+
+    # key 가 같으면 이미지도 항상 같으므로 브라우저 / CDN 이 오래 가지고 있어도 된다
+    etag = '"{}"'.format(key)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(placeholder.get_image(key), content_type='image/png')
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+    return response
+
+
+def sitemap_response(request, make_chunks):
+    key = sitemaps.cache_key(request)
+    content = page_cache.get_cache().get(key)
+    if content is not None:
+        return HttpResponse(content, content_type='application/xml; charset=utf-8')
+    return StreamingHttpResponse(
+        sitemaps.stream_and_cache(key, make_chunks()),
+        content_type='application/xml; charset=utf-8',
+    )
+
+
+def sitemap_index(request):
+    return sitemap_response(request, lambda: sitemaps.index(request.build_absolute_uri))
+
+
+def sitemap_section(request, section, shard):
+    if section not in sitemaps.SECTIONS:
+        raise Http404('Unknown sitemap section')
+    return sitemap_response(
+        request, lambda: sitemaps.urlset(sitemaps.SECTIONS[section], shard, request.build_absolute_uri)
+    )
+
+
+def search_suggest(request):
+    # 검색창에서 글자를 칠 때마다 불린다. DB 를 보지 않고 이 process 의 prefix index 에서만 찾는다
+    try:
+        limit = min(int(request.GET.get('limit', suggest.get_limit())), 20)
+    except ValueError:
+        limit = suggest.get_limit()
+    q = request.GET.get('q', '')
+    response = JsonResponse(dict(suggest.suggest(q, max(limit, 1)), query=q))
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'BLOG_SUGGEST_MAX_AGE', 60))
+    return response
+
+
+@staff_member_required
+def performance_stats(request):
+    # PerformanceMiddleware 가 이 process 에서 모은 view 별 통계
+    return JsonResponse(performance.stats.summary())
+
+
 def new_comment(request, pk):
-    post  = Post.objects.get(pk = pk)
-
-    if request.method == 'POST':
-        comment_form = CommentForm(request.POST)
-        if comment_form.is_valid():
-            comment = comment_form.save(commit=False)
-            comment.post = post
-            comment.author = request.user
-            comment.save()
-            return redirect(comment.get_absolute_url())
-    else:
+    # write-behind 이면 다른 thread 가 저장하므로 이 요청은 transaction 을 잡고 있으면 안 된다 (comment_ingest)
+    if request.method != 'POST':
         return redirect('/blog')
 
+    retry_after = comment_ingest.check_rate(request)
+    if retry_after:
+        response = HttpResponse('댓글을 너무 자주 달고 있습니다. 잠시 후에 다시 시도해 주세요.', status=429)
+        response['Retry-After'] = str(math.ceil(retry_after))
+        return response
+
+    if not Post.objects.filter(pk=pk).exists():
+        raise Http404('No post')
+
+    comment_form = CommentForm(request.POST)
+    if not comment_form.is_valid():
+        return redirect('/blog/{}/'.format(pk))
+    comment = comment_form.save(commit=False)
+    comment.post_id = pk
+    comment.author = request.user
+    try:
+        comment_ingest.save_comment(comment)
+    except comment_ingest.CommentPending:
+        # 실패한 것이 아니라 아직 저장 중이다. 500 을 보고 다시 보내면 댓글이 두 번 달린다
+        return HttpResponse(
+            '댓글을 저장하고 있습니다. 다시 보내지 말고 잠시 후에 <a href="/blog/{}/">글</a>을 새로고침해 주세요.'.format(pk),
+            status=202,
+        )
+    return redirect(comment_url(comment))
+
 class CommentUpdate(UpdateView):
     model = Comment
     form_class = CommentForm
@@ -139,8 +372,14 @@ class CommentUpdate(UpdateView):
             raise PermissionError('Comment 수정 권한이 없습니다.')
         return comment
 
+    @transaction.atomic
+    def form_valid(self, form):
+        # 댓글 저장과 Post 의 댓글 통계 갱신을 같은 transaction 에서 한다
+        return super(CommentUpdate, self).form_valid(form)
+
 
 
+@transaction.atomic
 def delete_comment(request, pk):
     comment = Comment.objects.get(pk=pk)
     post = comment.post
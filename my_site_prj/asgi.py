@@ -0,0 +1,19 @@
+"""
+ASGI config for my_site_prj project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no ASGI handler, so the WSGI application is wrapped and run
+in a thread pool (see blog.asgi.WsgiToAsgi). Run it with any ASGI server:
+
+    uvicorn my_site_prj.asgi:application
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+from blog.asgi import WsgiToAsgi
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'my_site_prj.settings')
+
+application = WsgiToAsgi(get_wsgi_application())
@@ -49,7 +49,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog.performance.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'blog.db_router.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -82,12 +84,55 @@ WSGI_APPLICATION = 'my_site_prj.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# BLOG_DB_ENGINE=postgresql 이면 아래 환경변수로 PostgreSQL 에 접속한다.
+#   BLOG_DB_NAME, BLOG_DB_USER, BLOG_DB_PASSWORD, BLOG_DB_HOST, BLOG_DB_PORT
+#   BLOG_DB_REPLICA_HOSTS : 읽기 전용 replica 의 host[:port] 목록 (쉼표로 구분)
+#   BLOG_DB_CONN_MAX_AGE  : 연결을 재사용하는 시간(초). 기본 60
+#   BLOG_DB_PGBOUNCER     : 1 이면 pgbouncer 의 transaction pooling 에 맞게 server side cursor 를 끈다
+# 그 외에는 sqlite 를 쓰고, 같은 파일을 보는 'replica' 를 test 용 stand-in 으로 둔다
+# (BLOG_DB_REPLICAS 에 넣어야 실제로 읽기가 그쪽으로 간다).
+BLOG_DB_ENGINE = os.environ.get('BLOG_DB_ENGINE', 'sqlite')
+
+
+def postgres_database(host):
+    host, _, port = host.partition(':')
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('BLOG_DB_NAME', 'blog'),
+        'USER': os.environ.get('BLOG_DB_USER', 'blog'),
+        'PASSWORD': os.environ.get('BLOG_DB_PASSWORD', ''),
+        'HOST': host,
+        'PORT': port or os.environ.get('BLOG_DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.environ.get('BLOG_DB_CONN_MAX_AGE', 60)),
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('BLOG_DB_PGBOUNCER') == '1',
+        'OPTIONS': {'connect_timeout': 5},
     }
-}
+
+
+if BLOG_DB_ENGINE == 'postgresql':
+    DATABASES = {'default': postgres_database(os.environ.get('BLOG_DB_HOST', 'localhost'))}
+    for i, replica_host in enumerate(filter(None, os.environ.get('BLOG_DB_REPLICA_HOSTS', '').split(','))):
+        DATABASES['replica_{}'.format(i)] = dict(postgres_database(replica_host), TEST={'MIRROR': 'default'})
+    BLOG_DB_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        },
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+            'TEST': {'MIRROR': 'default'},
+        },
+    }
+    BLOG_DB_REPLICAS = []
+
+DATABASE_ROUTERS = ['blog.db_router.PrimaryReplicaRouter']
+
+# 재사용하는 연결이 끊겼는지 요청마다 확인한다
+BLOG_DB_HEALTH_CHECKS = True
+BLOG_DB_STICKY_SECONDS = 15
 
 
 # Password validation
@@ -145,3 +190,50 @@ MARKDOWNX_MEDIA_PATH = datetime.now().strftime('markdownx/%Y/%m/%d')
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 LOGIN_REDIRECT_URL = '/blog/'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'my-site-default',
+    },
+}
+
+# 렌더링된 markdown html 을 저장할 cache alias
+BLOG_MARKDOWN_CACHE = 'default'
+
+# 로그인하지 않은 방문자에게 보여주는 blog 페이지를 통째로 cache 하는 시간(초). 0 이면 끄기
+BLOG_PAGE_CACHE = 'default'
+BLOG_PAGE_CACHE_TIMEOUT = 60 * 10
+
+# head_image 의 크기별 이미지를 만드는 background thread 수
+BLOG_IMAGE_WORKERS = 2
+
+# PostDetail 에서 처음에 보여주는 댓글 수 (나머지는 "댓글 더 보기" 로 불러온다)
+BLOG_COMMENTS_PER_PAGE = 20
+
+# /blog/feed/ (atom, rss, json) 에 넣는 최근 글 수
+BLOG_FEED_ITEMS = 20
+
+# sitemap 한 파일에 들어가는 pk 범위와 생성된 sitemap 을 cache 하는 시간(초)
+BLOG_SITEMAP_SHARD_SIZE = 10000
+BLOG_SITEMAP_CACHE_TIMEOUT = 60 * 60 * 6
+
+# 요청별 시간 / query 수를 모아서 /blog/_perf/ 로 보여준다. Server-Timing header 는 DEBUG 이거나 staff 일 때만 붙인다.
+# BLOG_PERF_LOG 이 True 이면 'blog.performance' logger 로 요청마다 json 한 줄을 남긴다
+BLOG_PERF_ENABLED = True
+BLOG_PERF_SAMPLES = 1000
+BLOG_PERF_LOG = False
+
+# my_site_prj/asgi.py 로 띄웠을 때 Django 를 실행하는 thread 수
+BLOG_ASGI_THREADS = 8
+
+# 댓글 작성 빈도 제한 (token bucket). 사용자 / IP 마다 (연속으로 쓸 수 있는 수, token 하나가 다시 차는 시간(초))
+BLOG_COMMENT_RATE_LIMITS = {'user': (5, 30), 'ip': (20, 6)}
+BLOG_COMMENT_RATE_CACHE = 'default'
+# True 이면 동시에 들어온 댓글들을 writer thread 하나가 모아서 한 transaction 으로 저장한다
+BLOG_COMMENT_WRITE_BEHIND = False
+BLOG_COMMENT_BATCH_SIZE = 50
+
+# /blog/suggest/?q= (검색어 자동완성) 가 종류별로 돌려주는 수와 브라우저 / CDN 이 가지고 있는 시간(초)
+BLOG_SUGGEST_LIMIT = 5
+BLOG_SUGGEST_MAX_AGE = 60
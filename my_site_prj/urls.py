@@ -3,10 +3,13 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
+from blog import views as blog_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('blog/', include('blog.urls')),
+    path('sitemap.xml', blog_views.sitemap_index),
+    path('sitemap-<str:section>-<int:shard>.xml', blog_views.sitemap_section),
     path('markdownx/', include('markdownx.urls')),
     path('accounts/', include('allauth.urls')),
     path('', include('basecamp.urls')),